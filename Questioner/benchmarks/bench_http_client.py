@@ -0,0 +1,106 @@
+"""
+对比 `OpenAIClient` 与 `HTTPClient` 在本地模拟端点上的单次调用开销。
+
+模拟端点没有服务端延迟，因此测得的主要是客户端侧的请求构造、
+连接复用与 JSON 编解码开销。
+
+用法（在 Questioner/ 目录下运行）：
+
+    python benchmarks/bench_http_client.py --calls 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_server import MockServer  # noqa: E402
+
+from questioner.http_client import HTTPClient  # noqa: E402
+from questioner.llm_client import OpenAIClient  # noqa: E402
+from questioner.prompts import SYSTEM_PROMPT_GENERATE  # noqa: E402
+
+USER_CONTENT = "研究人员希望比较三组受试者中某二分类结局的比例是否存在差异。"
+
+
+def _time_calls(fn: Callable[[], object], calls: int) -> List[float]:
+    fn()  # 预热，建立连接
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _report(name: str, samples: List[float]) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+    print(
+        f"{name:<24} median={statistics.median(ms):6.3f} ms  "
+        f"p99={p99:6.3f} ms  total={sum(ms) / 1000:6.2f} s"
+    )
+
+
+async def _async_batch(client: HTTPClient, calls: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await client.agenerate_structured_json(SYSTEM_PROMPT_GENERATE, USER_CONTENT)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - t0
+    await client.aclose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAIClient vs HTTPClient")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    with MockServer() as server:
+        http_client = HTTPClient(model_name="mock", api_key="dummy", base_url=server.base_url)
+        _report(
+            "HTTPClient (sync)",
+            _time_calls(
+                lambda: http_client.generate_structured_json(SYSTEM_PROMPT_GENERATE, USER_CONTENT),
+                args.calls,
+            ),
+        )
+        http_client.close()
+
+        try:
+            openai_client = OpenAIClient(model_name="mock", api_key="dummy", base_url=server.base_url)
+        except ImportError:
+            print("OpenAIClient             skipped (openai 未安装)")
+        else:
+            _report(
+                "OpenAIClient",
+                _time_calls(
+                    lambda: openai_client.generate_structured_json(SYSTEM_PROMPT_GENERATE, USER_CONTENT),
+                    args.calls,
+                ),
+            )
+
+        async_client = HTTPClient(model_name="mock", api_key="dummy", base_url=server.base_url)
+        elapsed = asyncio.run(_async_batch(async_client, args.calls, args.concurrency))
+        print(
+            f"{'HTTPClient (async)':<24} {args.calls} calls @ concurrency "
+            f"{args.concurrency}: {elapsed:6.2f} s ({args.calls / elapsed:7.1f} req/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
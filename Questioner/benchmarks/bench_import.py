@@ -0,0 +1,107 @@
+"""
+冷启动基准：测量 `import questioner` 以及首次调用
+`generate_question_from_text` 的耗时。
+
+每次测量都在全新的子进程中进行，以反映 worker 进程 / CLI 调用的真实启动开销。
+首次调用使用进程内的假客户端，不访问网络，只统计本地导入与流水线初始化开销。
+
+用法（在 Questioner/ 目录下运行）：
+
+    python benchmarks/bench_import.py --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD_CODE = r"""
+import json
+import sys
+import time
+
+t0 = time.perf_counter()
+import questioner
+t1 = time.perf_counter()
+
+# 首次调用的耗时包含访问惰性属性时触发的子模块导入
+t2 = time.perf_counter()
+from questioner import LLMClient, generate_question_from_text
+
+
+class _FakeClient(LLMClient):
+    def generate_structured_json(self, system_prompt, user_content, json_schema=None):
+        if '"is_suitable"' in system_prompt:
+            return {"is_suitable": True, "missing_info": "", "potential_task": "选择检验方法"}
+        return {
+            "stem": "应该采用哪种统计检验方法？",
+            "options": {"A": "a", "B": "b", "C": "c", "D": "d"},
+            "answer": "A",
+            "analysis": "...",
+        }
+
+    def generate_text(self, system_prompt, user_content):
+        return user_content
+
+
+generate_question_from_text("三组受试者，每组 200 人，比较二分类结局的比例。", client=_FakeClient())
+t3 = time.perf_counter()
+
+heavy = [m for m in ("openai", "pydantic") if m in sys.modules]
+print(json.dumps({"import": t1 - t0, "first_call": t3 - t2, "heavy_after_call": heavy}))
+"""
+
+_IMPORT_ONLY_CODE = r"""
+import json
+import sys
+import questioner
+print(json.dumps([m for m in ("openai", "pydantic") if m in sys.modules]))
+"""
+
+
+def _run_child(code: str) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def _summary(values: list[float]) -> str:
+    ms = sorted(v * 1000 for v in values)
+    p90 = ms[min(len(ms) - 1, int(len(ms) * 0.9))]
+    return f"median={statistics.median(ms):7.2f} ms  p90={p90:7.2f} ms  min={ms[0]:7.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="子进程重复次数")
+    args = parser.parse_args()
+
+    heavy_on_import = json.loads(_run_child(_IMPORT_ONLY_CODE))
+
+    imports, first_calls = [], []
+    heavy_after_call: list[str] = []
+    for _ in range(args.repeat):
+        sample = json.loads(_run_child(_CHILD_CODE))
+        imports.append(sample["import"])
+        first_calls.append(sample["first_call"])
+        heavy_after_call = sample["heavy_after_call"]
+
+    print(f"import questioner            : {_summary(imports)}")
+    print(f"first generate_question call : {_summary(first_calls)}")
+    print(f"heavy modules after import   : {heavy_on_import or 'none'}")
+    print(f"heavy modules after call     : {heavy_after_call or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+本地模拟的 OpenAI 兼容端点，供基准脚本离线使用。
+
+`POST /v1/chat/completions` 根据 system prompt 返回固定内容：
+- 模块 A 的评估 prompt -> AssessmentResult JSON
+- 模块 C 的出题 prompt -> Question JSON
+- 其它 -> 纯文本
+
+可选的 `latency` 参数用于模拟服务端处理时间（秒）。
+
+用法：
+
+    with MockServer(latency=0.01) as server:
+        client = HTTPClient(model_name="mock", base_url=server.base_url)
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+ASSESSMENT = {"is_suitable": True, "missing_info": "", "potential_task": "选择检验方法"}
+QUESTION = {
+    "stem": "针对上述研究设计和数据类型，研究人员应该采用哪种统计检验方法？",
+    "options": {"A": "卡方检验", "B": "独立样本 t 检验", "C": "单因素方差分析", "D": "配对 t 检验"},
+    "answer": "A",
+    "analysis": "结局为二分类变量，比较多组比例差异应使用卡方检验。",
+}
+CLEANED_CONTEXT = "研究人员希望比较三组受试者（每组约 200 人）中某二分类结局的比例是否存在差异。"
+
+
+def _completion(content: str, model: str, n: int = 1) -> Dict[str, Any]:
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": index,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+            for index in range(n)
+        ],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def mock_reply(body: Dict[str, Any]) -> str:
+    """根据请求体生成模拟回复内容。"""
+    system_prompt = body["messages"][0]["content"]
+    if '"is_suitable"' in system_prompt:
+        return json.dumps(ASSESSMENT, ensure_ascii=False)
+    if '"stem"' in system_prompt:
+        return json.dumps(QUESTION, ensure_ascii=False)
+    return CLEANED_CONTEXT
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        payload = json.dumps(
+            _completion(mock_reply(body), body.get("model", "mock"), body.get("n", 1)),
+            ensure_ascii=False,
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class MockServer:
+    """在后台线程中运行的模拟端点。"""
+
+    def __init__(self, latency: float = 0.0, port: int = 0) -> None:
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.latency = latency
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> MockServer:
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> MockServer:
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="运行模拟的 OpenAI 兼容端点")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = MockServer(latency=args.latency, port=args.port)
+    print(f"Mock endpoint: {server.base_url}")
+    server._httpd.serve_forever()
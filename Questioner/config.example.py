@@ -22,6 +22,11 @@ API_KEY = None
 # - 本地服务: 例如 "http://localhost:8000/v1"
 BASE_URL = None
 
+# 客户端实现（可选）
+# - "openai": 使用 openai SDK（默认）
+# - "http": 直接发送 HTTP 请求的轻量级客户端（安装 h2 后启用 HTTP/2）
+CLIENT_TYPE = "openai"
+
 # ============================================================================
 # 以下内容无需修改
 # ============================================================================
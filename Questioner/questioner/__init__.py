@@ -16,14 +16,36 @@ StatBench Questioner 模块。
 支持灵活的模型配置，可通过 `ModelConfig` 类或直接参数自定义。
 """
 
-from .config import (
-    ModelConfig,
-    get_default_config_from_json,
-    load_configs_from_json,
-)
-from .llm_client import LLMClient, OpenAIClient
-from .models import AssessmentResult, Question
-from .pipeline import generate_question_from_text
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .config import (
+        ModelConfig,
+        get_default_config_from_json,
+        load_configs_from_json,
+    )
+    from .http_client import HTTPClient
+    from .llm_client import LLMClient, OpenAIClient, create_client
+    from .models import AssessmentResult, Question
+    from .pipeline import generate_question_from_text
+
+# 公开名称 -> 所在子模块。首次访问时才导入对应子模块，
+# 避免 `import questioner` 时就加载 openai / pydantic 等较重的依赖。
+_LAZY_ATTRS = {
+    "AssessmentResult": ".models",
+    "Question": ".models",
+    "generate_question_from_text": ".pipeline",
+    "ModelConfig": ".config",
+    "load_configs_from_json": ".config",
+    "get_default_config_from_json": ".config",
+    "LLMClient": ".llm_client",
+    "OpenAIClient": ".llm_client",
+    "create_client": ".llm_client",
+    "HTTPClient": ".http_client",
+}
 
 __all__ = [
     "AssessmentResult",
@@ -34,5 +56,20 @@ __all__ = [
     "get_default_config_from_json",
     "LLMClient",
     "OpenAIClient",
+    "create_client",
+    "HTTPClient",
 ]
 
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 缓存到模块命名空间，之后的访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,586 @@
+"""
+批处理执行模式：把每个阶段的请求写成 JSONL 批文件，一次性提交。
+
+适用于不关心交互延迟的大批量离线任务（如夜间全量语料），
+OpenAI 兼容服务的 Batch API 通常价格更低、吞吐上限更高。
+
+- `OpenAIBatchBackend`: 通过 Batch API 上传、提交、轮询并下载结果；
+- `LocalBatchBackend`: 基于本地文件的替身，可用任意 `LLMClient` 就地处理批文件，
+  或只写出批文件、等待外部进程生成结果文件，便于离线测试。
+
+每个阶段的输出作为下一阶段批文件的输入，逐段语义与 `QuestionerPipeline.run` 一致：
+先评估（本地分类器能判定的片段不进入批次），再对通过评估的片段重写，最后基于重写结果出题；
+预算、进度、多候选与题型设置同样生效（见 `BatchRunner`）。
+
+批次过期（如超过 24h 完成窗口）时，已完成的请求照常取回，只把缺失的请求重新提交。
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .budget import BudgetExceeded, BudgetManager, PassageHold, Reservation
+from .llm_client import LLMClient, structured_output_params
+from .models import AssessmentResult, Question, json_schema_for
+from .prompts import (
+    SYSTEM_PROMPT_ASSESS,
+    SYSTEM_PROMPT_DECONTAMINATE,
+    SYSTEM_PROMPT_GENERATE,
+)
+
+if TYPE_CHECKING:
+    from .progress import Progress
+
+PipelineResult = Tuple[AssessmentResult, Optional[str], Optional[Question]]
+
+# 一条请求的回复：单个候选时为文本，`n > 1` 时为各候选文本的列表
+BatchContent = Union[str, List[str]]
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchError(RuntimeError):
+    """批处理任务失败，或批内某条请求未返回有效结果。"""
+
+
+class BatchExpired(BatchError):
+    """批次在完成窗口内没有全部完成；`partial` 为已完成请求的结果。"""
+
+    def __init__(self, message: str, partial: Dict[str, Union[BatchContent, BatchError]]) -> None:
+        super().__init__(message)
+        self.partial = partial
+
+
+def build_batch_request(
+    custom_id: str,
+    model_name: str,
+    system_prompt: str,
+    user_content: str,
+    json_mode: bool,
+    json_schema: Optional[Dict[str, Any]] = None,
+    structured_output: str = "json_object",
+    n: int = 1,
+) -> Dict[str, Any]:
+    """构造 Batch API 输入文件中的一行；`n > 1` 时一次生成 `n` 个候选。"""
+    body: Dict[str, Any] = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+    }
+    if n > 1:
+        body["n"] = n
+    if json_mode:
+        body.update(structured_output_params(structured_output, json_schema))
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_ENDPOINT,
+        "body": body,
+    }
+
+
+def request_json_schema(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """从请求体的 `response_format` / `guided_json` 中取回目标 JSON Schema；未约束 Schema 时返回 None。"""
+    if "guided_json" in body:
+        return body["guided_json"]
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") != "json_schema":
+        return None
+    spec = response_format.get("json_schema") or {}
+    if "schema" not in spec:
+        return None
+    return {"title": spec.get("name", "response"), **spec["schema"]}
+
+
+def write_jsonl(path: Path, rows: Sequence[Dict[str, Any]]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+
+
+def read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_batch_output(
+    rows: Sequence[Dict[str, Any]],
+) -> Dict[str, Union[BatchContent, BatchError]]:
+    """
+    解析 Batch API 输出文件，返回 custom_id -> 回复内容（多个候选时为列表）；
+    失败的请求对应一个 `BatchError`。
+    """
+    results: Dict[str, Union[BatchContent, BatchError]] = {}
+    for row in rows:
+        custom_id = row["custom_id"]
+        error = row.get("error")
+        response = row.get("response") or {}
+        if error or response.get("status_code", 200) >= 400:
+            results[custom_id] = BatchError(
+                f"批处理请求 {custom_id} 失败：{error or response.get('body')}"
+            )
+            continue
+        choices = (response.get("body") or {})["choices"]
+        contents = [choice["message"].get("content") or "" for choice in choices]
+        results[custom_id] = contents[0] if len(contents) == 1 else contents
+    return results
+
+
+class BatchBackend(ABC):
+    """
+    批处理后端接口。
+
+    一个批次的生命周期：`submit()` 提交 JSONL 请求文件 -> `poll()` 查询状态
+    -> `fetch_results()` 获取 custom_id 到回复内容的映射。
+    """
+
+    def __init__(self, model_name: str, work_dir: Union[str, Path]) -> None:
+        if not model_name:
+            raise ValueError("model_name 不能为空，请指定要使用的模型名称")
+        self.model_name = model_name
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+
+    @abstractmethod
+    def submit(self, requests_path: Path) -> str:
+        """提交请求文件，返回批次 ID。"""
+
+    @abstractmethod
+    def poll(self, batch_id: str) -> str:
+        """
+        返回批次状态："in_progress"、"completed"、"expired"（完成窗口内未全部完成，
+        已完成部分的结果仍可取回）或 "failed"。
+        """
+
+    @abstractmethod
+    def fetch_results(self, batch_id: str) -> Dict[str, Union[BatchContent, BatchError]]:
+        """返回 custom_id -> 回复内容（失败时为 `BatchError`）；过期的批次只包含已完成的请求。"""
+
+    def wait(
+        self,
+        batch_id: str,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Union[BatchContent, BatchError]]:
+        """轮询直到批次完成，返回结果。批次过期时抛出带有部分结果的 `BatchExpired`。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            status = self.poll(batch_id)
+            if status == "completed":
+                return self.fetch_results(batch_id)
+            if status == "expired":
+                raise BatchExpired(f"批次 {batch_id} 已过期", self.fetch_results(batch_id))
+            if status == "failed":
+                raise BatchError(f"批次 {batch_id} 执行失败")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"等待批次 {batch_id} 超时")
+            time.sleep(poll_interval)
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """
+    通过 OpenAI 兼容服务的 Batch API 执行批次。
+
+    请求文件以 `purpose="batch"` 上传，完成窗口默认为 24h。
+    """
+
+    _FAILED_STATUSES = frozenset({"failed", "cancelled", "cancelling"})
+
+    def __init__(
+        self,
+        model_name: str,
+        work_dir: Union[str, Path],
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        completion_window: str = "24h",
+    ) -> None:
+        try:
+            from openai import OpenAI
+        except ImportError as e:
+            raise ImportError("未安装 openai，请运行: pip install openai") from e
+
+        super().__init__(model_name, work_dir)
+        self._client = OpenAI(api_key=api_key, base_url=base_url)
+        self._completion_window = completion_window
+
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, "rb") as f:
+            input_file = self._client.files.create(file=f, purpose="batch")
+        batch = self._client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_ENDPOINT,
+            completion_window=self._completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> str:
+        status = self._client.batches.retrieve(batch_id).status
+        if status in ("completed", "expired"):
+            return status
+        if status in self._FAILED_STATUSES:
+            return "failed"
+        return "in_progress"
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Union[BatchContent, BatchError]]:
+        batch = self._client.batches.retrieve(batch_id)
+        rows: List[Dict[str, Any]] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = self._client.files.content(file_id).text
+            output_path = self.work_dir / f"{batch_id}_{file_id}.jsonl"
+            output_path.write_text(content, encoding="utf-8")
+            rows.extend(json.loads(line) for line in content.splitlines() if line.strip())
+        return parse_batch_output(rows)
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    基于本地文件的批处理替身。
+
+    - 传入 `client` 时，`submit()` 会立即用该客户端逐条处理请求，
+      并按 Batch API 的输出格式写出 `<batch_id>_output.jsonl`；
+    - 不传 `client` 时只写出请求文件，由外部进程生成同名输出文件后再被轮询到。
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        work_dir: Union[str, Path],
+        client: Optional[LLMClient] = None,
+    ) -> None:
+        super().__init__(model_name, work_dir)
+        self._client = client
+
+    def output_path(self, batch_id: str) -> Path:
+        return self.work_dir / f"{batch_id}_output.jsonl"
+
+    def submit(self, requests_path: Path) -> str:
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        if self._client is not None:
+            rows = [self._process(request) for request in read_jsonl(requests_path)]
+            # 先写临时文件再改名，避免轮询方读到写了一半的文件
+            tmp_path = self.output_path(batch_id).with_suffix(".tmp")
+            write_jsonl(tmp_path, rows)
+            tmp_path.replace(self.output_path(batch_id))
+        return batch_id
+
+    def _process(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        body = request["body"]
+        system_prompt = body["messages"][0]["content"]
+        user_content = body["messages"][1]["content"]
+        row: Dict[str, Any] = {"id": uuid.uuid4().hex, "custom_id": request["custom_id"]}
+        n = body.get("n", 1)
+        try:
+            if n > 1:
+                contents = [
+                    json.dumps(candidate, ensure_ascii=False)
+                    for candidate in self._client.generate_json_candidates(
+                        system_prompt, user_content, n, json_schema=request_json_schema(body)
+                    )
+                ]
+            elif "response_format" in body or "guided_json" in body:
+                contents = [
+                    json.dumps(
+                        self._client.generate_structured_json(
+                            system_prompt, user_content, json_schema=request_json_schema(body)
+                        ),
+                        ensure_ascii=False,
+                    )
+                ]
+            else:
+                contents = [self._client.generate_text(system_prompt, user_content)]
+        except Exception as e:
+            row["response"] = None
+            row["error"] = {"message": str(e)}
+            return row
+        choices = [
+            {"index": index, "message": {"role": "assistant", "content": content}}
+            for index, content in enumerate(contents)
+        ]
+        row["response"] = {"status_code": 200, "body": {"choices": choices}}
+        row["error"] = None
+        return row
+
+    def poll(self, batch_id: str) -> str:
+        return "completed" if self.output_path(batch_id).exists() else "in_progress"
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Union[BatchContent, BatchError]]:
+        return parse_batch_output(read_jsonl(self.output_path(batch_id)))
+
+
+class BatchRunner:
+    """
+    以批处理方式执行三阶段流水线。
+
+    参数：
+    - backend: `BatchBackend` 实例。
+    - poll_interval / timeout: 每个阶段等待批次完成时的轮询间隔与超时（秒）。
+    - structured_output: 批处理端点的结构化输出能力，见 `llm_client.STRUCTURED_OUTPUT_MODES`。
+    - budget: 可选的 `BudgetManager`。每个片段开始前按 `hold_passage` 准入，
+      每条请求提交前预留额度、取回结果后结清；额度不足的片段以 `BudgetExceeded` 作为结果。
+    - progress: 可选的 `Progress`，记录片段与各阶段请求的计数。
+    - local_decision: 可选的本地判定函数（如 `ClassifierFilter.local_decision`），
+      返回结论的片段不进入评估批次，返回 None 的片段照常批量评估。
+    - n_candidates: 出题阶段每条请求生成的候选数，大于 1 时按 `candidates.select_candidates` 选优。
+    - question_type: 出题使用的题型名称（见 `question_types`），None 为默认的单选题。
+    - max_resubmits: 批次过期时，缺失请求最多重新提交的次数。
+    """
+
+    def __init__(
+        self,
+        backend: BatchBackend,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+        structured_output: str = "json_object",
+        *,
+        budget: Optional[BudgetManager] = None,
+        progress: Optional[Progress] = None,
+        local_decision: Optional[Callable[[str], Optional[AssessmentResult]]] = None,
+        n_candidates: int = 1,
+        question_type: Optional[str] = None,
+        max_resubmits: int = 2,
+    ) -> None:
+        structured_output_params(structured_output)  # 校验取值
+        if n_candidates < 1:
+            raise ValueError("n_candidates 必须为正整数")
+        if max_resubmits < 0:
+            raise ValueError("max_resubmits 不能为负数")
+        if question_type is None:
+            self._generate_prompt = SYSTEM_PROMPT_GENERATE
+        else:
+            from .question_types import get_question_type
+
+            self._generate_prompt = get_question_type(question_type).system_prompt
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.structured_output = structured_output
+        self.budget = budget
+        self.progress = progress
+        self.local_decision = local_decision
+        self.n_candidates = n_candidates
+        self.question_type = question_type
+        self.max_resubmits = max_resubmits
+
+    def _submit_and_wait(
+        self, stage: str, rows: List[Dict[str, Any]]
+    ) -> Dict[str, Union[BatchContent, BatchError]]:
+        """提交一批请求并等待结果；批次过期时只把缺失的请求重新提交，最多 `max_resubmits` 次。"""
+        results: Dict[str, Union[BatchContent, BatchError]] = {}
+        for attempt in range(self.max_resubmits + 1):
+            requests_path = self.backend.work_dir / f"{stage}_{uuid.uuid4().hex[:8]}.jsonl"
+            write_jsonl(requests_path, rows)
+            batch_id = self.backend.submit(requests_path)
+            try:
+                results.update(self.backend.wait(batch_id, self.poll_interval, self.timeout))
+                return results
+            except BatchExpired as e:
+                results.update(e.partial)
+                rows = [row for row in rows if row["custom_id"] not in results]
+                if not rows:
+                    return results
+                expired = e
+        for row in rows:
+            results[row["custom_id"]] = BatchError(
+                f"{expired}，请求 {row['custom_id']} 重新提交 {self.max_resubmits} 次后仍未完成"
+            )
+        return results
+
+    def _run_stage(
+        self,
+        stage: str,
+        system_prompt: str,
+        inputs: Dict[int, str],
+        json_mode: bool,
+        json_schema: Optional[Dict[str, Any]] = None,
+        n: int = 1,
+    ) -> Dict[int, Union[BatchContent, Exception]]:
+        outcomes: Dict[int, Union[BatchContent, Exception]] = {}
+        reservations: Dict[int, Reservation] = {}
+        if self.budget is not None:
+            for index, text in inputs.items():
+                try:
+                    reservations[index] = self.budget.reserve(
+                        stage, self.backend.model_name, system_prompt, text.strip(), n
+                    )
+                except BudgetExceeded as e:
+                    outcomes[index] = e
+        pending = [index for index in inputs if index not in outcomes]
+        if not pending:
+            return outcomes
+
+        rows = [
+            build_batch_request(
+                f"{stage}-{index}",
+                self.backend.model_name,
+                system_prompt,
+                inputs[index].strip(),
+                json_mode,
+                json_schema=json_schema,
+                structured_output=self.structured_output,
+                n=n,
+            )
+            for index in pending
+        ]
+        progress = self.progress
+        if progress is not None:
+            progress.add(f"calls:{stage}", len(pending))
+            progress.add(f"in_flight:{stage}", len(pending))
+        try:
+            results = self._submit_and_wait(stage, rows)
+        except BaseException:
+            for reservation in reservations.values():
+                self.budget.release(reservation)
+            if progress is not None:
+                progress.add(f"in_flight:{stage}", -len(pending))
+                progress.add(f"call_errors:{stage}", len(pending))
+            raise
+
+        for index in pending:
+            content = results.get(
+                f"{stage}-{index}", BatchError(f"批次缺少请求 {stage}-{index} 的结果")
+            )
+            outcomes[index] = content
+            reservation = reservations.get(index)
+            if isinstance(content, Exception):
+                if reservation is not None:
+                    self.budget.release(reservation)
+                if progress is not None:
+                    progress.add(f"call_errors:{stage}")
+            elif reservation is not None:
+                output = content if isinstance(content, str) else "".join(content)
+                self.budget.commit(reservation, None, output)
+        if progress is not None:
+            progress.add(f"in_flight:{stage}", -len(pending))
+        return outcomes
+
+    def _parse_question(self, content: BatchContent) -> Question:
+        if self.n_candidates == 1:
+            return Question.model_validate(LLMClient._parse_json(content, provider_name="Batch"))
+        from .candidates import select_candidates
+
+        texts = [content] if isinstance(content, str) else content
+        candidates = LLMClient._parse_json_candidates(texts, provider_name="Batch")
+        return select_candidates(candidates).best.question
+
+    def run(
+        self,
+        raw_texts: Sequence[str],
+        return_exceptions: bool = False,
+    ) -> List[Union[PipelineResult, Exception]]:
+        """
+        对一组原始文本执行流水线，结果顺序与输入一致，每项与
+        `QuestionerPipeline.run` 的返回值相同。
+
+        - return_exceptions: 为 False 时，任一片段失败都会在所有阶段结束后抛出首个异常；
+          为 True 时，失败片段对应位置返回异常对象。
+        """
+        outcomes: Dict[int, Union[PipelineResult, Exception]] = {}
+        holds: Dict[int, PassageHold] = {}
+        budget = self.budget
+        progress = self.progress
+        if progress is not None:
+            progress.add("total", len(raw_texts))
+
+        def finish(index: int, outcome: Union[PipelineResult, Exception]) -> None:
+            outcomes[index] = outcome
+            hold = holds.pop(index, None)
+            if hold is not None:
+                budget.release_hold(hold)
+            if progress is not None:
+                progress.record_passage(
+                    None if isinstance(outcome, Exception) else outcome[0].is_suitable
+                )
+
+        assessments: Dict[int, AssessmentResult] = {}
+        undecided: Dict[int, str] = {}
+        try:
+            for index, raw_text in enumerate(raw_texts):
+                try:
+                    local = None if self.local_decision is None else self.local_decision(raw_text)
+                    if local is not None and not local.is_suitable:
+                        finish(index, (local, None, None))
+                        continue
+                    if budget is not None:
+                        holds[index] = budget.hold_passage(
+                            self.backend.model_name, raw_text, self.n_candidates
+                        )
+                except Exception as e:
+                    finish(index, e)
+                    continue
+                if local is not None:
+                    assessments[index] = local
+                else:
+                    undecided[index] = raw_text
+
+            assess_raw = self._run_stage(
+                "assess",
+                SYSTEM_PROMPT_ASSESS,
+                undecided,
+                json_mode=True,
+                json_schema=json_schema_for(AssessmentResult),
+            )
+            for index, content in assess_raw.items():
+                try:
+                    if isinstance(content, Exception):
+                        raise content
+                    assessment = AssessmentResult.model_validate(
+                        LLMClient._parse_json(content, provider_name="Batch")
+                    )
+                except Exception as e:
+                    finish(index, e)
+                    continue
+                if assessment.is_suitable:
+                    assessments[index] = assessment
+                else:
+                    finish(index, (assessment, None, None))
+
+            rewrite_raw = self._run_stage(
+                "rewrite",
+                SYSTEM_PROMPT_DECONTAMINATE,
+                {index: raw_texts[index] for index in sorted(assessments)},
+                json_mode=False,
+            )
+            contexts: Dict[int, str] = {}
+            for index, content in rewrite_raw.items():
+                if isinstance(content, Exception):
+                    finish(index, content)
+                else:
+                    contexts[index] = content.strip()
+
+            generate_raw = self._run_stage(
+                "generate",
+                self._generate_prompt,
+                contexts,
+                json_mode=True,
+                json_schema=json_schema_for(Question),
+                n=self.n_candidates,
+            )
+            for index, content in generate_raw.items():
+                try:
+                    if isinstance(content, Exception):
+                        raise content
+                    question = self._parse_question(content)
+                except Exception as e:
+                    finish(index, e)
+                    continue
+                finish(index, (assessments[index], contexts[index], question))
+        finally:
+            for hold in holds.values():
+                budget.release_hold(hold)
+
+        results = [outcomes[index] for index in range(len(raw_texts))]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
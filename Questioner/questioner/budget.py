@@ -0,0 +1,407 @@
+"""
+token 与费用预算：限制一次流水线运行最多花费多少 token / 多少钱。
+
+- 调用前用本地 tokenizer 估计 prompt token，加上该阶段预期的输出 token 作为预留；
+- 调用后用服务返回的 `usage` 对账，没有返回时用本地估计补齐；
+- 限额分为整次运行、每个阶段（assess / rewrite / generate）、每个模型三个维度，
+  每个维度都有软限额与硬限额；超过硬限额的调用直接拒绝；
+- 超过整次运行的软限额后，不再开始新的片段（模块 A），但已通过模块 A 的片段
+  仍可完成模块 B / C；开始新片段时（`hold_passage()`）确认剩余额度足以走完 B / C，
+  并为它保留这部分额度直到片段结束，避免并发的新片段把已通过片段所需的钱花掉，
+  使其在模块 A 已付费后才因预算不足而失败。
+
+示例：
+```python
+budget = BudgetManager(
+    run_limit=BudgetLimit(max_cost=20.0),
+    stage_limits={"assess": BudgetLimit(max_tokens=2_000_000)},
+    prices={"gpt-4o": ModelPrice(prompt=2.5, completion=10.0)},
+)
+pipeline = QuestionerPipeline(client, budget=budget)
+```
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .llm_client import LLMClient
+from .prompts import SYSTEM_PROMPT_DECONTAMINATE, SYSTEM_PROMPT_GENERATE
+from .tokens import count_chat_tokens, count_tokens
+
+# 各阶段预期的输出 token 数，用于调用前的预留
+DEFAULT_COMPLETION_ESTIMATES: Dict[str, int] = {
+    "assess": 150,
+    "rewrite": 500,
+    "generate": 700,
+}
+
+
+class BudgetExceeded(RuntimeError):
+    """调用会超出预算限额时抛出。`scope` 为触发限额的维度，例如 "run" 或 "stage:assess"。"""
+
+    def __init__(self, message: str, scope: str, soft: bool = False) -> None:
+        super().__init__(message)
+        self.scope = scope
+        self.soft = soft
+
+
+@dataclass
+class ModelPrice:
+    """模型单价，单位为每百万 token 的费用。"""
+
+    prompt: float
+    completion: float
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt + completion_tokens * self.completion) / 1_000_000
+
+
+@dataclass
+class BudgetLimit:
+    """
+    单个维度的限额。`max_tokens` 与 `max_cost` 可任选其一或同时设置；
+    达到硬限额的 `soft_ratio` 比例即视为超过软限额。
+    """
+
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+    soft_ratio: float = 0.8
+
+
+@dataclass
+class _Usage:
+    tokens: int = 0
+    cost: float = 0.0
+    reserved_tokens: int = 0
+    reserved_cost: float = 0.0
+    held_tokens: int = 0
+    held_cost: float = 0.0
+    calls: int = 0
+
+
+@dataclass
+class Reservation:
+    """一次调用的预留额度，调用结束后由 `commit()` 或 `release()` 结清。"""
+
+    stage: str
+    model: str
+    tokens: int
+    cost: float
+    prompt_tokens: int
+
+
+@dataclass
+class PassageHold:
+    """一个已开始的片段为模块 B / C 保留的额度，片段结束后由 `release_hold()` 释放。"""
+
+    model: str
+    tokens: int
+    cost: float
+
+
+class BudgetManager:
+    """
+    线程安全的预算管理器，在三个阶段之间共享。
+
+    参数：
+    - run_limit: 整次运行的限额。
+    - stage_limits: 阶段名 -> 限额。
+    - model_limits: 模型名 -> 限额。
+    - prices: 模型名 -> 单价；未列出的模型费用按 0 计，但仍受 token 限额约束。
+    - completion_estimates: 阶段名 -> 预期输出 token 数。
+    """
+
+    def __init__(
+        self,
+        run_limit: Optional[BudgetLimit] = None,
+        stage_limits: Optional[Dict[str, BudgetLimit]] = None,
+        model_limits: Optional[Dict[str, BudgetLimit]] = None,
+        prices: Optional[Dict[str, ModelPrice]] = None,
+        completion_estimates: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self._limits: Dict[str, BudgetLimit] = {}
+        if run_limit is not None:
+            self._limits["run"] = run_limit
+        for stage, limit in (stage_limits or {}).items():
+            self._limits[f"stage:{stage}"] = limit
+        for model, limit in (model_limits or {}).items():
+            self._limits[f"model:{model}"] = limit
+        self._prices = dict(prices or {})
+        self._estimates = {**DEFAULT_COMPLETION_ESTIMATES, **(completion_estimates or {})}
+        self._usage: Dict[str, _Usage] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 费用与限额
+    # ------------------------------------------------------------------
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        price = self._prices.get(model)
+        return price.cost(prompt_tokens, completion_tokens) if price else 0.0
+
+    @staticmethod
+    def _scopes(stage: str, model: str) -> List[str]:
+        return ["run", f"stage:{stage}", f"model:{model}"]
+
+    def _fraction(
+        self,
+        scope: str,
+        extra_tokens: int = 0,
+        extra_cost: float = 0.0,
+        include_holds: bool = False,
+    ) -> float:
+        """
+        scope 已用（含预留）占硬限额的比例，取 token 与费用两者中较大者。
+        `include_holds` 为 True 时还计入为已开始的片段保留的模块 B / C 额度。
+        """
+        limit = self._limits.get(scope)
+        if limit is None:
+            return 0.0
+        usage = self._usage.get(scope, _Usage())
+        held_tokens = usage.held_tokens if include_holds else 0
+        held_cost = usage.held_cost if include_holds else 0.0
+        fractions = [0.0]
+        if limit.max_tokens:
+            tokens = usage.tokens + usage.reserved_tokens + held_tokens + extra_tokens
+            fractions.append(tokens / limit.max_tokens)
+        if limit.max_cost:
+            cost = usage.cost + usage.reserved_cost + held_cost + extra_cost
+            fractions.append(cost / limit.max_cost)
+        return max(fractions)
+
+    def _check_soft(self) -> None:
+        """整次运行或模块 A 超过软限额时拒绝开始新的片段；调用方需持有 `_lock`。"""
+        for scope in ("run", "stage:assess"):
+            limit = self._limits.get(scope)
+            if limit is not None and self._fraction(scope) >= limit.soft_ratio:
+                raise BudgetExceeded(
+                    f"预算接近上限：{scope} 已超过软限额，不再开始新的片段",
+                    scope,
+                    soft=True,
+                )
+
+    def soft_exceeded(self, scope: str = "run") -> bool:
+        """scope 是否已超过软限额。"""
+        limit = self._limits.get(scope)
+        if limit is None:
+            return False
+        with self._lock:
+            return self._fraction(scope) >= limit.soft_ratio
+
+    def allow_new_passage(self) -> bool:
+        """是否还可以开始处理新的片段（即调用模块 A）。"""
+        return not (self.soft_exceeded("run") or self.soft_exceeded("stage:assess"))
+
+    # ------------------------------------------------------------------
+    # 预留与对账
+    # ------------------------------------------------------------------
+
+    def _follow_up_estimate(
+        self, model: str, raw_text: str, n_candidates: int = 1
+    ) -> tuple[int, float]:
+        """估计一个通过模块 A 的片段走完模块 B / C 还需要的 token 与费用。"""
+        rewrite_prompt = count_chat_tokens(SYSTEM_PROMPT_DECONTAMINATE, raw_text, model)
+        generate_prompt = (
+            count_tokens(SYSTEM_PROMPT_GENERATE, model) + self._estimates["rewrite"]
+        )
+        prompt_tokens = rewrite_prompt + generate_prompt
+        completion_tokens = self._estimates["rewrite"] + self._estimates["generate"] * n_candidates
+        return prompt_tokens + completion_tokens, self.cost(model, prompt_tokens, completion_tokens)
+
+    def hold_passage(self, model: str, raw_text: str, n_candidates: int = 1) -> PassageHold:
+        """
+        开始一个新片段：确认整次运行未超过软限额、剩余额度足以让该片段走完模块 B / C，
+        并保留这部分额度。之后模块 A 的调用（即新的花费）必须给所有保留额度留出余地，
+        模块 B / C 的调用则可以使用它们。片段结束（无论成功、被拒绝或失败）后调用 `release_hold()`。
+        """
+        tokens, cost = self._follow_up_estimate(model, raw_text, n_candidates)
+        with self._lock:
+            self._check_soft()
+            for scope in ("run", f"model:{model}"):
+                if self._fraction(scope, tokens, cost, include_holds=True) > 1.0:
+                    raise BudgetExceeded(
+                        f"预算不足：{scope} 的剩余额度不足以完成一个新片段", scope
+                    )
+            for scope in ("run", f"model:{model}"):
+                usage = self._usage.setdefault(scope, _Usage())
+                usage.held_tokens += tokens
+                usage.held_cost += cost
+        return PassageHold(model, tokens, cost)
+
+    def release_hold(self, hold: PassageHold) -> None:
+        """释放 `hold_passage()` 保留的额度。"""
+        with self._lock:
+            for scope in ("run", f"model:{hold.model}"):
+                usage = self._usage.setdefault(scope, _Usage())
+                usage.held_tokens -= hold.tokens
+                usage.held_cost -= hold.cost
+
+    def reserve(
+        self,
+        stage: str,
+        model: str,
+        system_prompt: str,
+        user_content: str,
+        n: int = 1,
+    ) -> Reservation:
+        """
+        调用前预留额度。任一维度超过硬限额时抛出 `BudgetExceeded`。
+
+        `n` 为一次请求生成的候选数，预期输出 token 按 `n` 倍计。
+        对模块 A 的调用额外要求：整次运行未超过软限额，且不占用为已开始的片段保留的模块 B / C 额度
+        （见 `hold_passage()`）；模块 B / C 的调用可以使用这些保留额度。
+        """
+        prompt_tokens = count_chat_tokens(system_prompt, user_content, model)
+        completion_tokens = self._estimates.get(stage, 0) * n
+        tokens = prompt_tokens + completion_tokens
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        new_passage = stage == "assess"
+        with self._lock:
+            for scope in self._scopes(stage, model):
+                if self._fraction(scope, tokens, cost, include_holds=new_passage) > 1.0:
+                    raise BudgetExceeded(f"预算不足：{scope} 将超过硬限额", scope)
+            if new_passage:
+                self._check_soft()
+            for scope in self._scopes(stage, model):
+                usage = self._usage.setdefault(scope, _Usage())
+                usage.reserved_tokens += tokens
+                usage.reserved_cost += cost
+        return Reservation(stage, model, tokens, cost, prompt_tokens)
+
+    def _settle(self, reservation: Reservation, tokens: int, cost: float) -> None:
+        with self._lock:
+            for scope in self._scopes(reservation.stage, reservation.model):
+                usage = self._usage.setdefault(scope, _Usage())
+                usage.reserved_tokens -= reservation.tokens
+                usage.reserved_cost -= reservation.cost
+                usage.tokens += tokens
+                usage.cost += cost
+                usage.calls += 1
+
+    def commit(
+        self,
+        reservation: Reservation,
+        usage: Optional[Dict[str, int]],
+        output_text: str = "",
+    ) -> None:
+        """
+        用实际用量结清预留。`usage` 为 None 时，prompt 使用预留时的估计值，
+        completion 由 `output_text` 在本地估计。
+        """
+        if usage is None:
+            prompt_tokens = reservation.prompt_tokens
+            completion_tokens = count_tokens(output_text, reservation.model)
+        else:
+            prompt_tokens = usage["prompt_tokens"]
+            completion_tokens = usage["completion_tokens"]
+        self._settle(
+            reservation,
+            prompt_tokens + completion_tokens,
+            self.cost(reservation.model, prompt_tokens, completion_tokens),
+        )
+
+    def release(self, reservation: Reservation) -> None:
+        """调用失败时释放预留。失败请求的 prompt 仍按估计值计入（服务端通常也会计费）。"""
+        self._settle(
+            reservation,
+            reservation.prompt_tokens,
+            self.cost(reservation.model, reservation.prompt_tokens, 0),
+        )
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """各维度的已用 token、费用、调用次数与占限额比例。"""
+        with self._lock:
+            return {
+                scope: {
+                    "tokens": usage.tokens,
+                    "cost": round(usage.cost, 6),
+                    "calls": usage.calls,
+                    "fraction_of_limit": round(self._fraction(scope), 4),
+                }
+                for scope, usage in sorted(self._usage.items())
+            }
+
+
+class BudgetedClient(LLMClient):
+    """
+    为某个阶段包装一个 `LLMClient`：每次调用前向 `BudgetManager` 预留额度，调用后对账。
+
+    一般无需直接使用，`QuestionerPipeline(client, budget=...)` 会为三个阶段分别创建。
+    """
+
+    def __init__(self, client: LLMClient, budget: BudgetManager, stage: str) -> None:
+        self._client = client
+        self._budget = budget
+        self._stage = stage
+        self._model_name = client.model_name or "unknown"
+
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        return self._client.last_usage
+
+    @property
+    def last_retries(self) -> int:
+        return self._client.last_retries
+
+    def generate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        reservation = self._budget.reserve(self._stage, self._model_name, system_prompt, user_content)
+        try:
+            result = self._client.generate_structured_json(
+                system_prompt, user_content, json_schema=json_schema
+            )
+        except Exception:
+            self._budget.release(reservation)
+            raise
+        self._budget.commit(
+            reservation,
+            self._client.last_usage,
+            json.dumps(result, ensure_ascii=False),
+        )
+        return result
+
+    def generate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        reservation = self._budget.reserve(self._stage, self._model_name, system_prompt, user_content)
+        try:
+            result = self._client.generate_text(system_prompt, user_content)
+        except Exception:
+            self._budget.release(reservation)
+            raise
+        self._budget.commit(reservation, self._client.last_usage, result)
+        return result
+
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        reservation = self._budget.reserve(
+            self._stage, self._model_name, system_prompt, user_content, n=n
+        )
+        try:
+            result = self._client.generate_json_candidates(
+                system_prompt, user_content, n, json_schema=json_schema
+            )
+        except Exception:
+            self._budget.release(reservation)
+            raise
+        self._budget.commit(
+            reservation,
+            self._client.last_usage,
+            json.dumps(result, ensure_ascii=False),
+        )
+        return result
@@ -0,0 +1,148 @@
+"""
+模块 C 的多候选生成：一次请求 `n` 个候选（chat completions 的 `n` 参数），在本地校验并挑选最优者。
+
+prompt 只编码一次，`n` 个候选的成本接近一次调用；相比某个 `Question` 校验失败后整体重跑模块 C，
+这样既省钱又省一次往返。挑选完全在本地进行：
+
+1. 硬性条件（不满足即淘汰）：
+   - 通过 `Question` 校验，选项键恰为 A/B/C/D，答案是其中之一；
+   - 四个选项规范化后互不相同；
+   - 无泄漏：正确选项的文本没有原样出现在题干中。
+2. 软性扣分（用于排序）：
+   - 题干提到了正确选项对应的统计方法（去污染失效）；
+   - 正确选项明显长于干扰项（常见的答案提示）；
+   - 解析为空。
+
+其余通过硬性条件的候选作为变体题保留。
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence
+
+from pydantic import ValidationError
+
+from .methods import UNLABELED, tag_method
+from .models import OPTION_KEYS, Question
+
+# 正确选项长度超过干扰项平均长度的这个倍数时扣分
+LENGTH_GIVEAWAY_RATIO = 1.5
+
+_PENALTIES = {
+    "method_in_stem": 0.5,
+    "length_giveaway": 0.2,
+    "empty_analysis": 0.2,
+}
+
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[\s.,;:!?，。；：！？、()（）\"'“”‘’]+")
+
+
+def _normalize(text: str) -> str:
+    return _PUNCTUATION.sub(" ", text.lower()).strip()
+
+
+@dataclass
+class Candidate:
+    """一个通过硬性条件的候选题，`score` 越高越好（满分 1.0），`issues` 为扣分原因。"""
+
+    question: Question
+    score: float
+    issues: List[str] = field(default_factory=list)
+
+
+@dataclass
+class CandidateSet:
+    """
+    一次多候选生成的结果。
+
+    - best: 得分最高的候选。
+    - variants: 其余通过硬性条件、且与已选题目不重复的候选，按得分降序，可作为变体题。
+    - rejected: 被淘汰的原始候选及原因。
+    """
+
+    best: Candidate
+    variants: List[Candidate] = field(default_factory=list)
+    rejected: List[tuple[Dict[str, Any], str]] = field(default_factory=list)
+
+
+def check_question(question: Question) -> List[str]:
+    """返回不满足的硬性条件列表；为空表示通过。"""
+    problems: List[str] = []
+    if sorted(question.options) != list(OPTION_KEYS):
+        problems.append("options_keys")
+    if question.answer not in question.options:
+        problems.append("answer_not_in_options")
+        return problems
+
+    normalized = [_normalize(text) for text in question.options.values()]
+    if len(set(normalized)) != len(normalized) or not all(normalized):
+        problems.append("duplicate_options")
+
+    answer_text = _normalize(question.options[question.answer])
+    if answer_text and answer_text in _normalize(question.stem):
+        problems.append("answer_leak")
+    return problems
+
+
+def score_question(question: Question) -> Candidate:
+    """按软性条件给通过硬性条件的题目打分。"""
+    issues: List[str] = []
+    answer_text = question.options[question.answer]
+    answer_method = tag_method(answer_text)
+
+    if answer_method != UNLABELED and tag_method(question.stem) == answer_method:
+        issues.append("method_in_stem")
+
+    distractors = [text for key, text in question.options.items() if key != question.answer]
+    mean_length = sum(len(text) for text in distractors) / max(len(distractors), 1)
+    if mean_length and len(answer_text) > LENGTH_GIVEAWAY_RATIO * mean_length:
+        issues.append("length_giveaway")
+
+    if not _WHITESPACE.sub("", question.analysis):
+        issues.append("empty_analysis")
+
+    score = 1.0 - sum(_PENALTIES[issue] for issue in issues)
+    return Candidate(question=question, score=round(score, 4), issues=issues)
+
+
+def _identity(question: Question) -> tuple[str, str]:
+    return _normalize(question.stem), _normalize(question.options[question.answer])
+
+
+def select_candidates(raw_candidates: Sequence[Dict[str, Any]]) -> CandidateSet:
+    """
+    校验并挑选候选。得分相同时保持原始顺序（即模型返回的顺序）。
+
+    没有任何候选通过硬性条件时抛出 ValueError，调用方可以像单候选校验失败时一样重试。
+    """
+    accepted: List[Candidate] = []
+    rejected: List[tuple[Dict[str, Any], str]] = []
+    for raw in raw_candidates:
+        try:
+            question = Question.model_validate(raw)
+        except ValidationError as e:
+            rejected.append((raw, f"schema: {e.error_count()} 个字段校验失败"))
+            continue
+        problems = check_question(question)
+        if problems:
+            rejected.append((raw, ", ".join(problems)))
+            continue
+        accepted.append(score_question(question))
+
+    if not accepted:
+        reasons = "; ".join(reason for _, reason in rejected)
+        raise ValueError(f"{len(rejected)} 个候选均未通过校验：{reasons}")
+
+    # sorted 是稳定排序，得分相同时保持原始顺序
+    ranked = sorted(accepted, key=lambda candidate: candidate.score, reverse=True)
+    best, variants = ranked[0], []
+    seen = {_identity(best.question)}
+    for candidate in ranked[1:]:
+        identity = _identity(candidate.question)
+        if identity not in seen:
+            seen.add(identity)
+            variants.append(candidate)
+    return CandidateSet(best=best, variants=variants, rejected=rejected)
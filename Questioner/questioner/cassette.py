@@ -0,0 +1,247 @@
+"""
+录制 / 回放客户端：把一次真实运行的全部请求与响应录进 cassette 文件，之后离线、确定性地重放。
+
+调试或剖析流水线时不必再访问在线端点，每次运行的结果也完全一致；整库运行与基准测试
+可以按 CPU 速度回放，用于回归测试与性能测试。
+
+cassette 文件是只追加写入的文本文件，每行一条记录：
+
+    <64 位请求哈希>\\t<JSON: 响应、token 用量、录制时的延迟>
+
+- 请求哈希与 `singleflight.request_key` 相同（方法、模型、prompt、JSON Schema），文件中不保存 prompt 原文；
+- 打开时只读取每行开头的哈希建立 {哈希: [偏移量, ...]} 索引，响应在命中时才按偏移量读取；
+- 同一请求录制了多次时按录制顺序依次回放，用完后重复最后一条；
+- 进程中断留下的不完整末行在下次以追加方式打开时被截掉。
+
+示例：
+```python
+# 录制
+with CassetteClient("run.cassette", client=HTTPClient(...), mode="record") as client:
+    QuestionerPipeline(client).run(raw_text)
+
+# 回放：无需网络；latency_scale=1.0 时按录制时的延迟 sleep
+with CassetteClient("run.cassette", model_name="qwen-plus", mode="replay") as client:
+    QuestionerPipeline(client).run(raw_text)
+```
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .llm_client import LLMClient
+from .singleflight import request_key
+
+CASSETTE_MODES = ("record", "replay", "auto")
+
+_KEY_LENGTH = 64
+
+
+class CassetteMissError(LookupError):
+    """回放模式下 cassette 中没有对应请求的记录。"""
+
+
+@dataclass
+class CassetteStats:
+    """`hits` 为回放的请求数，`misses` 为未命中的请求数，`recorded` 为新录制的记录数。"""
+
+    hits: int = 0
+    misses: int = 0
+    recorded: int = 0
+
+    def to_dict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+class CassetteClient(LLMClient):
+    """
+    录制 / 回放 `LLMClient` 包装器。
+
+    参数：
+    - path: cassette 文件路径。
+    - client: 被包装的真实客户端；"record" 与 "auto" 模式必须提供。
+    - mode:
+      - "record": 全部请求转发给 `client`，并把响应追加写入 cassette；
+      - "replay": 只从 cassette 回放，未命中时抛出 `CassetteMissError`；
+      - "auto": 命中则回放，未命中则转发并录制。
+    - model_name: 请求哈希中使用的模型名称，默认取 `client.model_name`。
+      只回放、不提供 `client` 时须与录制时一致。
+    - latency_scale: 回放时按录制延迟的这个倍数 sleep，默认 0 即立即返回。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        client: Optional[LLMClient] = None,
+        *,
+        mode: str = "replay",
+        model_name: Optional[str] = None,
+        latency_scale: float = 0.0,
+    ) -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知的 mode: {mode!r}，可选值为 {CASSETTE_MODES}")
+        if mode != "replay" and client is None:
+            raise ValueError(f"mode={mode!r} 需要提供 client")
+        if latency_scale < 0:
+            raise ValueError("latency_scale 不能为负数")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.stats = CassetteStats()
+        self._client = client
+        self._model_name = model_name or (client.model_name if client is not None else None)
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[int]] = {}
+        self._cursor: Dict[str, int] = {}
+
+        if mode == "replay" and not self.path.exists():
+            raise FileNotFoundError(f"cassette 文件不存在: {self.path}")
+        self._reader = None
+        self._writer = None
+        if self.path.exists():
+            self._build_index()
+        if mode != "replay":
+            self._writer = open(self.path, "ab")
+        if self.path.exists():
+            self._reader = open(self.path, "rb")
+
+    # ------------------------------------------------------------------
+    # 文件与索引
+    # ------------------------------------------------------------------
+
+    def _build_index(self) -> None:
+        offset = 0
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n") and line[_KEY_LENGTH : _KEY_LENGTH + 1] == b"\t":
+                    key = line[:_KEY_LENGTH].decode("ascii")
+                    self._index.setdefault(key, []).append(offset)
+                    valid_end = offset + len(line)
+                offset += len(line)
+        if valid_end < offset and self.mode != "replay":
+            # 截掉中断时写了一半的末行，保证新记录从行首开始
+            os.truncate(self.path, valid_end)
+
+    def __len__(self) -> int:
+        return sum(len(offsets) for offsets in self._index.values())
+
+    def _read(self, offset: int) -> Dict[str, Any]:
+        # 调用方持有 self._lock
+        assert self._reader is not None
+        self._reader.seek(offset)
+        line = self._reader.readline()
+        return json.loads(line[_KEY_LENGTH + 1 :])
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            offsets = self._index.get(key)
+            if not offsets:
+                return None
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+            return self._read(offsets[min(position, len(offsets) - 1)])
+
+    def _append(self, key: str, record: Dict[str, Any]) -> None:
+        assert self._writer is not None
+        line = key.encode("ascii") + b"\t" + json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._lock:
+            offset = self._writer.tell()
+            self._writer.write(line)
+            self._writer.flush()
+            self._index.setdefault(key, []).append(offset)
+            # 已录制的请求本次运行不再回放
+            self._cursor[key] = len(self._index[key])
+            self.stats.recorded += 1
+            if self._reader is None:
+                self._reader = open(self.path, "rb")
+
+    def close(self) -> None:
+        for handle in (self._writer, self._reader):
+            if handle is not None:
+                handle.close()
+
+    def __enter__(self) -> CassetteClient:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 录制与回放
+    # ------------------------------------------------------------------
+
+    def _call(self, key: str, fn: Callable[[], Any]) -> Any:
+        if self.mode != "record":
+            record = self._lookup(key)
+            if record is not None:
+                with self._lock:
+                    self.stats.hits += 1
+                if self.latency_scale:
+                    time.sleep(record.get("latency", 0.0) * self.latency_scale)
+                self._record_usage(record.get("usage"))
+                return record["response"]
+            with self._lock:
+                self.stats.misses += 1
+            if self.mode == "replay":
+                raise CassetteMissError(f"cassette 中没有该请求的记录（请求哈希 {key}）")
+
+        assert self._client is not None
+        started = time.perf_counter()
+        response = fn()
+        latency = time.perf_counter() - started
+        usage = self._client.last_usage
+        self._record_usage(usage)
+        self._append(
+            key,
+            {"response": response, "usage": usage, "latency": round(latency, 6)},
+        )
+        return response
+
+    def generate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        key = request_key("json", self._model_name, system_prompt, user_content, json_schema)
+        return self._call(
+            key,
+            lambda: self._client.generate_structured_json(  # type: ignore[union-attr]
+                system_prompt, user_content, json_schema=json_schema
+            ),
+        )
+
+    def generate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        key = request_key("text", self._model_name, system_prompt, user_content)
+        return self._call(
+            key,
+            lambda: self._client.generate_text(system_prompt, user_content),  # type: ignore[union-attr]
+        )
+
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        key = request_key(
+            f"json_candidates:{n}", self._model_name, system_prompt, user_content, json_schema
+        )
+        return self._call(
+            key,
+            lambda: self._client.generate_json_candidates(  # type: ignore[union-attr]
+                system_prompt, user_content, n, json_schema=json_schema
+            ),
+        )
@@ -0,0 +1,512 @@
+"""
+本地的适用性分类器：用历史的模块 A 结论训练，挡在 `DataQualityFilter` 前面。
+
+运行几轮之后已经积累了大量 `raw_text -> is_suitable` 标注，但每个新片段仍要付一次 LLM 调用。
+这里训练一个只需 CPU 的小模型（哈希 n-gram 特征 + NumPy 逻辑回归），只把不确定的片段交给 LLM：
+
+- 特征：小写化、数字归一为 0 后的字符 2–3 gram 与词 unigram，经 CRC32 哈希到固定维度，行 L2 归一化；
+- 模型：带 L2 正则的逻辑回归，AdaGrad 小批量训练；
+- `ClassifierFilter` 与 `DataQualityFilter` 接口相同：概率低于 `reject_below` 直接判为不适合，
+  高于 `accept_above` 直接判为适合（默认关闭），其余交给 LLM，并把 LLM 的结论追加写入标注文件；
+  `QuestionerPipeline.run` 先调用 `local_decision()`，只对交给 LLM 的片段推测执行模块 B；
+- 主动学习：`explore_rate` 比例的高置信片段仍交给 LLM，保证标注分布无偏、校准可以持续评估；
+  `select_for_labeling()` 按不确定性挑选最值得送去标注的片段；
+- `calibration_report()` 给出分箱校准表、ECE、Brier 分数，以及不同阈值下本地可决定的比例与错误率。
+
+示例：
+```python
+texts, labels = load_labels("labels.jsonl")
+classifier = SuitabilityClassifier().fit(texts, labels)
+print(classifier.calibration_report(valid_texts, valid_labels).format())
+classifier.save("suitability.npz")
+
+pipeline = QuestionerPipeline(client)
+pipeline.filter = ClassifierFilter(pipeline.filter, classifier, label_path="labels.jsonl")
+```
+
+命令行：
+
+    python -m questioner.classifier --labels labels.jsonl --out suitability.npz
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .models import AssessmentResult
+
+_DIGITS = re.compile(r"\d")
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+
+# ----------------------------------------------------------------------
+# 特征
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class _SparseRows:
+    """CSR 形式的稀疏特征矩阵。"""
+
+    indices: np.ndarray
+    values: np.ndarray
+    indptr: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def rows(self, selection: np.ndarray) -> _SparseRows:
+        starts = self.indptr[selection]
+        lengths = self.indptr[selection + 1] - starts
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        take = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return _SparseRows(self.indices[take], self.values[take], indptr)
+
+    def row_ids(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        products = weights[self.indices] * self.values
+        return np.bincount(self.row_ids(), weights=products, minlength=len(self))
+
+
+def _ngrams(text: str, char_ngrams: tuple[int, ...]) -> List[str]:
+    normalized = _DIGITS.sub("0", _WHITESPACE.sub(" ", text.lower())).strip()
+    grams = [f"w:{word}" for word in _WORD.findall(normalized)]
+    for n in char_ngrams:
+        grams.extend(normalized[i : i + n] for i in range(len(normalized) - n + 1))
+    return grams
+
+
+def hash_features(
+    texts: Sequence[str],
+    n_features: int = 2**18,
+    char_ngrams: tuple[int, ...] = (2, 3),
+) -> _SparseRows:
+    """把文本转换为哈希 n-gram 特征（二值、行 L2 归一化）。"""
+    indices: List[np.ndarray] = []
+    indptr = [0]
+    for text in texts:
+        buckets = np.unique(
+            np.fromiter(
+                (zlib.crc32(gram.encode("utf-8")) % n_features for gram in _ngrams(text, char_ngrams)),
+                dtype=np.int64,
+            )
+        )
+        indices.append(buckets)
+        indptr.append(indptr[-1] + len(buckets))
+    flat = np.concatenate(indices) if indices else np.array([], dtype=np.int64)
+    lengths = np.diff(indptr)
+    norms = np.repeat(1.0 / np.sqrt(np.maximum(lengths, 1)), lengths)
+    return _SparseRows(flat, norms.astype(np.float64), np.asarray(indptr, dtype=np.int64))
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -35, 35)))
+
+
+# ----------------------------------------------------------------------
+# 校准报告
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class CalibrationBin:
+    low: float
+    high: float
+    count: int
+    mean_predicted: float
+    observed_rate: float
+
+
+@dataclass
+class ThresholdCoverage:
+    """在 (reject_below, accept_above) 阈值下本地可决定的片段比例及其错误率。"""
+
+    reject_below: float
+    accept_above: Optional[float]
+    coverage: float
+    error_rate: float
+
+
+@dataclass
+class CalibrationReport:
+    """分类器在带标注数据上的校准与覆盖情况。"""
+
+    n: int
+    accuracy: float
+    brier: float
+    ece: float
+    bins: List[CalibrationBin] = field(default_factory=list)
+    thresholds: List[ThresholdCoverage] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "n": self.n,
+            "accuracy": self.accuracy,
+            "brier": self.brier,
+            "ece": self.ece,
+            "bins": [bin.__dict__ for bin in self.bins],
+            "thresholds": [threshold.__dict__ for threshold in self.thresholds],
+        }
+
+    def format(self) -> str:
+        lines = [
+            f"n={self.n} accuracy={self.accuracy:.3f} brier={self.brier:.4f} ece={self.ece:.4f}",
+            "bin            count  predicted  observed",
+        ]
+        for bin in self.bins:
+            if bin.count:
+                lines.append(
+                    f"[{bin.low:.1f}, {bin.high:.1f})  {bin.count:>7}  {bin.mean_predicted:>9.3f}  {bin.observed_rate:>8.3f}"
+                )
+        lines.append("reject_below  accept_above  coverage  error_rate")
+        for threshold in self.thresholds:
+            accept = f"{threshold.accept_above:.2f}" if threshold.accept_above is not None else "-"
+            lines.append(
+                f"{threshold.reject_below:>12.2f}  {accept:>12}  {threshold.coverage:>8.3f}  {threshold.error_rate:>10.4f}"
+            )
+        return "\n".join(lines)
+
+
+_DEFAULT_THRESHOLDS = ((0.02, None), (0.05, None), (0.1, None), (0.05, 0.98), (0.1, 0.95))
+
+
+def _calibration_report(
+    probabilities: np.ndarray,
+    labels: np.ndarray,
+    n_bins: int = 10,
+    thresholds: Sequence[tuple[float, Optional[float]]] = _DEFAULT_THRESHOLDS,
+) -> CalibrationReport:
+    n = len(labels)
+    if n == 0:
+        raise ValueError("没有可用于评估的样本")
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    assignment = np.clip(np.digitize(probabilities, edges[1:-1]), 0, n_bins - 1)
+    bins: List[CalibrationBin] = []
+    ece = 0.0
+    for index in range(n_bins):
+        mask = assignment == index
+        count = int(mask.sum())
+        predicted = float(probabilities[mask].mean()) if count else 0.0
+        observed = float(labels[mask].mean()) if count else 0.0
+        ece += count / n * abs(predicted - observed)
+        bins.append(CalibrationBin(float(edges[index]), float(edges[index + 1]), count, predicted, observed))
+
+    coverages: List[ThresholdCoverage] = []
+    for reject_below, accept_above in thresholds:
+        rejected = probabilities < reject_below
+        accepted = probabilities > accept_above if accept_above is not None else np.zeros(n, dtype=bool)
+        decided = rejected | accepted
+        errors = (rejected & (labels == 1)) | (accepted & (labels == 0))
+        coverages.append(
+            ThresholdCoverage(
+                reject_below,
+                accept_above,
+                coverage=float(decided.mean()),
+                error_rate=float(errors.sum() / decided.sum()) if decided.any() else 0.0,
+            )
+        )
+    return CalibrationReport(
+        n=n,
+        accuracy=float(((probabilities >= 0.5) == (labels == 1)).mean()),
+        brier=float(np.mean((probabilities - labels) ** 2)),
+        ece=float(ece),
+        bins=bins,
+        thresholds=coverages,
+    )
+
+
+# ----------------------------------------------------------------------
+# 分类器
+# ----------------------------------------------------------------------
+
+
+class SuitabilityClassifier:
+    """
+    哈希 n-gram 逻辑回归，预测片段通过模块 A 的概率。
+
+    参数：
+    - n_features: 哈希空间维度。
+    - char_ngrams: 使用的字符 n-gram 长度。
+    - l2: L2 正则系数。
+    - learning_rate / epochs / batch_size: AdaGrad 小批量训练参数。
+    - seed: 打乱顺序的随机种子。
+    """
+
+    def __init__(
+        self,
+        n_features: int = 2**18,
+        char_ngrams: tuple[int, ...] = (2, 3),
+        l2: float = 1e-5,
+        learning_rate: float = 0.5,
+        epochs: int = 8,
+        batch_size: int = 256,
+        seed: int = 0,
+    ) -> None:
+        self.n_features = n_features
+        self.char_ngrams = tuple(char_ngrams)
+        self.l2 = l2
+        self.learning_rate = learning_rate
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.seed = seed
+        self.weights = np.zeros(n_features, dtype=np.float64)
+        self.bias = 0.0
+
+    def _features(self, texts: Sequence[str]) -> _SparseRows:
+        return hash_features(texts, self.n_features, self.char_ngrams)
+
+    def fit(self, texts: Sequence[str], labels: Sequence[bool]) -> SuitabilityClassifier:
+        """在 (raw_text, is_suitable) 样本上训练，返回自身。"""
+        if len(texts) != len(labels):
+            raise ValueError("texts 与 labels 的长度不一致")
+        if not texts:
+            raise ValueError("训练样本不能为空")
+        features = self._features(texts)
+        y = np.asarray(labels, dtype=np.float64)
+        rng = np.random.default_rng(self.seed)
+        weights = np.zeros(self.n_features, dtype=np.float64)
+        bias = float(np.log((y.mean() + 1e-3) / (1 - y.mean() + 1e-3)))
+        grad_sq = np.full(self.n_features, 1e-8)
+        bias_grad_sq = 1e-8
+        for _ in range(self.epochs):
+            order = rng.permutation(len(y))
+            for start in range(0, len(y), self.batch_size):
+                batch = order[start : start + self.batch_size]
+                rows = features.rows(batch)
+                error = _sigmoid(rows.dot(weights) + bias) - y[batch]
+                # 只更新本批出现的特征；L2 也只作用于这些特征（稀疏更新的常见近似）
+                touched = np.unique(rows.indices)
+                grad = np.bincount(
+                    rows.indices,
+                    weights=rows.values * error[rows.row_ids()],
+                    minlength=self.n_features,
+                )[touched] / len(batch) + self.l2 * weights[touched]
+                grad_sq[touched] += grad**2
+                weights[touched] -= self.learning_rate * grad / np.sqrt(grad_sq[touched])
+                bias_grad = float(error.mean())
+                bias_grad_sq += bias_grad**2
+                bias -= self.learning_rate * bias_grad / np.sqrt(bias_grad_sq)
+        self.weights, self.bias = weights, bias
+        return self
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """返回每个片段通过模块 A 的概率。"""
+        if not texts:
+            return np.zeros(0)
+        return _sigmoid(self._features(texts).dot(self.weights) + self.bias)
+
+    def calibration_report(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[bool],
+        n_bins: int = 10,
+        thresholds: Sequence[tuple[float, Optional[float]]] = _DEFAULT_THRESHOLDS,
+    ) -> CalibrationReport:
+        """在带标注的数据（应为训练时未见过的数据）上生成校准报告。"""
+        return _calibration_report(
+            self.predict_proba(texts), np.asarray(labels, dtype=np.float64), n_bins, thresholds
+        )
+
+    def select_for_labeling(self, texts: Sequence[str], k: int) -> List[int]:
+        """主动学习：返回预测最不确定（概率最接近 0.5）的 `k` 个片段的下标。"""
+        probabilities = self.predict_proba(texts)
+        return [int(i) for i in np.argsort(np.abs(probabilities - 0.5))[:k]]
+
+    def save(self, path: Union[str, Path]) -> None:
+        config = {
+            "n_features": self.n_features,
+            "char_ngrams": list(self.char_ngrams),
+            "l2": self.l2,
+            "learning_rate": self.learning_rate,
+            "epochs": self.epochs,
+            "batch_size": self.batch_size,
+            "seed": self.seed,
+        }
+        # 哈希特征通常很稀疏，只保存非零权重
+        nonzero = np.flatnonzero(self.weights)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                indices=nonzero,
+                weights=self.weights[nonzero],
+                bias=np.array([self.bias]),
+                config=np.array(json.dumps(config)),
+            )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> SuitabilityClassifier:
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            config["char_ngrams"] = tuple(config["char_ngrams"])
+            classifier = cls(**config)
+            classifier.weights[data["indices"]] = data["weights"]
+            classifier.bias = float(data["bias"][0])
+        return classifier
+
+
+# ----------------------------------------------------------------------
+# 标注数据与过滤器
+# ----------------------------------------------------------------------
+
+
+def load_labels(path: Union[str, Path]) -> tuple[List[str], List[bool]]:
+    """从 JSONL 标注文件读取 (raw_text, is_suitable)；同一片段出现多次时以最后一次为准。"""
+    latest: Dict[str, bool] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            latest[record["raw_text"]] = bool(record["is_suitable"])
+    return list(latest), list(latest.values())
+
+
+@dataclass
+class FilterStats:
+    """`ClassifierFilter` 的分流统计。"""
+
+    local_rejects: int = 0
+    local_accepts: int = 0
+    llm_calls: int = 0
+    explored: int = 0
+
+    @property
+    def local_rate(self) -> float:
+        total = self.local_rejects + self.local_accepts + self.llm_calls
+        return (self.local_rejects + self.local_accepts) / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.__dict__, "local_rate": round(self.local_rate, 4)}
+
+
+class ClassifierFilter:
+    """
+    在 `DataQualityFilter` 前加一层本地分类器，接口与 `DataQualityFilter` 相同。
+
+    参数：
+    - llm_filter: 原来的 `DataQualityFilter`（通常为 `pipeline.filter`）。
+    - classifier: 训练好的 `SuitabilityClassifier`。
+    - reject_below: 概率低于该值时本地判为不适合。
+    - accept_above: 概率高于该值时本地判为适合；为 None（默认）时不做本地通过，
+      因为本地通过的片段没有 `potential_task`，且误判会在模块 B / C 上花更多钱。
+    - explore_rate: 本可本地决定的片段中仍交给 LLM 的比例（主动学习与持续校准）。
+    - label_path: 可选的 JSONL 标注文件，LLM 给出的每条结论都会追加写入，用于下一轮训练。
+    """
+
+    def __init__(
+        self,
+        llm_filter: Any,
+        classifier: SuitabilityClassifier,
+        *,
+        reject_below: float = 0.05,
+        accept_above: Optional[float] = None,
+        explore_rate: float = 0.02,
+        label_path: Optional[Union[str, Path]] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        if accept_above is not None and accept_above <= reject_below:
+            raise ValueError("accept_above 必须大于 reject_below")
+        if not 0 <= explore_rate <= 1:
+            raise ValueError("explore_rate 必须在 [0, 1] 之间")
+        self._llm_filter = llm_filter
+        self.classifier = classifier
+        self.reject_below = reject_below
+        self.accept_above = accept_above
+        self.explore_rate = explore_rate
+        self.label_path = Path(label_path) if label_path is not None else None
+        self.stats = FilterStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _log_label(self, raw_text: str, assessment: AssessmentResult) -> None:
+        if self.label_path is None:
+            return
+        record = {"raw_text": raw_text, **assessment.model_dump()}
+        with self._lock, open(self.label_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def local_decision(self, raw_text: str) -> Optional[AssessmentResult]:
+        """
+        只用本地分类器判定：能本地决定时返回结论，需要交给 LLM 时返回 None（随后应调用 `llm_assess`）。
+
+        `QuestionerPipeline.run` 在决定是否推测执行模块 B 之前先调用它，
+        本地拒绝的片段不会发出推测的 rewrite 请求。
+        """
+        probability = float(self.classifier.predict_proba([raw_text.strip()])[0])
+        local: Optional[bool] = None
+        if probability < self.reject_below:
+            local = False
+        elif self.accept_above is not None and probability > self.accept_above:
+            local = True
+
+        with self._lock:
+            explore = local is not None and self._random.random() < self.explore_rate
+            if local is None or explore:
+                self.stats.llm_calls += 1
+                self.stats.explored += int(explore)
+            elif local:
+                self.stats.local_accepts += 1
+            else:
+                self.stats.local_rejects += 1
+
+        if local is None or explore:
+            return None
+        return AssessmentResult(
+            is_suitable=local,
+            missing_info="" if local else f"本地分类器判定为不适合（p={probability:.3f}）",
+            potential_task="",
+        )
+
+    def llm_assess(self, raw_text: str) -> AssessmentResult:
+        """交给 LLM 评估，并把结论追加写入标注文件。"""
+        assessment = self._llm_filter.assess(raw_text)
+        self._log_label(raw_text.strip(), assessment)
+        return assessment
+
+    def assess(self, raw_text: str) -> AssessmentResult:
+        local = self.local_decision(raw_text)
+        return local if local is not None else self.llm_assess(raw_text)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="用历史的模块 A 结论训练本地适用性分类器")
+    parser.add_argument("--labels", required=True, help="JSONL 标注文件，每行含 raw_text 与 is_suitable")
+    parser.add_argument("--out", required=True, help="模型输出路径（.npz）")
+    parser.add_argument("--valid-fraction", type=float, default=0.2, help="留作校准报告的比例")
+    parser.add_argument("--epochs", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    texts, labels = load_labels(args.labels)
+    order = np.random.default_rng(args.seed).permutation(len(texts))
+    n_valid = int(len(texts) * args.valid_fraction)
+    valid, train = order[:n_valid], order[n_valid:]
+    classifier = SuitabilityClassifier(epochs=args.epochs, seed=args.seed).fit(
+        [texts[i] for i in train], [labels[i] for i in train]
+    )
+    if n_valid:
+        report = classifier.calibration_report(
+            [texts[i] for i in valid], [labels[i] for i in valid]
+        )
+        print(report.format())
+    classifier.save(args.out)
+    print(f"已保存到 {args.out}（训练样本 {len(train)}，验证样本 {n_valid}）")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,9 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -37,6 +37,14 @@ class ModelConfig:
         api_key="dummy-key",
         base_url="http://localhost:8000/v1"
     )
+
+    # 使用轻量级 HTTP 客户端，并显式设置超时
+    config = ModelConfig(
+        model_name="your-model",
+        base_url="http://localhost:8000/v1",
+        client_type="http",
+        client_options={"connect_timeout": 2.0, "read_timeout": 60.0},
+    )
     ```
     """
 
@@ -60,12 +68,24 @@ class ModelConfig:
     - 本地服务: "http://localhost:8000/v1"
     """
 
+    client_type: str = "openai"
+    """
+    客户端实现：
+    - "openai": 使用 openai SDK 的 `OpenAIClient`（默认）
+    - "http": 直接发送 HTTP 请求的 `HTTPClient`（更少的封装层，支持 HTTP/2）
+    """
+
+    client_options: Dict[str, Any] = field(default_factory=dict)
+    """传给客户端构造函数的额外关键字参数，例如 `{"read_timeout": 60.0}`。"""
+
     def to_dict(self) -> dict:
         """转换为字典格式，方便序列化或传递给其他函数。"""
         return {
             "model_name": self.model_name,
             "api_key": self.api_key,
             "base_url": self.base_url,
+            "client_type": self.client_type,
+            "client_options": dict(self.client_options),
         }
 
     @classmethod
@@ -75,6 +95,8 @@ class ModelConfig:
             model_name=config_dict["model_name"],
             api_key=config_dict.get("api_key"),
             base_url=config_dict.get("base_url"),
+            client_type=config_dict.get("client_type") or "openai",
+            client_options=dict(config_dict.get("client_options") or {}),
         )
 
 
@@ -0,0 +1,487 @@
+"""
+题目覆盖度分析：基于语义向量索引统计已生成题目覆盖了哪些统计方法 / 研究设计，
+并在调用模块 B / C 之前挑选能填补覆盖空白的输入片段。
+
+组成：
+- `EmbeddingBackend`: 可插拔的向量化后端
+  - `HashingEmbedding`: 本地 CPU 的字符 n-gram 哈希向量，无需额外依赖与网络
+  - `SentenceTransformerEmbedding`: 本地 sentence-transformers 模型
+  - `OpenAIEmbedding`: OpenAI 兼容的 `/embeddings` 接口
+- `VectorIndex`: 归一化向量矩阵 + NumPy 向量化余弦检索，可保存 / 加载
+- `coverage_report()`: 按 k-means 聚类、统计方法标签与研究设计标签汇总覆盖情况
+- `CoverageSampler`: 优先选择与已出题片段最不相似、且所属方法 / 设计最稀缺的片段
+
+索引中的记录按 `kind` 区分："passage"（已出题的原始片段）、"context"（重写后的题干背景）
+与 "question"（题干）。采样时候选片段是原始文本，只与同为原始文本的 "passage" 记录比较相似度。
+
+示例：
+```python
+index = VectorIndex(HashingEmbedding())
+index.add_questions([question], passages=[raw_text])
+
+sampler = CoverageSampler(index)
+chosen = sampler.select(suitable_passages, k=100)   # 只对这些片段调用模块 B / C
+```
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .methods import DESIGN_KEYWORDS, METHOD_KEYWORDS, UNLABELED, tag_design, tag_method
+from .models import Question
+
+
+def method_of_question(question: Question) -> str:
+    """题干经过去污染不含方法名，因此用正确选项的文本确定方法标签。"""
+    return tag_method(question.options.get(question.answer, ""))
+
+
+def design_of_question(question: Question) -> str:
+    """研究设计属于场景描述，去污染后仍保留在题干中，因此直接用题干确定设计标签。"""
+    return tag_design(question.stem)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+# ----------------------------------------------------------------------
+# 向量化后端
+# ----------------------------------------------------------------------
+
+
+class EmbeddingBackend(ABC):
+    """向量化后端接口：把一组文本映射为 (n, dim) 的 float32 矩阵。"""
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        pass
+
+
+class HashingEmbedding(EmbeddingBackend):
+    """
+    本地 CPU 向量化：字符 n-gram 经哈希映射到固定维度，再做 TF 加权与 L2 归一化。
+
+    对中英文混排文本都适用，不依赖模型文件或网络，适合作为默认后端。
+    """
+
+    _WHITESPACE = re.compile(r"\s+")
+
+    def __init__(self, dim: int = 1024, ngram_range: tuple[int, int] = (2, 4)) -> None:
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _bucket(self, gram: str) -> int:
+        digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % self.dim
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        low, high = self.ngram_range
+        for row, text in enumerate(texts):
+            normalized = self._WHITESPACE.sub(" ", text.lower()).strip()
+            counts = Counter(
+                normalized[i : i + n]
+                for n in range(low, high + 1)
+                for i in range(len(normalized) - n + 1)
+            )
+            for gram, count in counts.items():
+                matrix[row, self._bucket(gram)] += 1.0 + np.log(count)
+        return _normalize(matrix)
+
+
+class SentenceTransformerEmbedding(EmbeddingBackend):
+    """本地 sentence-transformers 模型（需安装 `sentence-transformers`）。"""
+
+    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2") -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "未安装 sentence-transformers，请运行: pip install sentence-transformers"
+            ) from e
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return _normalize(self._model.encode(list(texts), convert_to_numpy=True))
+
+
+class OpenAIEmbedding(EmbeddingBackend):
+    """OpenAI 兼容的 `/embeddings` 接口。"""
+
+    def __init__(
+        self,
+        model_name: str = "text-embedding-3-small",
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        batch_size: int = 256,
+    ) -> None:
+        try:
+            from openai import OpenAI
+        except ImportError as e:
+            raise ImportError("未安装 openai，请运行: pip install openai") from e
+        self._client = OpenAI(api_key=api_key, base_url=base_url)
+        self._model_name = model_name
+        self._batch_size = batch_size
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows: List[List[float]] = []
+        for start in range(0, len(texts), self._batch_size):
+            response = self._client.embeddings.create(
+                model=self._model_name,
+                input=list(texts[start : start + self._batch_size]),
+            )
+            rows.extend(item.embedding for item in response.data)
+        return _normalize(np.array(rows, dtype=np.float32))
+
+
+# ----------------------------------------------------------------------
+# 向量索引
+# ----------------------------------------------------------------------
+
+
+class VectorIndex:
+    """
+    归一化向量的内存索引。每条记录带有 `kind`（"passage" / "context" / "question"）、
+    方法标签与研究设计标签。
+
+    检索为一次矩阵乘法 + `argpartition`，对十万级记录足够快。
+    """
+
+    def __init__(self, backend: EmbeddingBackend) -> None:
+        self.backend = backend
+        self._vectors: Optional[np.ndarray] = None
+        self.texts: List[str] = []
+        self.kinds: List[str] = []
+        self.labels: List[str] = []
+        self.designs: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._vectors is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._vectors
+
+    def add(
+        self,
+        texts: Sequence[str],
+        kind: str,
+        labels: Optional[Sequence[str]] = None,
+        designs: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        添加记录。`labels` / `designs` 为空时分别用 `tag_method` / `tag_design` 从文本推断。
+        """
+        if not texts:
+            return
+        if labels is None:
+            labels = [tag_method(text) for text in texts]
+        elif len(labels) != len(texts):
+            raise ValueError("labels 与 texts 的长度必须一致")
+        if designs is None:
+            designs = [tag_design(text) for text in texts]
+        elif len(designs) != len(texts):
+            raise ValueError("designs 与 texts 的长度必须一致")
+        vectors = self.backend.embed(texts)
+        self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+        self.texts.extend(texts)
+        self.kinds.extend([kind] * len(texts))
+        self.labels.extend(labels)
+        self.designs.extend(designs)
+
+    def add_questions(
+        self,
+        questions: Sequence[Question],
+        passages: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        以题干建索引，以正确选项推断方法标签、以题干推断设计标签。
+
+        提供 `passages`（与 `questions` 一一对应的原始片段）时，同时以 "passage" 记录加入索引，
+        并沿用对应题目的标签，供 `CoverageSampler` 与候选原始片段比较。
+        """
+        labels = [method_of_question(question) for question in questions]
+        designs = [design_of_question(question) for question in questions]
+        if passages is not None and len(passages) != len(questions):
+            raise ValueError("passages 与 questions 的长度必须一致")
+        self.add([question.stem for question in questions], "question", labels, designs)
+        if passages is not None:
+            self.add(list(passages), "passage", labels, designs)
+
+    def mask(self, kind: Optional[str] = None) -> np.ndarray:
+        if kind is None:
+            return np.ones(len(self), dtype=bool)
+        return np.array([k == kind for k in self.kinds], dtype=bool)
+
+    def search(
+        self,
+        query: Union[str, np.ndarray],
+        k: int = 10,
+        kind: Optional[str] = None,
+    ) -> List[tuple[int, float]]:
+        """返回与 `query` 余弦相似度最高的 k 条记录：[(记录下标, 相似度), ...]。"""
+        if len(self) == 0:
+            return []
+        query_vector = (
+            self.backend.embed([query])[0] if isinstance(query, str) else _normalize(query)[0]
+        )
+        scores = self.vectors @ query_vector
+        if kind is not None:
+            scores = np.where(self.mask(kind), scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def max_similarity(self, vectors: np.ndarray, kind: Optional[str] = None) -> np.ndarray:
+        """对每个输入向量，返回它与索引中（指定 kind 的）记录的最大余弦相似度。"""
+        mask = self.mask(kind)
+        if len(self) == 0 or not mask.any():
+            return np.zeros(len(vectors), dtype=np.float32)
+        return (vectors @ self.vectors[mask].T).max(axis=1)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """保存为 `.npz`（向量）+ `.json`（文本与标签）。"""
+        path = Path(path)
+        np.savez_compressed(path.with_suffix(".npz"), vectors=self.vectors)
+        meta = {
+            "texts": self.texts,
+            "kinds": self.kinds,
+            "labels": self.labels,
+            "designs": self.designs,
+        }
+        path.with_suffix(".json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Union[str, Path], backend: EmbeddingBackend) -> VectorIndex:
+        """加载 `save()` 保存的索引；`backend` 必须与建索引时相同。"""
+        path = Path(path)
+        index = cls(backend)
+        meta = json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+        index.texts, index.kinds, index.labels = meta["texts"], meta["kinds"], meta["labels"]
+        # 旧版本保存的索引没有设计标签，从文本补齐
+        index.designs = meta.get("designs") or [tag_design(text) for text in index.texts]
+        if index.texts:
+            index._vectors = np.load(path.with_suffix(".npz"))["vectors"]
+        return index
+
+
+# ----------------------------------------------------------------------
+# 覆盖度报告
+# ----------------------------------------------------------------------
+
+
+def kmeans(
+    vectors: np.ndarray,
+    k: int,
+    iterations: int = 25,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    球面 k-means（余弦距离），返回 (质心矩阵, 每条记录的簇编号)。
+
+    使用 k-means++ 初始化，全部计算为 NumPy 向量化操作。
+    """
+    n = len(vectors)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    centroids = np.empty((k, vectors.shape[1]), dtype=np.float32)
+    centroids[0] = vectors[rng.integers(n)]
+    closest = 1.0 - vectors @ centroids[0]
+    for c in range(1, k):
+        weights = np.clip(closest, 0, None) ** 2
+        total = weights.sum()
+        pick = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids[c] = vectors[pick]
+        closest = np.minimum(closest, 1.0 - vectors @ centroids[c])
+
+    assignments = np.zeros(n, dtype=np.int64)
+    for iteration in range(iterations):
+        new_assignments = np.argmax(vectors @ centroids.T, axis=1)
+        if iteration > 0 and np.array_equal(new_assignments, assignments):
+            break
+        assignments = new_assignments
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = np.bincount(assignments, minlength=k) == 0
+        sums[empty] = centroids[empty]
+        centroids = _normalize(sums)
+    return centroids, assignments
+
+
+@dataclass
+class ClusterCoverage:
+    """单个语义簇的覆盖情况。"""
+
+    cluster: int
+    contexts: int
+    questions: int
+    top_labels: List[tuple[str, int]]
+    example: str
+
+
+@dataclass
+class CoverageReport:
+    """覆盖度报告：按方法标签、研究设计标签与语义簇统计已有题目的分布。"""
+
+    questions_by_label: Dict[str, int]
+    contexts_by_label: Dict[str, int]
+    clusters: List[ClusterCoverage] = field(default_factory=list)
+    questions_by_design: Dict[str, int] = field(default_factory=dict)
+    contexts_by_design: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def missing_labels(self) -> List[str]:
+        """方法表中尚无任何题目的方法。"""
+        return [label for label in METHOD_KEYWORDS if not self.questions_by_label.get(label)]
+
+    @property
+    def missing_designs(self) -> List[str]:
+        """设计表中尚无任何题目的研究设计。"""
+        return [design for design in DESIGN_KEYWORDS if not self.questions_by_design.get(design)]
+
+    @property
+    def under_covered_clusters(self) -> List[ClusterCoverage]:
+        """有素材但题目数明显偏少（低于平均值一半）的簇，按题目数升序。"""
+        if not self.clusters:
+            return []
+        mean = sum(c.questions for c in self.clusters) / len(self.clusters)
+        return sorted(
+            (c for c in self.clusters if c.questions < 0.5 * mean),
+            key=lambda c: c.questions,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "questions_by_label": self.questions_by_label,
+            "contexts_by_label": self.contexts_by_label,
+            "missing_labels": self.missing_labels,
+            "questions_by_design": self.questions_by_design,
+            "contexts_by_design": self.contexts_by_design,
+            "missing_designs": self.missing_designs,
+            "clusters": [c.__dict__ for c in self.clusters],
+        }
+
+
+def coverage_report(index: VectorIndex, n_clusters: int = 20, seed: int = 0) -> CoverageReport:
+    """
+    对索引中的全部记录做聚类，统计每个簇、每个方法标签与每个设计标签下的素材 / 题目数量。
+    素材为 "context" 与 "passage" 记录。
+    """
+    kinds = np.array(index.kinds)
+    labels = np.array(index.labels)
+    designs = np.array(index.designs)
+    is_context = np.isin(kinds, ["context", "passage"])
+    report = CoverageReport(
+        questions_by_label=dict(Counter(labels[kinds == "question"].tolist())),
+        contexts_by_label=dict(Counter(labels[is_context].tolist())),
+        questions_by_design=dict(Counter(designs[kinds == "question"].tolist())),
+        contexts_by_design=dict(Counter(designs[is_context].tolist())),
+    )
+    if len(index) == 0:
+        return report
+
+    _, assignments = kmeans(index.vectors, n_clusters, seed=seed)
+    for cluster in np.unique(assignments):
+        members = np.flatnonzero(assignments == cluster)
+        member_kinds = kinds[members]
+        report.clusters.append(
+            ClusterCoverage(
+                cluster=int(cluster),
+                contexts=int(np.isin(member_kinds, ["context", "passage"]).sum()),
+                questions=int((member_kinds == "question").sum()),
+                top_labels=Counter(labels[members].tolist()).most_common(3),
+                example=index.texts[members[0]][:120],
+            )
+        )
+    return report
+
+
+# ----------------------------------------------------------------------
+# 覆盖度驱动的采样
+# ----------------------------------------------------------------------
+
+
+class CoverageSampler:
+    """
+    在调用模块 B / C 之前，从候选片段中挑选最能增加题目多样性的子集。
+
+    打分 = (1 - 与已出题片段 / 已选片段的最大相似度) + label_weight * 方法稀缺度
+    + design_weight * 设计稀缺度，贪心地逐个选取，每选一个就更新剩余候选的最大相似度，
+    避免选出彼此相近的片段。
+
+    候选是原始片段，而题干经过去污染、措辞与原文差别很大，直接比较会系统性地低估相似度；
+    因此默认只与同为原始文本的 "passage" 记录比较（见 `VectorIndex.add_questions(passages=...)`）。
+
+    参数：
+    - index: 已有题目（及其原始片段）的向量索引。
+    - label_weight: 方法稀缺度的权重；稀缺度为 1 / (1 + 该方法已有题目数)。
+    - design_weight: 研究设计稀缺度的权重，定义同上。
+    - kind: 计算相似度与稀缺度时参照的记录类型，应与候选文本同类，默认为 "passage"。
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        label_weight: float = 0.5,
+        kind: Optional[str] = "passage",
+        design_weight: float = 0.5,
+    ) -> None:
+        self.index = index
+        self.label_weight = label_weight
+        self.design_weight = design_weight
+        self.kind = kind
+
+    def select(self, passages: Sequence[str], k: int) -> List[int]:
+        """返回被选中片段在 `passages` 中的下标，按选取顺序排列。"""
+        if not passages or k <= 0:
+            return []
+        vectors = self.index.backend.embed(passages)
+        max_sim = self.index.max_similarity(vectors, kind=self.kind)
+
+        mask = self.index.mask(self.kind)
+        label_counts = Counter(np.array(self.index.labels, dtype=object)[mask].tolist())
+        design_counts = Counter(np.array(self.index.designs, dtype=object)[mask].tolist())
+        labels = np.array([tag_method(passage) for passage in passages], dtype=object)
+        designs = np.array([tag_design(passage) for passage in passages], dtype=object)
+        label_rarity = np.array([1.0 / (1 + label_counts[label]) for label in labels], dtype=np.float32)
+        design_rarity = np.array(
+            [1.0 / (1 + design_counts[design]) for design in designs], dtype=np.float32
+        )
+
+        chosen: List[int] = []
+        available = np.ones(len(passages), dtype=bool)
+        for _ in range(min(k, len(passages))):
+            scores = (
+                (1.0 - max_sim)
+                + self.label_weight * label_rarity
+                + self.design_weight * design_rarity
+            )
+            pick = int(np.argmax(np.where(available, scores, -np.inf)))
+            chosen.append(pick)
+            available[pick] = False
+            # 已选片段视为新增覆盖：更新相似度与该方法 / 设计的稀缺度
+            max_sim = np.maximum(max_sim, vectors @ vectors[pick])
+            label_counts[labels[pick]] += 1
+            label_rarity[labels == labels[pick]] = 1.0 / (1 + label_counts[labels[pick]])
+            design_counts[designs[pick]] += 1
+            design_rarity[designs == designs[pick]] = 1.0 / (1 + design_counts[designs[pick]])
+        return chosen
@@ -0,0 +1,399 @@
+"""
+评测引擎：让一组目标模型作答生成的单选题，并给出带置信区间的准确率。
+
+- 每个 (模型, 题目) 组合并发请求，按端点限速与限并发；
+- 用预编译正则从回复中提取选项字母；
+- 每条回复立即追加写入 JSONL 缓存（按实际的端点与模型名，而不是配置名），
+  中断后重新运行会跳过已完成的组合；
+- 调用失败的组合在报告中给出错误信息，配置错误不会被误当成准确率低；
+- 准确率的 bootstrap 置信区间用 NumPy 向量化计算。
+
+示例：
+```python
+configs = load_configs_from_json("config.json")
+harness = EvaluationHarness(configs, cache_path="eval_cache.jsonl", requests_per_second=5)
+report = harness.run(questions)
+for score in report.scores.values():
+    print(score.model, score.accuracy, score.ci_low, score.ci_high)
+```
+
+命令行：
+
+    python -m questioner.evaluation --config config.json --questions questions.jsonl --cache eval_cache.jsonl
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .config import ModelConfig
+from .llm_client import LLMClient, create_client
+from .models import Question
+from .prompts import SYSTEM_PROMPT_ANSWER
+
+# 按优先级匹配："答案: B" / "Answer: (B)" > 独占一行的 "B" / "B." > 文本中首个 "(B)"
+_ANSWER_PATTERNS = (
+    # 只有关键词不区分大小写；选项字母区分大小写，避免 "answer is a ..." 被当成 A
+    re.compile(r"(?i:答案|answer|选项|选择)\s*(?:是|为|(?i:is))?\s*[:：]?\s*[(（]?\s*([A-D])(?![A-Za-z])"),
+    re.compile(r"^\s*[(（]?([A-D])[)）.．、:：]?\s*$", re.M),
+    re.compile(r"[(（]([A-D])[)）]"),
+    re.compile(r"^\s*([A-D])[.．、)）:：]", re.M),
+)
+
+# 匹配前去掉 Markdown 的强调与代码标记（"**B**"、"`B`"），方括号统一为圆括号（"[B]"、"【B】"）
+_MARKDOWN_MARKS = re.compile(r"[*_`~]+")
+_BRACKETS = str.maketrans({"[": "(", "【": "(", "〔": "(", "]": ")", "】": ")", "〕": ")"})
+
+
+def extract_choice(text: str) -> Optional[str]:
+    """从模型回复中提取选项字母（A–D），无法确定时返回 None。"""
+    text = _MARKDOWN_MARKS.sub("", text).translate(_BRACKETS)
+    for pattern in _ANSWER_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1).upper()
+    return None
+
+
+def endpoint_key(config: ModelConfig) -> str:
+    """回复缓存中的模型标识：实际请求的端点与模型名。改名或重名的配置不会复用或混用缓存。"""
+    return f"{config.base_url or 'openai'}|{config.model_name}"
+
+
+def question_id(question: Question) -> str:
+    """题目内容的稳定哈希，用作缓存键的一部分。"""
+    payload = json.dumps(
+        {"stem": question.stem, "options": question.options},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def format_question(question: Question) -> str:
+    """把题目渲染成发给被测模型的文本（不含答案与解析）。"""
+    lines = [question.stem, ""]
+    lines.extend(f"{key}. {question.options[key]}" for key in sorted(question.options))
+    return "\n".join(lines)
+
+
+def load_questions(path: Union[str, Path]) -> List[Question]:
+    """从 JSONL 文件加载题目，每行一个 `Question` 的 JSON 对象。"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [Question.model_validate_json(line) for line in f if line.strip()]
+
+
+def bootstrap_ci(
+    correct: np.ndarray,
+    n_resamples: int = 10000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> tuple[float, float]:
+    """
+    准确率的百分位 bootstrap 置信区间。
+
+    对 0/1 结果，有放回重抽 n 个样本的正确数服从 Binomial(n, p̂)，
+    因此直接一次性抽取 `n_resamples` 个二项分布样本，无需构造 (B, n) 的下标矩阵。
+    """
+    correct = np.asarray(correct, dtype=np.float64)
+    n = len(correct)
+    if n == 0:
+        return float("nan"), float("nan")
+    rng = np.random.default_rng(seed)
+    means = rng.binomial(n, correct.mean(), size=n_resamples) / n
+    alpha = (1.0 - confidence) / 2
+    low, high = np.quantile(means, [alpha, 1.0 - alpha])
+    return float(low), float(high)
+
+
+class RateLimiter:
+    """线程安全的令牌桶：平均每秒 `rate` 个请求，最多突发 `burst` 个。"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self._rate = rate
+        self._capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """
+    追加写入的 JSONL 回复缓存，键为 (`endpoint_key`, 题目 ID)。
+
+    每条记录写入后立即 flush，进程中断时最多丢失正在进行的请求。
+    没有 "endpoint" 字段的旧记录（按配置名缓存）无法确定来源，读取时忽略。
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self._records: Dict[tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+        last_line = b""
+        if self.path.exists():
+            offset = 0
+            valid_end = 0
+            with open(self.path, "rb") as f:
+                for line in f:
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 中断时可能留下写了一半的最后一行
+                        continue
+                    if "endpoint" in record:
+                        self._records[(record["endpoint"], record["question_id"])] = record
+                    valid_end = offset
+                    last_line = line
+            if valid_end < offset:
+                # 截掉写了一半的末行，否则下一条记录会接在它后面而无法解析
+                os.truncate(self.path, valid_end)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if last_line and not last_line.endswith(b"\n"):
+            self._file.write("\n")
+
+    def get(self, endpoint: str, qid: str) -> Optional[dict]:
+        return self._records.get((endpoint, qid))
+
+    def put(self, record: dict) -> None:
+        with self._lock:
+            self._records[(record["endpoint"], record["question_id"])] = record
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+@dataclass
+class ModelScore:
+    """单个模型的评测结果。`error_messages` 为调用失败的错误信息 -> 次数。"""
+
+    model: str
+    total: int
+    correct: int
+    unparsed: int
+    errors: int
+    accuracy: float
+    ci_low: float
+    ci_high: float
+    error_messages: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class EvaluationReport:
+    """
+    全部模型的评测结果。`records` 为每个 (模型, 题目) 的原始记录，
+    `failures` 为调用失败的 (模型, 题目) 及其错误信息。
+    """
+
+    scores: Dict[str, ModelScore]
+    records: List[dict] = field(default_factory=list)
+    failures: List[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {name: score.__dict__ for name, score in self.scores.items()}
+
+
+class EvaluationHarness:
+    """
+    并发评测引擎。
+
+    参数：
+    - configs: 配置名 -> `ModelConfig`，通常来自 `load_configs_from_json`。
+    - cache_path: 回复缓存文件；已存在时从中断处继续。
+    - max_workers: 线程池大小，即全局最大并发请求数。
+    - requests_per_second: 每个端点的限速；可传入 {base_url: rate} 为不同端点单独设置，
+      未列出的端点使用键 "default" 的值（缺省为 5）。
+    - max_concurrency_per_endpoint: 每个端点的最大并发请求数。
+    - client_factory: 由 `ModelConfig` 创建客户端的函数，默认 `create_client`。
+    """
+
+    def __init__(
+        self,
+        configs: Dict[str, ModelConfig],
+        cache_path: Union[str, Path],
+        *,
+        max_workers: int = 32,
+        requests_per_second: Union[float, Dict[str, float]] = 5.0,
+        max_concurrency_per_endpoint: int = 8,
+        client_factory: Callable[[ModelConfig], LLMClient] = create_client,
+        n_resamples: int = 10000,
+        confidence: float = 0.95,
+    ) -> None:
+        if not configs:
+            raise ValueError("configs 不能为空")
+        self.configs = configs
+        self.cache_path = Path(cache_path)
+        self.max_workers = max_workers
+        self.n_resamples = n_resamples
+        self.confidence = confidence
+
+        if isinstance(requests_per_second, dict):
+            rates = dict(requests_per_second)
+        else:
+            rates = {"default": requests_per_second}
+        default_rate = rates.get("default", 5.0)
+
+        self._clients: Dict[str, LLMClient] = {}
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._client_factory = client_factory
+        for config in configs.values():
+            endpoint = self._endpoint(config)
+            if endpoint not in self._limiters:
+                self._limiters[endpoint] = RateLimiter(rates.get(endpoint, default_rate))
+                self._semaphores[endpoint] = threading.BoundedSemaphore(
+                    max_concurrency_per_endpoint
+                )
+
+    @staticmethod
+    def _endpoint(config: ModelConfig) -> str:
+        return config.base_url or "openai"
+
+    def _ask(self, name: str, question: Question, qid: str) -> dict:
+        endpoint = self._endpoint(self.configs[name])
+        with self._semaphores[endpoint]:
+            self._limiters[endpoint].acquire()
+            started = time.perf_counter()
+            response = self._clients[name].generate_text(
+                system_prompt=SYSTEM_PROMPT_ANSWER,
+                user_content=format_question(question),
+            )
+            latency = time.perf_counter() - started
+        choice = extract_choice(response)
+        return {
+            "model": name,
+            "endpoint": endpoint_key(self.configs[name]),
+            "question_id": qid,
+            "response": response,
+            "choice": choice,
+            "correct": choice == question.answer,
+            "latency": latency,
+        }
+
+    def run(self, questions: Sequence[Question]) -> EvaluationReport:
+        """
+        评测全部 (模型, 题目) 组合并汇总。
+
+        调用失败的组合不写入缓存（下次运行会重试），在报告中计入 `errors`，
+        错误信息见 `ModelScore.error_messages` 与 `EvaluationReport.failures`。
+        """
+        qids = [question_id(question) for question in questions]
+        for name, config in self.configs.items():
+            if name not in self._clients:
+                self._clients[name] = self._client_factory(config)
+        cache = ResponseCache(self.cache_path)
+        records: Dict[tuple[str, str], dict] = {}
+        failures: List[dict] = []
+        try:
+            pending = []
+            for name, config in self.configs.items():
+                endpoint = endpoint_key(config)
+                for question, qid in zip(questions, qids):
+                    cached = cache.get(endpoint, qid)
+                    if cached is not None:
+                        records[(name, qid)] = {**cached, "model": name}
+                    else:
+                        pending.append((name, question, qid))
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self._ask, name, question, qid): (name, qid)
+                    for name, question, qid in pending
+                }
+                for future in as_completed(futures):
+                    name, qid = futures[future]
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        failures.append(
+                            {"model": name, "question_id": qid, "error": f"{type(e).__name__}: {e}"}
+                        )
+                        continue
+                    cache.put(record)
+                    records[(name, record["question_id"])] = record
+        finally:
+            cache.close()
+
+        scores: Dict[str, ModelScore] = {}
+        for name in self.configs:
+            model_records = [records[(name, qid)] for qid in qids if (name, qid) in records]
+            correct = np.array([r["correct"] for r in model_records], dtype=np.float64)
+            ci_low, ci_high = bootstrap_ci(correct, self.n_resamples, self.confidence)
+            error_messages: Dict[str, int] = {}
+            for failure in failures:
+                if failure["model"] == name:
+                    error_messages[failure["error"]] = error_messages.get(failure["error"], 0) + 1
+            scores[name] = ModelScore(
+                model=name,
+                total=len(model_records),
+                correct=int(correct.sum()),
+                unparsed=sum(1 for r in model_records if r["choice"] is None),
+                errors=sum(error_messages.values()),
+                accuracy=float(correct.mean()) if len(correct) else float("nan"),
+                ci_low=ci_low,
+                ci_high=ci_high,
+                error_messages=error_messages,
+            )
+        return EvaluationReport(scores=scores, records=list(records.values()), failures=failures)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    from .config import load_configs_from_json
+
+    parser = argparse.ArgumentParser(description="让目标模型作答题目并计算准确率")
+    parser.add_argument("--config", required=True, help="模型配置 JSON（load_configs_from_json 格式）")
+    parser.add_argument("--questions", required=True, help="题目 JSONL，每行一个 Question")
+    parser.add_argument("--cache", default="eval_cache.jsonl", help="回复缓存文件，用于断点续跑")
+    parser.add_argument("--models", nargs="*", help="只评测这些配置名（默认全部）")
+    parser.add_argument("--rps", type=float, default=5.0, help="每个端点每秒请求数")
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    configs = load_configs_from_json(args.config)
+    if args.models:
+        configs = {name: configs[name] for name in args.models}
+    harness = EvaluationHarness(
+        configs, args.cache, max_workers=args.workers, requests_per_second=args.rps
+    )
+    report = harness.run(load_questions(args.questions))
+    for score in report.scores.values():
+        print(
+            f"{score.model:<20} acc={score.accuracy:.3f} "
+            f"[{score.ci_low:.3f}, {score.ci_high:.3f}] "
+            f"n={score.total} unparsed={score.unparsed} errors={score.errors}"
+        )
+        for message, count in sorted(score.error_messages.items(), key=lambda item: -item[1]):
+            print(f"{'':<20} {count} × {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+对冲请求（hedged requests）：降低共享端点上的尾延迟。
+
+流水线的三个阶段串行执行，单次调用的 p99 往往是中位数的数倍，决定了整批运行的耗时。
+对冲的做法是：一次调用耗时超过近期延迟的某个分位数时，向同一个或备用端点再发一份
+相同的请求，取先返回的结果，另一份作废。
+
+- 延迟分位数按调用类别（例如不同阶段的 system prompt）分别统计，只使用最近 `window` 次
+  成功调用的延迟；样本不足 `min_samples` 时不对冲；
+- 额外负载有上限：对冲请求数不超过调用总数的 `max_hedge_ratio`；
+- 同步 SDK 无法中断已经发出的 HTTP 请求：落败的一方若尚未开始则被取消，
+  否则在后台执行完后丢弃结果（其费用仍会产生，这也是需要负载上限的原因）；
+- 只有可能被对冲的调用才交给线程池执行：样本不足、对冲比例已用完或线程池已满时，
+  原请求直接在调用方线程中执行，线程池大小因此不会限制客户端的总并发。
+
+`HedgeStats` 给出对冲率（对冲请求数 / 调用数）、胜率（对冲请求先返回的比例），
+以及落败请求消耗的 token（对冲的额外开销）。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class HedgeStats:
+    """
+    对冲统计。
+
+    - calls: 调用总数。
+    - hedged: 发出对冲请求的调用数。
+    - hedge_wins: 对冲请求先于原请求成功返回的次数。
+    - suppressed: 达到阈值但因对冲比例上限或线程池已满而未对冲的次数。
+    - wasted_prompt_tokens / wasted_completion_tokens: 落败请求执行完后被丢弃的用量。
+    """
+
+    calls: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    suppressed: int = 0
+    wasted_prompt_tokens: int = 0
+    wasted_completion_tokens: int = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.calls if self.calls else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "suppressed": self.suppressed,
+            "wasted_prompt_tokens": self.wasted_prompt_tokens,
+            "wasted_completion_tokens": self.wasted_completion_tokens,
+            "hedge_rate": round(self.hedge_rate, 4),
+            "win_rate": round(self.win_rate, 4),
+        }
+
+
+class LatencyTracker:
+    """线程安全地保存最近 `window` 次调用的延迟（秒），并给出分位数。"""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """第 `q` 百分位数（0–100，最近邻取值）；没有样本时为 None。"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(q / 100 * len(samples))) - 1))
+        return samples[index]
+
+
+class Hedger:
+    """
+    对冲执行器：`call(key, primary, hedge)` 先执行 `primary()`，超过 `key` 类别的延迟分位数
+    仍未返回时再执行 `hedge()`，返回先成功的结果。两者都失败时抛出原请求的异常。
+
+    参数：
+    - percentile: 触发对冲的延迟分位数，例如 95 表示超过近期 p95 时对冲。
+    - max_hedge_ratio: 对冲请求数占调用总数的上限。
+    - min_samples: 某类别至少积累这么多延迟样本后才开始对冲。
+    - window: 每个类别保留的延迟样本数。
+    - max_workers: 执行可能被对冲的请求的线程数，应与调用方的并发数相当；
+      线程池已满时原请求在调用方线程中执行且不对冲。
+    - usage_of: 可选，从请求结果中取出 token 用量（字典或带 prompt_tokens / completion_tokens
+      属性的对象），用于统计落败请求的用量。
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_hedge_ratio: float = 0.1,
+        min_samples: int = 20,
+        window: int = 200,
+        max_workers: int = 32,
+        usage_of: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        if not 0 < percentile < 100:
+            raise ValueError("percentile 必须在 (0, 100) 之间")
+        if not 0 <= max_hedge_ratio <= 1:
+            raise ValueError("max_hedge_ratio 必须在 [0, 1] 之间")
+        if max_workers < 1:
+            raise ValueError("max_workers 必须大于等于 1")
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.stats = HedgeStats()
+        self._trackers: Dict[str, LatencyTracker] = {}
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self._usage_of = usage_of
+        self._inflight = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def tracker(self, key: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = self._trackers[key] = LatencyTracker(self.window)
+            return tracker
+
+    def _submit(
+        self, fn: Callable[[], T], tracker: LatencyTracker
+    ) -> tuple[Future[T], threading.Event]:
+        """提交请求，返回 (future, 开始执行时 set 的 Event)；在线程池中排队的时间不计入延迟。"""
+        started_event = threading.Event()
+
+        def timed() -> T:
+            started_event.set()
+            started = time.perf_counter()
+            try:
+                result = fn()
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+            tracker.add(time.perf_counter() - started)
+            return result
+
+        with self._lock:
+            self._inflight += 1
+        future = self._executor.submit(timed)
+        # 线程池关闭时排队中的请求被取消，同样唤醒等待方
+        future.add_done_callback(lambda _: started_event.set())
+        return future, started_event
+
+    def _can_hedge(self) -> bool:
+        """对冲比例未用完且线程池有空闲；调用方需持有 `_lock`。"""
+        # 线程池已满时对冲请求只会排在后面，反而在饱和时加倍负载
+        saturated = self._inflight >= self.max_workers
+        return not saturated and self.stats.hedged + 1 <= self.max_hedge_ratio * self.stats.calls
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if not self._can_hedge():
+                self.stats.suppressed += 1
+                return False
+            self.stats.hedged += 1
+            return True
+
+    def _discard(self, future: Future[Any]) -> None:
+        """落败请求结束时记录其用量；被取消或失败的请求不产生用量。"""
+        if self._usage_of is None or future.cancelled() or future.exception() is not None:
+            return
+        usage = self._usage_of(future.result())
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+        with self._lock:
+            self.stats.wasted_prompt_tokens += int(get("prompt_tokens") or 0)
+            self.stats.wasted_completion_tokens += int(get("completion_tokens") or 0)
+
+    def _run_inline(self, fn: Callable[[], T], tracker: LatencyTracker) -> T:
+        started = time.perf_counter()
+        result = fn()
+        tracker.add(time.perf_counter() - started)
+        return result
+
+    def call(self, key: str, primary: Callable[[], T], hedge: Callable[[], T]) -> T:
+        tracker = self.tracker(key)
+        with self._lock:
+            self.stats.calls += 1
+        threshold = tracker.percentile(self.percentile) if len(tracker) >= self.min_samples else None
+        if threshold is None:
+            return self._run_inline(primary, tracker)
+        with self._lock:
+            hedgeable = self._can_hedge()
+        if not hedgeable:
+            # 这次调用无论如何都不会被对冲，不必经过线程池
+            return self._run_inline(primary, tracker)
+
+        first, first_started = self._submit(primary, tracker)
+        # 超时从请求真正开始执行时算起，与 tracker 记录的延迟口径一致
+        first_started.wait()
+        done, _ = wait([first], timeout=threshold)
+        if done or not self._allow_hedge():
+            return first.result()
+
+        second, _ = self._submit(hedge, tracker)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    loser = first if future is second else second
+                    loser.cancel()
+                    loser.add_done_callback(self._discard)
+                    if future is second:
+                        with self._lock:
+                            self.stats.hedge_wins += 1
+                    return future.result()
+        # 两个请求都失败
+        return first.result()
+
+    def shutdown(self) -> None:
+        """关闭线程池，不等待仍在后台执行的落败请求。"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
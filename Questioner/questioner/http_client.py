@@ -0,0 +1,321 @@
+"""
+轻量级 OpenAI 兼容客户端：直接通过 HTTP 调用 `/chat/completions`。
+
+与 `OpenAIClient` 相比：
+- 不经过 openai SDK，每次请求只构造一个 JSON 请求体；
+- 使用带连接池的 httpx 客户端，安装了 `h2` 时启用 HTTP/2；
+- 安装了 `orjson` 时使用它编解码 JSON；
+- 连接超时、读取超时和重试次数均显式可控；
+- 同时提供同步与异步（`agenerate_*`）两套调用方式。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+from .llm_client import LLMClient, structured_output_params
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# 这些状态码通常是暂时性的，值得重试
+_RETRY_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HTTPClient(LLMClient):
+    """
+    基于 httpx 的 OpenAI 兼容客户端。
+
+    参数：
+    - `model_name`: 必须指定。
+    - `api_key`: 可选。如果为 None，将从环境变量 `OPENAI_API_KEY` 读取。
+    - `base_url`: 可选。如果为 None，将使用 OpenAI 官方端点。
+    - `connect_timeout` / `read_timeout`: 建立连接与等待响应的超时（秒）。
+    - `max_retries`: 连接错误或暂时性状态码（429、5xx 等）的最大重试次数。
+    - `max_connections`: 连接池大小。
+    - `http2`: 是否启用 HTTP/2；为 None 时在安装了 `h2` 的情况下自动启用。
+    - `structured_output`: 端点的结构化输出能力，见 `llm_client.STRUCTURED_OUTPUT_MODES`。
+
+    同步连接池在多个线程之间共享；异步连接池绑定在事件循环上，每个事件循环各用一个
+    （例如先后多次 `asyncio.run()`），事件循环被回收时随之丢弃。
+
+    示例：
+    ```python
+    client = HTTPClient(model_name="qwen-plus", base_url="http://localhost:8000/v1")
+    data = client.generate_structured_json(system_prompt, user_content)
+
+    # 异步
+    data = await client.agenerate_structured_json(system_prompt, user_content)
+    ```
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        *,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        max_retries: int = 2,
+        max_connections: int = 64,
+        http2: Optional[bool] = None,
+        structured_output: str = "json_object",
+    ) -> None:
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("未安装 httpx，请运行: pip install httpx") from e
+
+        if not model_name:
+            raise ValueError("model_name 不能为空，请指定要使用的模型名称")
+
+        structured_output_params(structured_output)  # 校验取值
+
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+
+        self._httpx = httpx
+        self._model_name = model_name
+        self._url = (base_url or DEFAULT_BASE_URL).rstrip("/") + "/chat/completions"
+        self._headers = {"Content-Type": "application/json"}
+        if api_key:
+            self._headers["Authorization"] = f"Bearer {api_key}"
+        self._timeout = httpx.Timeout(
+            read_timeout, connect=connect_timeout, pool=connect_timeout
+        )
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self._http2 = _http2_available() if http2 is None else http2
+        self._max_retries = max_retries
+        self._structured_output = structured_output
+        self._client: Optional[Any] = None
+        # 事件循环 -> AsyncClient；httpx.AsyncClient 只能在创建它的事件循环中使用
+        self._async_clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, Any
+        ] = weakref.WeakKeyDictionary()
+        self._pool_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 连接池
+    # ------------------------------------------------------------------
+
+    def _get_client(self) -> Any:
+        # 多个线程同时发出第一次请求时只创建一个连接池
+        with self._pool_lock:
+            if self._client is None:
+                self._client = self._httpx.Client(
+                    http2=self._http2, timeout=self._timeout, limits=self._limits
+                )
+            return self._client
+
+    def _get_async_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._pool_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = self._httpx.AsyncClient(
+                    http2=self._http2, timeout=self._timeout, limits=self._limits
+                )
+            return client
+
+    def close(self) -> None:
+        """关闭同步连接池。"""
+        with self._pool_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """关闭同步连接池与当前事件循环的异步连接池。"""
+        self.close()
+        with self._pool_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def __enter__(self) -> HTTPClient:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 请求构造与响应解析
+    # ------------------------------------------------------------------
+
+    def _build_body(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_mode: bool,
+        json_schema: Optional[Dict[str, Any]] = None,
+        n: int = 1,
+    ) -> bytes:
+        body: Dict[str, Any] = {
+            "model": self._model_name,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+        }
+        if n > 1:
+            body["n"] = n
+        if json_mode:
+            body.update(structured_output_params(self._structured_output, json_schema))
+        return _json_dumps(body)
+
+    def _extract_contents(self, raw: bytes) -> List[str]:
+        data = _json_loads(raw)
+        self._record_usage(data.get("usage"))
+        return [choice["message"].get("content") or "" for choice in data["choices"]]
+
+    def _should_retry(self, attempt: int, response: Any = None) -> bool:
+        if attempt >= self._max_retries:
+            return False
+        return response is None or response.status_code in _RETRY_STATUS_CODES
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(0.5 * (2**attempt), 8.0)
+
+    # ------------------------------------------------------------------
+    # 同步接口
+    # ------------------------------------------------------------------
+
+    def _post(self, body: bytes) -> List[str]:
+        client = self._get_client()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = client.post(self._url, content=body, headers=self._headers)
+                except self._httpx.TransportError:
+                    if not self._should_retry(attempt):
+                        raise
+                else:
+                    if response.status_code < 400:
+                        return self._extract_contents(response.content)
+                    if not self._should_retry(attempt, response):
+                        response.raise_for_status()
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            self._record_retries(attempt)
+
+    def generate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        text = self._post(
+            self._build_body(system_prompt, user_content, json_mode=True, json_schema=json_schema)
+        )[0]
+        return self._parse_json(text, provider_name="HTTP")
+
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        if n < 1:
+            raise ValueError("n 必须大于等于 1")
+        texts = self._post(
+            self._build_body(
+                system_prompt, user_content, json_mode=True, json_schema=json_schema, n=n
+            )
+        )
+        return self._parse_json_candidates(texts, provider_name="HTTP")
+
+    def generate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        text = self._post(self._build_body(system_prompt, user_content, json_mode=False))[0]
+        return text.strip()
+
+    # ------------------------------------------------------------------
+    # 异步接口
+    # ------------------------------------------------------------------
+
+    async def _apost(self, body: bytes) -> List[str]:
+        client = self._get_async_client()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await client.post(
+                        self._url, content=body, headers=self._headers
+                    )
+                except self._httpx.TransportError:
+                    if not self._should_retry(attempt):
+                        raise
+                else:
+                    if response.status_code < 400:
+                        return self._extract_contents(response.content)
+                    if not self._should_retry(attempt, response):
+                        response.raise_for_status()
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+        finally:
+            self._record_retries(attempt)
+
+    async def agenerate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """`generate_structured_json` 的异步版本。"""
+        text = (
+            await self._apost(
+                self._build_body(system_prompt, user_content, json_mode=True, json_schema=json_schema)
+            )
+        )[0]
+        return self._parse_json(text, provider_name="HTTP")
+
+    async def agenerate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        """`generate_text` 的异步版本。"""
+        text = (
+            await self._apost(self._build_body(system_prompt, user_content, json_mode=False))
+        )[0]
+        return text.strip()
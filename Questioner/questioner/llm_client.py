@@ -11,13 +11,53 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+if TYPE_CHECKING:
+    from .config import ModelConfig
+    from .hedging import Hedger, HedgeStats
+
+# 端点对结构化输出的支持能力，通过客户端的 `structured_output` 参数选择：
+# - "json_object": response_format={"type": "json_object"}，只保证语法合法（默认）
+# - "json_schema": response_format={"type": "json_schema"}，按 Schema 约束解码
+# - "guided_json": vLLM 等本地服务的 guided_json 扩展，按 Schema 约束解码
+# - "none": 不发送任何格式约束，适用于不识别 response_format 的服务
+STRUCTURED_OUTPUT_MODES = ("json_object", "json_schema", "guided_json", "none")
+
+
+def structured_output_params(
+    mode: str,
+    json_schema: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    根据结构化输出模式生成需要合并进请求体的字段。
+
+    未提供 `json_schema` 时，"json_schema" / "guided_json" 退化为 "json_object"。
+    """
+    if mode not in STRUCTURED_OUTPUT_MODES:
+        raise ValueError(
+            f"未知的 structured_output: {mode!r}，可选值为 {STRUCTURED_OUTPUT_MODES}"
+        )
+    if mode == "none":
+        return {}
+    if json_schema is None or mode == "json_object":
+        return {"response_format": {"type": "json_object"}}
+
+    schema = {key: value for key, value in json_schema.items() if key != "title"}
+    if mode == "guided_json":
+        return {"guided_json": schema}
+    return {
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {
+                "name": json_schema.get("title", "response"),
+                "schema": schema,
+                "strict": True,
+            },
+        }
+    }
 
 
 class LLMClient(ABC):
@@ -34,12 +74,15 @@ class LLMClient(ABC):
         self,
         system_prompt: str,
         user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         期望 LLM 返回 JSON 字符串，并将其解析为字典。
 
         - `system_prompt`: 系统角色说明与输出格式约束。
         - `user_content`: 具体的论文片段或研究场景。
+        - `json_schema`: 可选的目标 JSON Schema（见 `models.json_schema_for`）。
+          端点支持约束解码时据此约束输出，否则可忽略。
         """
         pass
 
@@ -54,6 +97,81 @@ class LLMClient(ABC):
         """
         pass
 
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        一次生成 `n` 个 JSON 候选，对应 chat completions 的 `n` 参数：prompt 只编码一次，
+        成本接近单次调用。
+
+        无法解析的候选会被丢弃，全部无法解析时抛出 ValueError。
+        默认实现依次调用 `n` 次 `generate_structured_json`；支持 `n` 参数的客户端应覆盖此方法。
+        """
+        if n < 1:
+            raise ValueError("n 必须大于等于 1")
+        candidates: List[Dict[str, Any]] = []
+        error: Optional[ValueError] = None
+        for _ in range(n):
+            try:
+                candidates.append(
+                    self.generate_structured_json(system_prompt, user_content, json_schema=json_schema)
+                )
+            except ValueError as e:
+                error = e
+        if not candidates:
+            raise error  # type: ignore[misc]
+        return candidates
+
+    @property
+    def model_name(self) -> Optional[str]:
+        """客户端使用的模型名称；未知时为 None。"""
+        return getattr(self, "_model_name", None)
+
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        """
+        当前线程最近一次调用的 token 用量：`{"prompt_tokens": ..., "completion_tokens": ...}`。
+
+        服务未返回用量或客户端不支持时为 None。
+        """
+        local = self.__dict__.get("_usage_local")
+        return getattr(local, "usage", None) if local is not None else None
+
+    def _record_usage(self, usage: Any) -> None:
+        """
+        辅助方法：记录本次调用的 token 用量，`usage` 可以是字典或 SDK 的 usage 对象。
+        """
+        local = self.__dict__.get("_usage_local")
+        if local is None:
+            local = self.__dict__.setdefault("_usage_local", threading.local())
+        if usage is None:
+            local.usage = None
+            return
+        get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+        local.usage = {
+            "prompt_tokens": int(get("prompt_tokens") or 0),
+            "completion_tokens": int(get("completion_tokens") or 0),
+        }
+
+    @property
+    def last_retries(self) -> int:
+        """当前线程最近一次调用在客户端内部重试的次数；客户端不支持时为 0。"""
+        local = self.__dict__.get("_usage_local")
+        return getattr(local, "retries", 0) if local is not None else 0
+
+    def _record_retries(self, retries: int) -> None:
+        """
+        辅助方法：记录本次调用的重试次数。
+        """
+        local = self.__dict__.get("_usage_local")
+        if local is None:
+            local = self.__dict__.setdefault("_usage_local", threading.local())
+        local.retries = retries
+
     @staticmethod
     def _clean_json_text(text: str) -> str:
         """
@@ -79,6 +197,22 @@ class LLMClient(ABC):
                 f"无法解析 {provider_name} 返回的 JSON：{e}\n原始内容:\n{text}"
             ) from e
 
+    @staticmethod
+    def _parse_json_candidates(texts: List[str], provider_name: str = "LLM") -> List[Dict[str, Any]]:
+        """
+        辅助方法：解析多个候选的 JSON 文本，跳过无法解析的候选；全部无法解析时抛出 ValueError。
+        """
+        candidates: List[Dict[str, Any]] = []
+        error: Optional[ValueError] = None
+        for text in texts:
+            try:
+                candidates.append(LLMClient._parse_json(text, provider_name))
+            except ValueError as e:
+                error = e
+        if not candidates:
+            raise error or ValueError(f"{provider_name} 没有返回任何候选")
+        return candidates
+
 
 class OpenAIClient(LLMClient):
     """
@@ -95,6 +229,16 @@ class OpenAIClient(LLMClient):
       如果环境变量也没有，某些服务（如本地部署）可能允许使用占位符。
     - `base_url`: 可选。如果为 None，将使用 OpenAI 官方端点。
       对于其他服务，请指定对应的端点。
+    - `structured_output`: 端点的结构化输出能力，见 `STRUCTURED_OUTPUT_MODES`。
+    - `hedge_percentile`: 可选。设置后启用对冲请求（见 `hedging.Hedger`）：调用耗时超过
+      同类调用近期延迟的该分位数时，再发一份相同请求，取先返回的结果。
+    - `hedge_base_url` / `hedge_api_key`: 可选。对冲请求发往的备用端点，默认与原请求相同。
+    - `hedge_max_ratio`: 对冲请求数占调用总数的上限，默认 0.1。
+    - `hedge_min_samples`: 某类调用积累多少个延迟样本后才开始对冲，默认 20。
+    - `hedge_max_workers`: 执行可能被对冲的请求的线程数，默认 32，应与调用方的并发数相当；
+      线程池已满时请求直接在调用方线程中执行且不对冲，不会限制总并发。
+
+    `openai` SDK 在创建客户端时才导入，`import questioner` 本身不会加载它。
     """
 
     def __init__(
@@ -102,9 +246,19 @@ class OpenAIClient(LLMClient):
         model_name: str,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        structured_output: str = "json_object",
+        *,
+        hedge_percentile: Optional[float] = None,
+        hedge_base_url: Optional[str] = None,
+        hedge_api_key: Optional[str] = None,
+        hedge_max_ratio: float = 0.1,
+        hedge_min_samples: int = 20,
+        hedge_max_workers: int = 32,
     ) -> None:
-        if OpenAI is None:
-            raise ImportError("未安装 openai，请运行: pip install openai")
+        try:
+            from openai import OpenAI
+        except ImportError as e:
+            raise ImportError("未安装 openai，请运行: pip install openai") from e
 
         if not model_name:
             raise ValueError("model_name 不能为空，请指定要使用的模型名称")
@@ -113,36 +267,142 @@ class OpenAIClient(LLMClient):
         # 如果都没有，允许继续（某些本地服务可能不需要真实的 key）
         api_key = api_key or os.getenv("OPENAI_API_KEY")
 
+        structured_output_params(structured_output)  # 校验取值
+
         self._client = OpenAI(api_key=api_key, base_url=base_url)
         self._model_name = model_name
+        self._structured_output = structured_output
+
+        self._hedger: Optional[Hedger] = None
+        self._hedge_client = self._client
+        if hedge_percentile is not None:
+            from .hedging import Hedger
+
+            self._hedger = Hedger(
+                percentile=hedge_percentile,
+                max_hedge_ratio=hedge_max_ratio,
+                min_samples=hedge_min_samples,
+                max_workers=hedge_max_workers,
+                usage_of=lambda response: response.usage,
+            )
+            if hedge_base_url is not None:
+                self._hedge_client = OpenAI(
+                    api_key=hedge_api_key or api_key, base_url=hedge_base_url
+                )
+
+    def close(self) -> None:
+        """关闭对冲线程池与 SDK 的连接池。"""
+        if self._hedger is not None:
+            self._hedger.shutdown()
+        if self._hedge_client is not self._client:
+            self._hedge_client.close()
+        self._client.close()
+
+    def __enter__(self) -> OpenAIClient:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def hedge_stats(self) -> Optional[HedgeStats]:
+        """对冲统计；未启用对冲时为 None。"""
+        return self._hedger.stats if self._hedger is not None else None
+
+    def _structured_kwargs(self, json_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        params = structured_output_params(self._structured_output, json_schema)
+        response_format = params.pop("response_format", None)
+        kwargs: Dict[str, Any] = {}
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        if params:
+            # guided_json 等非标准字段通过 extra_body 透传
+            kwargs["extra_body"] = params
+        return kwargs
+
+    def _create(self, system_prompt: str, user_content: str, **kwargs: Any) -> Any:
+        """
+        辅助方法：发送一次 chat completion 请求。启用对冲时按 system prompt 区分调用类别
+        （即流水线的不同阶段），分别统计延迟。
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ]
+        if self._hedger is None:
+            return self._client.chat.completions.create(
+                model=self._model_name, messages=messages, **kwargs
+            )
+        return self._hedger.call(
+            system_prompt,
+            lambda: self._client.chat.completions.create(
+                model=self._model_name, messages=messages, **kwargs
+            ),
+            lambda: self._hedge_client.chat.completions.create(
+                model=self._model_name, messages=messages, **kwargs
+            ),
+        )
 
     def generate_structured_json(
         self,
         system_prompt: str,
         user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        response = self._client.chat.completions.create(
-            model=self._model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
-            response_format={"type": "json_object"},  # 强制 JSON 格式
+        response = self._create(
+            system_prompt, user_content, **self._structured_kwargs(json_schema)
         )
+        self._record_usage(response.usage)
         text = response.choices[0].message.content or ""
         return self._parse_json(text, provider_name="OpenAI")
 
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        if n < 1:
+            raise ValueError("n 必须大于等于 1")
+        response = self._create(
+            system_prompt, user_content, n=n, **self._structured_kwargs(json_schema)
+        )
+        self._record_usage(response.usage)
+        texts = [choice.message.content or "" for choice in response.choices]
+        return self._parse_json_candidates(texts, provider_name="OpenAI")
+
     def generate_text(
         self,
         system_prompt: str,
         user_content: str,
     ) -> str:
-        response = self._client.chat.completions.create(
-            model=self._model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
-        )
+        response = self._create(system_prompt, user_content)
+        self._record_usage(response.usage)
         return (response.choices[0].message.content or "").strip()
 
+
+def create_client(config: ModelConfig) -> LLMClient:
+    """
+    根据 `ModelConfig.client_type` 创建对应的客户端实例。
+
+    - "openai": `OpenAIClient`
+    - "http": `HTTPClient`
+
+    `config.client_options` 会作为关键字参数传给客户端构造函数。
+    """
+    kwargs = dict(
+        model_name=config.model_name,
+        api_key=config.api_key,
+        base_url=config.base_url,
+        **config.client_options,
+    )
+    if config.client_type == "openai":
+        return OpenAIClient(**kwargs)
+    if config.client_type == "http":
+        from .http_client import HTTPClient
+
+        return HTTPClient(**kwargs)
+    raise ValueError(
+        f"未知的 client_type: {config.client_type!r}，可选值为 'openai' 或 'http'"
+    )
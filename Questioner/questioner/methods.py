@@ -0,0 +1,55 @@
+"""
+统计方法与研究设计标签：按关键词表给原始片段、题干或选项文本打标签。
+
+只依赖标准库，供覆盖度分析（`coverage`）与多候选打分（`candidates`）共用；
+`candidates` 在 `n_candidates > 1` 时总会被导入，不能因此依赖可选的 NumPy。
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+# 统计方法关键词表，用于给原始片段和题目的正确选项打方法标签
+METHOD_KEYWORDS: Dict[str, tuple[str, ...]] = {
+    "chi_square": ("chi-square", "chi-squared", "chi square", "卡方", "χ²", "fisher"),
+    "t_test": ("t-test", "t test", "t 检验", "t检验"),
+    "anova": ("anova", "analysis of variance", "方差分析"),
+    "nonparametric": ("mann-whitney", "wilcoxon", "kruskal", "秩和", "非参数"),
+    "survival": ("kaplan", "log-rank", "cox", "survival", "生存"),
+    "mixed_model": ("mixed model", "mixed-effects", "gee", "混合效应", "重复测量"),
+    # 较宽泛的方法放在最后，避免 "Cox 回归" 之类被先匹配为普通回归
+    "correlation": ("correlation", "pearson", "spearman", "相关"),
+    "regression": ("regression", "回归"),
+}
+
+UNLABELED = "other"
+
+
+def tag_method(text: str) -> str:
+    """按关键词表返回文本对应的统计方法标签，未命中时返回 "other"。"""
+    lowered = text.lower()
+    for label, keywords in METHOD_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return label
+    return UNLABELED
+
+
+# 研究设计关键词表，用于给原始片段和题干打设计标签（题干去污染时保留研究场景，设计描述仍在）
+DESIGN_KEYWORDS: Dict[str, tuple[str, ...]] = {
+    "randomized": (
+        "randomized", "randomised", "randomly assigned", "randomly allocated", "rct",
+        "随机对照", "随机分组", "随机分配", "随机分为",
+    ),
+    "case_control": ("case-control", "case control", "病例对照"),
+    "cohort": ("cohort", "prospective", "retrospective", "follow-up", "队列", "前瞻性", "回顾性", "随访"),
+    "cross_sectional": ("cross-sectional", "cross sectional", "survey", "横断面", "现况调查", "问卷调查"),
+}
+
+
+def tag_design(text: str) -> str:
+    """按关键词表返回文本对应的研究设计标签，未命中时返回 "other"。"""
+    lowered = text.lower()
+    for label, keywords in DESIGN_KEYWORDS.items():
+        if any(keyword in lowered for keyword in keywords):
+            return label
+    return UNLABELED
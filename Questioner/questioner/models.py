@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from typing import Dict
+from functools import lru_cache
+from typing import Any, Dict, Type
 
 from pydantic import BaseModel, Field
 
+OPTION_KEYS = ("A", "B", "C", "D")
+
 
 class AssessmentResult(BaseModel):
     """模块 A 的评估结果模型。"""
@@ -26,7 +29,59 @@ class Question(BaseModel):
         description="四个选项，键通常为 'A'、'B'、'C'、'D'",
         min_length=4,
         max_length=4,
+        # 仅影响导出的 JSON Schema：约束解码时固定为 A/B/C/D 四个键
+        json_schema_extra={
+            "properties": {key: {"type": "string"} for key in OPTION_KEYS},
+            "required": list(OPTION_KEYS),
+            "additionalProperties": False,
+        },
+    )
+    answer: str = Field(
+        ...,
+        description="正确答案的选项 key，例如 'A'",
+        json_schema_extra={"enum": list(OPTION_KEYS)},
     )
-    answer: str = Field(..., description="正确答案的选项 key，例如 'A'")
     analysis: str = Field(..., description="详细解析")
 
+
+
+# 严格模式的 JSON Schema 不支持这些关键字
+_UNSUPPORTED_STRICT_KEYWORDS = ("default", "minProperties", "maxProperties", "title")
+
+
+def _make_strict(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_make_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    strict = {
+        key: _make_strict(value)
+        for key, value in node.items()
+        if key not in _UNSUPPORTED_STRICT_KEYWORDS and key != "properties"
+    }
+    if "properties" in node:
+        # properties 的键是字段名，不能按关键字过滤
+        strict["properties"] = {
+            name: _make_strict(value) for name, value in node["properties"].items()
+        }
+        if node.get("type") == "object":
+            strict["required"] = list(node["properties"])
+            strict["additionalProperties"] = False
+    return strict
+
+
+@lru_cache(maxsize=None)
+def _cached_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    schema = _make_strict(model.model_json_schema())
+    # 顶层保留模型名，作为 response_format 中 json_schema 的 name
+    schema["title"] = model.__name__
+    return schema
+
+
+def json_schema_for(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    导出供约束解码（`response_format={"type": "json_schema"}` 或 `guided_json`）使用的 JSON Schema。
+
+    所有字段均为必填、不允许额外字段，满足 OpenAI 严格模式的要求。
+    """
+    return _cached_json_schema(model)
@@ -7,16 +7,29 @@
 
 from __future__ import annotations
 
-from typing import Optional
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
 
 from .llm_client import LLMClient
-from .models import AssessmentResult, Question
+from .models import AssessmentResult, Question, json_schema_for
 from .prompts import (
     SYSTEM_PROMPT_ASSESS,
     SYSTEM_PROMPT_DECONTAMINATE,
     SYSTEM_PROMPT_GENERATE,
 )
 
+if TYPE_CHECKING:
+    from .batch import BatchBackend
+    from .budget import BudgetManager
+    from .candidates import CandidateSet
+    from .progress import Progress
+    from .speculative import SpeculationStats
+    from .preprocess import Window
+
 
 class DataQualityFilter:
     """模块 A: 判断文本片段是否适合出题。"""
@@ -32,6 +45,7 @@ class DataQualityFilter:
         json_result = self._client.generate_structured_json(
             system_prompt=SYSTEM_PROMPT_ASSESS,
             user_content=payload,
+            json_schema=json_schema_for(AssessmentResult),
         )
         return AssessmentResult.model_validate(json_result)
 
@@ -55,22 +69,117 @@ class ScenarioRewriter:
 
 
 class QuestionGenerator:
-    """模块 C: 在 `Cleaned_Context` 基础上生成单选题 JSON。"""
+    """
+    模块 C: 在 `Cleaned_Context` 基础上生成单选题 JSON。
 
-    def __init__(self, client: LLMClient) -> None:
+    `n_candidates > 1` 时启用多候选模式：一次请求生成多个候选，在本地校验并挑选最优者
+    （见 `questioner.candidates`）。
+
+    `question_type` 为题型名称（见 `questioner.question_types`），默认为统计方法选择，
+    即 `SYSTEM_PROMPT_GENERATE`。
+    """
+
+    def __init__(self, client: LLMClient, n_candidates: int = 1) -> None:
+        if n_candidates < 1:
+            raise ValueError("n_candidates 必须大于等于 1")
         self._client = client
+        self.n_candidates = n_candidates
 
-    def generate(self, cleaned_context: str) -> Question:
+    @staticmethod
+    def _system_prompt(question_type: Optional[str]) -> str:
+        if question_type is None:
+            return SYSTEM_PROMPT_GENERATE
+        from .question_types import get_question_type
+
+        return get_question_type(question_type).system_prompt
+
+    def generate(self, cleaned_context: str, question_type: Optional[str] = None) -> Question:
         """
         基于已经匿名化的研究场景描述生成标准单选题。
+
+        多候选模式下返回得分最高的候选；需要保留其余候选作为变体题时使用 `generate_candidates()`。
         """
+        if self.n_candidates > 1:
+            return self.generate_candidates(cleaned_context, question_type=question_type).best.question
+
         payload = cleaned_context.strip()
         json_result = self._client.generate_structured_json(
-            system_prompt=SYSTEM_PROMPT_GENERATE,
+            system_prompt=self._system_prompt(question_type),
             user_content=payload,
+            json_schema=json_schema_for(Question),
         )
         return Question.model_validate(json_result)
 
+    def generate_candidates(
+        self,
+        cleaned_context: str,
+        n: Optional[int] = None,
+        question_type: Optional[str] = None,
+    ) -> CandidateSet:
+        """
+        一次请求生成 `n` 个候选（默认 `n_candidates`），返回挑选结果：最优题目、变体题与被淘汰的候选。
+
+        没有候选通过校验时抛出 ValueError。
+        """
+        from .candidates import select_candidates
+
+        raw_candidates = self._client.generate_json_candidates(
+            system_prompt=self._system_prompt(question_type),
+            user_content=cleaned_context.strip(),
+            n=n or self.n_candidates,
+            json_schema=json_schema_for(Question),
+        )
+        return select_candidates(raw_candidates)
+
+    def generate_many(
+        self,
+        cleaned_context: str,
+        question_types: Sequence[str],
+        *,
+        max_workers: Optional[int] = None,
+        return_exceptions: bool = False,
+    ) -> Dict[str, Union[Question, Exception]]:
+        """
+        在同一个 `cleaned_context` 上并发生成多种题型，返回 {题型名称: 题目}，顺序与 `question_types` 一致。
+
+        `return_exceptions=True` 时单个题型的失败以异常对象的形式出现在结果中，
+        否则抛出第一个失败题型的异常（其余题型仍会执行完毕）。
+        """
+        from .question_types import resolve_question_types
+
+        names = [question_type.name for question_type in resolve_question_types(question_types)]
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=max_workers or len(names)) as executor:
+            futures = {
+                name: executor.submit(self.generate, cleaned_context, name) for name in names
+            }
+        results: Dict[str, Union[Question, Exception]] = {}
+        for name, future in futures.items():
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results[name] = error if error is not None else future.result()
+        return results
+
+
+class StageCheckpoint(ABC):
+    """
+    按阶段保存与恢复 `QuestionerPipeline.run` 的中间结果，例如持久化工作队列中的片段
+    （见 `questioner.workqueue`）：重新投递的片段跳过已完成的阶段。
+
+    阶段为 "assess" / "rewrite" / "generate"，结果分别为 `AssessmentResult` / `str` / `Question`。
+    两个方法都可以抛出异常中止当前片段（例如租约已丢失）。
+    """
+
+    @abstractmethod
+    def load(self, stage: str) -> Any:
+        """返回阶段 `stage` 已记录的结果，没有时返回 None。"""
+
+    @abstractmethod
+    def save(self, stage: str, result: Any, seconds: float) -> None:
+        """阶段 `stage` 完成时调用；`seconds` 为该阶段的耗时。"""
+
 
 class QuestionerPipeline:
     """
@@ -81,32 +190,402 @@ class QuestionerPipeline:
     3. 最后用 QuestionGenerator 生成标准单选题 JSON。
     """
 
-    def __init__(self, client: LLMClient) -> None:
+    def __init__(
+        self,
+        client: LLMClient,
+        budget: Optional[BudgetManager] = None,
+        n_candidates: int = 1,
+        progress: Optional[Progress] = None,
+        speculative: str = "auto",
+        speculation_threshold: float = 0.6,
+    ) -> None:
         """
         初始化流水线。
 
         参数：
         - client: 实现了 `LLMClient` 接口的客户端实例（如 `OpenAIClient`）。
+        - budget: 可选的 `BudgetManager`。提供时三个阶段的调用都会先预留额度、再按实际用量对账；
+          每个新片段（包括被本地分类器直接判定通过的片段）开始前为模块 B / C 保留额度，
+          超过软限额后 `run()` 不再开始新的片段（抛出 `BudgetExceeded`），
+          但已开始的片段仍会完成模块 B / C。
+        - n_candidates: 模块 C 每次生成的候选数，大于 1 时启用多候选模式（见 `QuestionGenerator`）。
+        - progress: 可选的 `Progress`。提供时记录各阶段的调用、在途请求、失败、重试与 token 用量，
+          `run_many()` 还会记录片段进度与模块 A 的通过率（见 `questioner.progress`）。
+        - speculative: 模块 A / B 的推测执行模式（见 `questioner.speculative`）：
+          "auto"（默认）只对先验估计通过率不低于 `speculation_threshold` 的片段同时发出 assess 与 rewrite；
+          "always" 总是推测；"off" 保持串行。用完请调用 `close()`（或使用 with 语句）释放推测线程池。
         """
         self._client = client
-        self.filter = DataQualityFilter(self._client)
-        self.rewriter = ScenarioRewriter(self._client)
-        self.generator = QuestionGenerator(self._client)
+        self.budget = budget
+        self.progress = progress
+        self._speculation = None
+        self._speculation_executor: Optional[ThreadPoolExecutor] = None
+        self._speculation_lock = threading.Lock()
+        if speculative != "off":
+            from .speculative import SpeculationController
+
+            self._speculation = SpeculationController(speculative, speculation_threshold)
+        self.filter = DataQualityFilter(self._stage_client("assess"))
+        self.rewriter = ScenarioRewriter(self._stage_client("rewrite"))
+        self.generator = QuestionGenerator(self._stage_client("generate"), n_candidates)
+
+    def _stage_client(self, stage: str) -> LLMClient:
+        client = self._client
+        if self.budget is not None:
+            from .budget import BudgetedClient
+
+            client = BudgetedClient(client, self.budget, stage)
+        if self.progress is not None:
+            from .progress import TelemetryClient
+
+            client = TelemetryClient(client, self.progress, stage)
+        return client
 
-    def run(self, raw_text: str) -> tuple[AssessmentResult, Optional[str], Optional[Question]]:
+    def _local_decision(
+        self, raw_text: str
+    ) -> tuple[Optional[AssessmentResult], Callable[[str], AssessmentResult]]:
+        """
+        模块 A 前有本地判定（如 `ClassifierFilter`）时先在本地判定。
+        返回 (本地判定结果或 None, 本地无法判定时使用的评估函数)。
+        """
+        local_decision = getattr(self.filter, "local_decision", None)
+        if local_decision is None:
+            return None, self.filter.assess
+        return local_decision(raw_text), self.filter.llm_assess
+
+    @contextmanager
+    def _admitted(self, raw_text: str, n_questions: int = 1) -> Iterator[None]:
+        """
+        新片段的预算准入：有预算时确认可以开始新片段，并在片段处理期间为模块 B / C 保留额度
+        （见 `BudgetManager.hold_passage`）；不能开始时抛出 `BudgetExceeded`。
+        """
+        if self.budget is None:
+            yield
+            return
+        hold = self.budget.hold_passage(
+            self._client.model_name or "unknown",
+            raw_text,
+            self.generator.n_candidates * n_questions,
+        )
+        try:
+            yield
+        finally:
+            self.budget.release_hold(hold)
+
+    @staticmethod
+    def _checkpointed(
+        checkpoint: Optional[StageCheckpoint], stage: str, compute: Callable[[], Any]
+    ) -> Any:
+        if checkpoint is None:
+            return compute()
+        recorded = checkpoint.load(stage)
+        if recorded is not None:
+            return recorded
+        started = time.perf_counter()
+        result = compute()
+        checkpoint.save(stage, result, time.perf_counter() - started)
+        return result
+
+    def run(
+        self,
+        raw_text: str,
+        *,
+        question_type: Optional[str] = None,
+        checkpoint: Optional[StageCheckpoint] = None,
+    ) -> tuple[AssessmentResult, Optional[str], Optional[Question]]:
         """
         整体执行一次流水线。
 
+        - question_type: 模块 C 使用的题型名称（见 `questioner.question_types`），None 为默认单选题。
+        - checkpoint: 可选的 `StageCheckpoint`，已记录的阶段直接复用，新完成的阶段随即保存。
+
         返回：
         - assessment: 模块 A 评估结果
         - cleaned_context: 若通过则为重写后的题干背景，否则为 None
         - question: 若通过则为生成的单选题，否则为 None
         """
-        assessment = self.filter.assess(raw_text)
+        known = checkpoint.load("assess") if checkpoint is not None else None
+        assess = self.filter.assess
+        if known is None:
+            # 本地能决定的片段不推测执行，避免为本地拒绝的片段发出 rewrite 请求
+            known, assess = self._local_decision(raw_text)
+            if known is not None and checkpoint is not None:
+                checkpoint.save("assess", known, 0.0)
+        if known is not None and not known.is_suitable:
+            return known, None, None
+        with self._admitted(raw_text):
+            if known is not None:
+                cleaned_context = self._checkpointed(
+                    checkpoint, "rewrite", lambda: self.rewriter.rewrite(raw_text)
+                )
+                question = self._checkpointed(
+                    checkpoint,
+                    "generate",
+                    lambda: self.generator.generate(cleaned_context, question_type),
+                )
+                return known, cleaned_context, question
+            return self._run_assessed(raw_text, assess, question_type, checkpoint)
+
+    def _run_assessed(
+        self,
+        raw_text: str,
+        assess: Callable[[str], AssessmentResult],
+        question_type: Optional[str] = None,
+        checkpoint: Optional[StageCheckpoint] = None,
+    ) -> tuple[AssessmentResult, Optional[str], Optional[Question]]:
+        # 到这里模块 A 尚无记录，其后的阶段也不会有记录
+        speculation = self._speculation
+        if speculation is not None and speculation.should_speculate(raw_text):
+            return self._run_speculative(raw_text, assess, question_type, checkpoint)
+
+        try:
+            assessment = self._checkpointed(checkpoint, "assess", lambda: assess(raw_text))
+        except Exception:
+            if speculation is not None:
+                speculation.record(raw_text, None, speculated=False)
+            raise
+        if speculation is not None:
+            speculation.record(raw_text, assessment.is_suitable, speculated=False)
+        if not assessment.is_suitable:
+            return assessment, None, None
+
+        cleaned_context = self._checkpointed(
+            checkpoint, "rewrite", lambda: self.rewriter.rewrite(raw_text)
+        )
+        question = self._checkpointed(
+            checkpoint, "generate", lambda: self.generator.generate(cleaned_context, question_type)
+        )
+        return assessment, cleaned_context, question
+
+    def close(self) -> None:
+        """释放推测执行的线程池；不关闭 `client`。已发出的推测请求在后台完成并计入统计。"""
+        with self._speculation_lock:
+            executor, self._speculation_executor = self._speculation_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def __enter__(self) -> QuestionerPipeline:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @property
+    def speculation_stats(self) -> Optional[SpeculationStats]:
+        """推测执行统计（包括浪费的调用、token 与费用）；`speculative="off"` 时为 None。"""
+        return self._speculation.stats if self._speculation is not None else None
+
+    def _get_speculation_executor(self) -> ThreadPoolExecutor:
+        with self._speculation_lock:
+            if self._speculation_executor is None:
+                self._speculation_executor = ThreadPoolExecutor(
+                    max_workers=32, thread_name_prefix="speculative-rewrite"
+                )
+            return self._speculation_executor
+
+    def _run_speculative(
+        self,
+        raw_text: str,
+        assess: Callable[[str], AssessmentResult],
+        question_type: Optional[str] = None,
+        checkpoint: Optional[StageCheckpoint] = None,
+    ) -> tuple[AssessmentResult, Optional[str], Optional[Question]]:
+        """同时发出 assess 与 rewrite；评估拒绝时取消或丢弃 rewrite。"""
+        speculation = self._speculation
+        assert speculation is not None
+
+        def rewrite() -> tuple[str, Optional[Dict[str, int]], float]:
+            started = time.perf_counter()
+            cleaned = self.rewriter.rewrite(raw_text)
+            # last_usage 是线程局部的，须在执行 rewrite 的线程中读取
+            return cleaned, self.rewriter._client.last_usage, time.perf_counter() - started
+
+        started = time.perf_counter()
+        future = self._get_speculation_executor().submit(rewrite)
+        try:
+            assessment = assess(raw_text)
+            assess_seconds = time.perf_counter() - started
+            if checkpoint is not None:
+                checkpoint.save("assess", assessment, assess_seconds)
+        except Exception:
+            self._discard_speculation(raw_text, None, future)
+            raise
         if not assessment.is_suitable:
+            self._discard_speculation(raw_text, False, future)
             return assessment, None, None
 
-        cleaned_context = self.rewriter.rewrite(raw_text)
-        question = self.generator.generate(cleaned_context)
+        try:
+            cleaned_context, _, rewrite_seconds = future.result()
+        except Exception:
+            speculation.record(raw_text, True, speculated=True)
+            raise
+        speculation.record(
+            raw_text,
+            True,
+            speculated=True,
+            saved_seconds=min(assess_seconds, rewrite_seconds),
+        )
+        if checkpoint is not None:
+            checkpoint.save("rewrite", cleaned_context, rewrite_seconds)
+        question = self._checkpointed(
+            checkpoint, "generate", lambda: self.generator.generate(cleaned_context, question_type)
+        )
         return assessment, cleaned_context, question
 
+    def _discard_speculation(
+        self,
+        raw_text: str,
+        accepted: Optional[bool],
+        future: Future[tuple[str, Optional[Dict[str, int]], float]],
+    ) -> None:
+        speculation = self._speculation
+        assert speculation is not None
+        if future.cancel():
+            speculation.record(raw_text, accepted, speculated=True, cancelled=True)
+            return
+
+        # 已经发出的请求无法中断：完成后把它的用量计为浪费，不阻塞当前调用
+        def on_done(done: Future[tuple[str, Optional[Dict[str, int]], float]]) -> None:
+            usage = None if done.exception() is not None else done.result()[1]
+            cost = 0.0
+            if usage is not None and self.budget is not None:
+                cost = self.budget.cost(
+                    self._client.model_name or "unknown",
+                    usage["prompt_tokens"],
+                    usage["completion_tokens"],
+                )
+            speculation.record(raw_text, accepted, speculated=True, usage=usage, cost=cost)
+
+        future.add_done_callback(on_done)
+
+    def run_many(
+        self,
+        raw_texts: Sequence[str],
+        *,
+        max_workers: int = 8,
+        return_exceptions: bool = True,
+    ) -> List[Union[tuple[AssessmentResult, Optional[str], Optional[Question]], Exception]]:
+        """
+        用线程池并发地对多个片段执行 `run()`，返回值顺序与 `raw_texts` 一致。
+
+        `return_exceptions=True`（默认）时单个片段的失败以异常对象的形式出现在结果中，
+        否则在全部片段结束后抛出第一个失败片段的异常。提供了 `progress` 时实时记录进度。
+        """
+        progress = self.progress
+        if progress is not None:
+            progress.add("total", len(raw_texts))
+            progress.add("pending", len(raw_texts))
+
+        def run_one(raw_text: str) -> tuple[AssessmentResult, Optional[str], Optional[Question]]:
+            if progress is None:
+                return self.run(raw_text)
+            progress.add("pending", -1)
+            try:
+                result = self.run(raw_text)
+            except Exception:
+                progress.record_passage(None)
+                raise
+            progress.record_passage(result[0].is_suitable)
+            return result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run_one, raw_text) for raw_text in raw_texts]
+        results: List[Union[tuple[AssessmentResult, Optional[str], Optional[Question]], Exception]] = []
+        for future in futures:
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else future.result())
+        return results
+
+    def run_multi(
+        self,
+        raw_text: str,
+        *,
+        question_types: Optional[Sequence[str]] = None,
+        max_types: int = 3,
+        return_exceptions: bool = False,
+    ) -> tuple[AssessmentResult, Optional[str], Dict[str, Union[Question, Exception]]]:
+        """
+        执行一次模块 A、B，再在同一个 `cleaned_context` 上并发生成多种题型，复用前两个阶段的结果。
+
+        - question_types: 指定题型名称；为 None 时按 `assessment.potential_task` 自动挑选
+          （见 `questioner.question_types.select_question_types`），最多 `max_types` 个。
+        - return_exceptions: 见 `QuestionGenerator.generate_many`。
+
+        返回 (assessment, cleaned_context, {题型名称: 题目})；未通过模块 A 时后两项为 None 与空字典。
+        """
+        from .question_types import select_question_types
+
+        local, assess = self._local_decision(raw_text)
+        if local is not None and not local.is_suitable:
+            return local, None, {}
+        n_questions = len(question_types) if question_types is not None else max_types
+        with self._admitted(raw_text, n_questions):
+            assessment = local if local is not None else assess(raw_text)
+            if not assessment.is_suitable:
+                return assessment, None, {}
+
+            if question_types is None:
+                question_types = [
+                    question_type.name
+                    for question_type in select_question_types(assessment.potential_task, max_types)
+                ]
+            cleaned_context = self.rewriter.rewrite(raw_text)
+            questions = self.generator.generate_many(
+                cleaned_context, question_types, return_exceptions=return_exceptions
+            )
+            return assessment, cleaned_context, questions
+
+    def run_document(
+        self,
+        full_text: str,
+        *,
+        max_tokens: int = 800,
+        top_k: int = 3,
+    ) -> List[tuple[Window, tuple[AssessmentResult, Optional[str], Optional[Question]]]]:
+        """
+        对整篇论文执行流水线：先在本地切分出统计信息最密集的 `top_k` 个窗口
+        （见 `questioner.preprocess.select_windows`），只对这些窗口调用 `run()`。
+
+        返回 [(窗口, run() 的结果), ...]，按窗口得分降序。
+        """
+        from .preprocess import select_windows
+
+        windows = select_windows(full_text, max_tokens=max_tokens, top_k=top_k)
+        return [(window, self.run(window.text)) for window in windows]
+
+    def run_batch(
+        self,
+        raw_texts: Sequence[str],
+        backend: BatchBackend,
+        *,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None,
+        structured_output: str = "json_object",
+        question_type: Optional[str] = None,
+        return_exceptions: bool = False,
+    ) -> List[Union[tuple[AssessmentResult, Optional[str], Optional[Question]], Exception]]:
+        """
+        以批处理模式执行流水线：每个阶段的全部请求写成一个 JSONL 批文件提交给 `backend`，
+        等待完成后再把结果作为下一阶段的输入。
+
+        每个片段的返回值与 `run()` 相同，顺序与 `raw_texts` 一致。流水线的 `budget`、`progress`、
+        本地分类器（`ClassifierFilter.local_decision`）与 `n_candidates` 同样生效；
+        `question_type` 指定出题题型。批处理不做推测执行。
+        详见 `questioner.batch.BatchRunner`。
+        """
+        from .batch import BatchRunner
+
+        runner = BatchRunner(
+            backend,
+            poll_interval=poll_interval,
+            timeout=timeout,
+            structured_output=structured_output,
+            budget=self.budget,
+            progress=self.progress,
+            local_decision=getattr(self.filter, "local_decision", None),
+            n_candidates=self.generator.n_candidates,
+            question_type=question_type,
+        )
+        return runner.run(raw_texts, return_exceptions=return_exceptions)
@@ -4,45 +4,70 @@
 
 from __future__ import annotations
 
-import sys
+import importlib.util
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 
 from .config import ModelConfig
-from .llm_client import LLMClient, OpenAIClient
+from .llm_client import LLMClient, create_client
 from .models import AssessmentResult, Question
 from .modules import QuestionerPipeline
 
+if TYPE_CHECKING:
+    from .scheduler import Scheduler
+
+
+# config.py 的加载结果缓存：(文件路径, mtime_ns) -> ModelConfig | None。
+# 每次调用 generate_question_from_text 都会读取默认配置，
+# 缓存后只有在 config.py 被修改时才重新执行该文件。
+_DEFAULT_CONFIG_CACHE: Dict[Tuple[str, int], Optional[ModelConfig]] = {}
+
 
 def _load_default_config():
     """
     从项目根目录的 config.py 文件加载默认配置。
     如果文件不存在或加载失败，返回 None。
+
+    加载结果按文件修改时间缓存，文件未变化时不会重复执行 config.py。
     """
     try:
         # 尝试从项目根目录加载 config.py
         project_root = Path(__file__).parent.parent
         config_path = project_root / "config.py"
-        
-        if config_path.exists():
-            # 动态导入配置模块
-            import importlib.util
-            spec = importlib.util.spec_from_file_location("user_config", config_path)
-            if spec and spec.loader:
-                config_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(config_module)
-                
-                # 读取配置变量
-                model_name = getattr(config_module, "MODEL_NAME", None)
-                api_key = getattr(config_module, "API_KEY", None)
-                base_url = getattr(config_module, "BASE_URL", None)
-                
-                if model_name:
-                    return ModelConfig(
-                        model_name=model_name,
-                        api_key=api_key,
-                        base_url=base_url if base_url else None,
-                    )
+
+        try:
+            mtime_ns = config_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+        cache_key = (str(config_path), mtime_ns)
+        if cache_key in _DEFAULT_CONFIG_CACHE:
+            return _DEFAULT_CONFIG_CACHE[cache_key]
+
+        default_config = None
+        # 动态导入配置模块
+        spec = importlib.util.spec_from_file_location("user_config", config_path)
+        if spec and spec.loader:
+            config_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(config_module)
+
+            # 读取配置变量
+            model_name = getattr(config_module, "MODEL_NAME", None)
+            api_key = getattr(config_module, "API_KEY", None)
+            base_url = getattr(config_module, "BASE_URL", None)
+            client_type = getattr(config_module, "CLIENT_TYPE", None)
+
+            if model_name:
+                default_config = ModelConfig(
+                    model_name=model_name,
+                    api_key=api_key,
+                    base_url=base_url if base_url else None,
+                    client_type=client_type or "openai",
+                )
+
+        _DEFAULT_CONFIG_CACHE.clear()
+        _DEFAULT_CONFIG_CACHE[cache_key] = default_config
+        return default_config
     except Exception:
         # 如果加载失败，静默返回 None，使用其他方式
         pass
@@ -57,6 +82,7 @@ def generate_question_from_text(
     base_url: Optional[str] = None,
     config: Optional[ModelConfig] = None,
     client: Optional[LLMClient] = None,
+    scheduler: Optional[Scheduler] = None,
 ) -> Tuple[AssessmentResult, Optional[str], Optional[Question]]:
     """
     从一段原始论文文本（可以包含对图表的文字描述）生成一道单项选择题。
@@ -77,6 +103,8 @@ def generate_question_from_text(
         - 本地服务: 如 "http://localhost:8000/v1"
     - config: 使用 `ModelConfig` 对象配置模型。如果提供此参数，将忽略 `model_name`、`api_key`、`base_url`。
     - client: 直接传入一个已初始化的 `LLMClient` 实例。如果提供此参数，将忽略其他所有参数。
+    - scheduler: 可选的共享 `Scheduler`。提供时三个阶段的调用都以 "interactive" 优先级排队，
+        优先于同一调度器上的批量任务（见 `questioner.scheduler`）。
 
     示例：
     ```python
@@ -111,14 +139,6 @@ def generate_question_from_text(
         text, client=custom_client
     )
     ```
-    """
-    参数：
-    - raw_text: 论文片段或"统计图表 + 描述文本"的文字部分。
-    - model_name: 模型名称。如果不指定，将从 config.py 文件读取。
-    - api_key: API Key。如果不指定，将从 config.py 或环境变量读取。
-    - base_url: API 基础 URL。如果不指定，将从 config.py 读取。
-    - config: 使用 `ModelConfig` 对象配置模型（优先级最高）。
-    - client: 直接传入 `LLMClient` 实例（优先级最高）。
 
     配置优先级（从高到低）：
     1. client 参数
@@ -129,15 +149,10 @@ def generate_question_from_text(
     """
     if client is not None:
         # 优先级最高：直接使用提供的 client
-        pipeline = QuestionerPipeline(client)
+        pass
     elif config is not None:
         # 优先级第二：使用 ModelConfig 对象
-        client = OpenAIClient(
-            model_name=config.model_name,
-            api_key=config.api_key,
-            base_url=config.base_url,
-        )
-        pipeline = QuestionerPipeline(client)
+        client = create_client(config)
     else:
         # 优先级第三：使用参数或从 config.py 读取
         default_config = _load_default_config()
@@ -153,11 +168,18 @@ def generate_question_from_text(
                 "或使用 config/client 参数。"
             )
         
-        client = OpenAIClient(
-            model_name=final_model_name,
-            api_key=final_api_key,
-            base_url=final_base_url,
+        client = create_client(
+            ModelConfig(
+                model_name=final_model_name,
+                api_key=final_api_key,
+                base_url=final_base_url,
+                client_type=default_config.client_type if default_config else "openai",
+            )
         )
-        pipeline = QuestionerPipeline(client)
 
-    return pipeline.run(raw_text)
+    if scheduler is not None:
+        from .scheduler import INTERACTIVE, ScheduledClient
+
+        client = ScheduledClient(client, scheduler, priority_class=INTERACTIVE)
+    with QuestionerPipeline(client) as pipeline:
+        return pipeline.run(raw_text)
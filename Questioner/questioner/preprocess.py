@@ -0,0 +1,296 @@
+"""
+模块 A 之前的预处理：把整篇论文切分为统计信息密集的窗口。
+
+`generate_question_from_text` 期望输入一段已经切好的片段；整篇论文直接送入
+`DataQualityFilter` 既浪费 token，也可能超出上下文窗口。这里完全在本地完成：
+
+1. 按章节标题（Methods / Results / 方法 / 结果 等）切分章节，按空行切分段落；
+2. 识别图表标题（"Figure 2." / "Table 1" / "图 2" 等），并与正文中引用它的段落配对；
+3. 按章节权重与统计信息密度（样本量、p 值、置信区间、方法名等）给每个单元打分；
+4. 在 token 上限内把同一章节的相邻段落打包成窗口，按得分排序，只保留前若干个。
+
+示例：
+```python
+windows = select_windows(full_text, max_tokens=800, top_k=3)
+for window in windows:
+    assessment, cleaned, question = pipeline.run(window.text)
+```
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .tokens import count_tokens
+
+# 章节标题 -> 规范化名称
+_SECTION_ALIASES: Dict[str, tuple[str, ...]] = {
+    "abstract": ("abstract", "summary", "摘要"),
+    "introduction": ("introduction", "background", "引言", "背景"),
+    "methods": (
+        "methods",
+        "materials and methods",
+        "methodology",
+        "statistical analysis",
+        "statistical analyses",
+        "study design",
+        "方法",
+        "统计分析",
+        "研究方法",
+    ),
+    "results": ("results", "findings", "结果"),
+    "discussion": ("discussion", "conclusion", "conclusions", "讨论", "结论"),
+    "references": ("references", "bibliography", "acknowledgements", "acknowledgments", "参考文献", "致谢"),
+}
+
+# 章节权重：Methods / Results 信息最密集，参考文献等直接丢弃
+SECTION_WEIGHTS: Dict[str, float] = {
+    "methods": 1.5,
+    "results": 1.5,
+    "figure": 1.4,
+    "abstract": 1.0,
+    "body": 0.8,
+    "discussion": 0.6,
+    "introduction": 0.4,
+    "references": 0.0,
+}
+
+_HEADING = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?\s+)?(?P<title>[A-Za-z\u4e00-\u9fff][A-Za-z\u4e00-\u9fff &]{1,40}?)\s*[:：]?\s*$"
+)
+_CAPTION = re.compile(
+    r"^\s*(?P<kind>fig(?:ure)?\.?|table|图|表)\s*(?P<num>[0-9]+[A-Za-z]?)\s*[.:：、|]?",
+    re.I,
+)
+# 缩写（OR / SD 等）区分大小写，否则会命中英文的 "or" / "se"；中文只用带数字或限定词的形式，
+# 单字 "例" / "组" 会命中 "例子" / "组织" 等普通词
+_STAT_PATTERNS = (
+    re.compile(r"\b[nN]\s*=\s*\d"),
+    re.compile(r"\bp\s*[<>=≤≥]\s*0?\.\d", re.I),
+    re.compile(r"\b\d{2,}(?:,\d{3})*\s+(?:participants|patients|subjects|samples|individuals)", re.I),
+    re.compile(r"\b(?:95%|99%)\s*(?:CI|confidence interval)", re.I),
+    re.compile(r"\b(?:OR|HR|RR|AUC|SD|SE|IQR)\b"),
+    re.compile(r"\b(?:mean|median|odds ratio|hazard ratio|standard deviation)\b", re.I),
+    re.compile(r"\b(?:randomi[sz]ed|cohort|cross-sectional|case-control|longitudinal|paired)\b", re.I),
+    re.compile(r"(?:t-test|chi-squared?|anova|regression|wilcoxon|mann-whitney|kruskal|correlation)", re.I),
+    re.compile(r"\d+(?:\.\d+)?\s*%"),
+    re.compile(r"样本|受试者|\d+\s*例|[A-Z一二三两四五]组|对照组|实验组|均值|中位数|置信区间|回归|检验|随机"),
+)
+
+
+@dataclass
+class Window:
+    """送入模块 A 的候选窗口。"""
+
+    text: str
+    section: str
+    score: float
+    density: float
+    tokens: int
+    captions: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Unit:
+    text: str
+    section: str
+    tokens: int
+    caption_key: Optional[str] = None
+    paired_caption: Optional[str] = None
+
+
+def _section_of(line: str) -> Optional[str]:
+    match = _HEADING.match(line)
+    if not match:
+        return None
+    title = match.group("title").strip().lower()
+    for name, aliases in _SECTION_ALIASES.items():
+        if title in aliases:
+            return name
+    return None
+
+
+def _caption_key(paragraph: str) -> Optional[str]:
+    match = _CAPTION.match(paragraph)
+    if not match:
+        return None
+    kind = match.group("kind").lower()
+    prefix = "table" if kind in ("table", "表") else "figure"
+    return f"{prefix}:{match.group('num').lower()}"
+
+
+def _reference_pattern(key: str) -> re.Pattern[str]:
+    prefix, num = key.split(":")
+    words = r"(?:tables?|表)" if prefix == "table" else r"(?:fig(?:ure)?s?\.?|图)"
+    return re.compile(rf"{words}\s*{re.escape(num)}(?![0-9])", re.I)
+
+
+def stat_density(text: str) -> float:
+    """统计信息密度：每 100 个 token 内命中的统计特征数。"""
+    tokens = max(count_tokens(text), 1)
+    hits = sum(len(pattern.findall(text)) for pattern in _STAT_PATTERNS)
+    return 100.0 * hits / tokens
+
+
+def split_paragraphs(full_text: str) -> List[tuple[str, str]]:
+    """按章节标题和空行切分，返回 [(章节名, 段落), ...]；章节标题本身不作为段落。"""
+    section = "body"
+    paragraphs: List[tuple[str, str]] = []
+    buffer: List[str] = []
+
+    def flush() -> None:
+        if buffer:
+            paragraphs.append((section, " ".join(buffer).strip()))
+            buffer.clear()
+
+    for line in full_text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            flush()
+            continue
+        heading = _section_of(stripped)
+        if heading is not None:
+            flush()
+            section = heading
+            continue
+        if _CAPTION.match(stripped):
+            # 图表标题总是单独成段
+            flush()
+        buffer.append(stripped)
+    flush()
+    return paragraphs
+
+
+def _build_units(full_text: str, model_name: Optional[str]) -> List[_Unit]:
+    units: List[_Unit] = []
+    captions: Dict[str, _Unit] = {}
+    for section, paragraph in split_paragraphs(full_text):
+        if SECTION_WEIGHTS.get(section, 1.0) <= 0:
+            continue
+        key = _caption_key(paragraph)
+        unit = _Unit(
+            text=paragraph,
+            section="figure" if key else section,
+            tokens=count_tokens(paragraph, model_name),
+            caption_key=key,
+        )
+        if key:
+            captions.setdefault(key, unit)
+        units.append(unit)
+
+    # 把每个图表标题附到第一个引用它的正文段落上；未被引用的标题保持独立
+    paired = set()
+    for key, caption in captions.items():
+        pattern = _reference_pattern(key)
+        for unit in units:
+            if unit.caption_key is None and unit.paired_caption is None and pattern.search(unit.text):
+                unit.paired_caption = caption.text
+                paired.add(id(caption))
+                break
+    return [unit for unit in units if id(unit) not in paired]
+
+
+def select_windows(
+    full_text: str,
+    max_tokens: int = 800,
+    top_k: int = 3,
+    min_density: float = 1.0,
+    model_name: Optional[str] = None,
+) -> List[Window]:
+    """
+    把整篇论文切分为不超过 `max_tokens` 的窗口，返回得分最高的 `top_k` 个（按得分降序）。
+
+    - 图表标题与引用它的段落合并在同一窗口中；
+    - 同一章节内的相邻段落在不超过上限时合并；超过上限的单个段落按句子截断，
+      附带的图表标题本身就超过上限时，标题与段落各截断到上限的一半；
+    - 得分 = 章节权重 × 平均统计信息密度，低于 `min_density` 的窗口直接丢弃。
+    """
+    windows: List[Window] = []
+    current: List[_Unit] = []
+
+    def emit() -> None:
+        if not current:
+            return
+        parts: List[str] = []
+        captions: List[str] = []
+        for unit in current:
+            parts.append(unit.text)
+            if unit.paired_caption:
+                parts.append(unit.paired_caption)
+                captions.append(unit.paired_caption)
+            if unit.caption_key:
+                captions.append(unit.text)
+        text = "\n\n".join(parts)
+        density = stat_density(text)
+        section = current[0].section
+        weight = SECTION_WEIGHTS.get(section, 1.0)
+        if captions:
+            weight = max(weight, SECTION_WEIGHTS["figure"])
+        windows.append(
+            Window(
+                text=text,
+                section=section,
+                score=weight * density,
+                density=density,
+                tokens=count_tokens(text, model_name),
+                captions=captions,
+            )
+        )
+        current.clear()
+
+    current_tokens = 0
+    for unit in _build_units(full_text, model_name):
+        caption_tokens = count_tokens(unit.paired_caption, model_name) if unit.paired_caption else 0
+        unit_tokens = unit.tokens + caption_tokens
+        if unit_tokens > max_tokens:
+            emit()
+            if caption_tokens >= max_tokens:
+                # 标题本身就占满上限：标题与段落各保留一半
+                unit.paired_caption = _truncate(unit.paired_caption, max_tokens // 2, model_name)
+                caption_tokens = count_tokens(unit.paired_caption, model_name)
+            unit.text = _truncate(unit.text, max_tokens - caption_tokens, model_name)
+            unit.tokens = count_tokens(unit.text, model_name)
+            current.append(unit)
+            emit()
+            current_tokens = 0
+            continue
+        if current and (
+            unit.section != current[0].section or current_tokens + unit_tokens > max_tokens
+        ):
+            emit()
+            current_tokens = 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    emit()
+
+    ranked = sorted(
+        (window for window in windows if window.density >= min_density),
+        key=lambda window: window.score,
+        reverse=True,
+    )
+    return ranked[:top_k]
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?。！？；;])\s*")
+
+
+def _truncate(text: str, max_tokens: int, model_name: Optional[str]) -> str:
+    """按句子截断到不超过 `max_tokens`；单句就超过上限时按字符截断。"""
+    max_tokens = max(0, max_tokens)
+    if max_tokens == 0:
+        return ""
+    kept: List[str] = []
+    used = 0
+    for sentence in filter(None, _SENTENCE_END.split(text)):
+        tokens = count_tokens(sentence, model_name)
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    if kept:
+        return " ".join(kept)
+    # 单句超长：按比例截取字符
+    ratio = max_tokens / max(count_tokens(text, model_name), 1)
+    return text[: max(1, int(len(text) * ratio))]
@@ -0,0 +1,359 @@
+"""
+长时间运行的进度与吞吐遥测。
+
+十万级片段的运行过去完全是黑盒：没有进度、没有预计剩余时间、也看不到模块 A 的通过率。这里提供：
+
+- `Progress`：计数器集合。每个线程只写自己的分片（无锁），读取时把各分片相加，
+  因此统计不会拖慢热路径；读到的快照可能比实际落后几个计数，对进度展示无影响。
+  已退出线程的分片在下一次注册或读取时并入汇总，分片数不超过存活的线程数；
+- `TelemetryClient`：按阶段包装 `LLMClient`，记录调用数、在途请求数（已发出、尚未返回）、失败与重试次数、
+  token 用量。在途数不是排队数：使用 `Scheduler` 时，真正的排队数由快照中的 "queued" 给出；
+- `ProgressMonitor`：后台线程定时在终端刷新一行状态，并可选地在本地端口提供 HTTP/JSON 状态接口。
+
+示例：
+```python
+progress = Progress()
+pipeline = QuestionerPipeline(client, progress=progress)
+with ProgressMonitor(progress, http_port=8765):
+    results = pipeline.run_many(raw_texts, max_workers=32)
+# 另一个终端：curl http://127.0.0.1:8765/
+```
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, TextIO
+
+from .llm_client import LLMClient
+
+if TYPE_CHECKING:
+    from .budget import BudgetManager
+    from .scheduler import Scheduler
+
+STAGES = ("assess", "rewrite", "generate")
+
+
+class Progress:
+    """
+    线程分片的计数器集合。
+
+    计数器名称约定：
+    - "total" / "done" / "accepted" / "rejected" / "errors": 片段级计数；
+    - "pending": 已提交但尚未开始的片段数；
+    - "in_flight:<stage>" / "calls:<stage>" / "call_errors:<stage>": 各阶段的请求计数；
+    - "retries" / "prompt_tokens" / "completion_tokens": 请求级累计。
+    """
+
+    def __init__(self, total: int = 0) -> None:
+        self._local = threading.local()
+        # (写入线程, 分片)；线程退出后其分片并入 `_retired`
+        self._shards: List[tuple[threading.Thread, Dict[str, float]]] = []
+        self._retired: Dict[str, float] = defaultdict(float)
+        self._register_lock = threading.Lock()
+        self.started = time.monotonic()
+        if total:
+            self.add("total", total)
+
+    def _shard(self) -> Dict[str, float]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = defaultdict(float)
+            # 每个线程只注册一次；线程池反复创建新线程时顺带回收已退出线程的分片
+            with self._register_lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _retire_dead_shards(self) -> None:
+        """把已退出线程的分片并入汇总（调用方持有 `_register_lock`）。退出的线程不会再写分片。"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+                continue
+            for name, value in shard.items():
+                self._retired[name] += value
+        self._shards = alive
+
+    def add(self, name: str, value: float = 1) -> None:
+        """给计数器 `name` 加上 `value`（只写当前线程的分片）。"""
+        self._shard()[name] += value
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """在 with 块内把阶段 `name` 的在途请求数加 1。"""
+        shard = self._shard()
+        shard[f"in_flight:{name}"] += 1
+        try:
+            yield
+        finally:
+            shard[f"in_flight:{name}"] -= 1
+
+    def record_passage(self, accepted: Optional[bool]) -> None:
+        """记录一个片段完成：`accepted` 为模块 A 的结论，为 None 表示处理失败。"""
+        shard = self._shard()
+        shard["done"] += 1
+        if accepted is None:
+            shard["errors"] += 1
+        elif accepted:
+            shard["accepted"] += 1
+        else:
+            shard["rejected"] += 1
+
+    def counters(self) -> Dict[str, float]:
+        """所有线程分片相加后的计数器。"""
+        with self._register_lock:
+            self._retire_dead_shards()
+            totals: Dict[str, float] = defaultdict(float, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            for name, value in list(shard.items()):
+                totals[name] += value
+        return totals
+
+    def snapshot(
+        self,
+        budget: Optional[BudgetManager] = None,
+        scheduler: Optional[Scheduler] = None,
+    ) -> Dict[str, Any]:
+        """
+        当前状态：进度、吞吐、通过率、各阶段在途请求数、失败与重试次数、token 用量与预计剩余时间。
+        提供 `budget` 时附带整次运行的费用；提供 `scheduler` 时附带各优先级类别中排队等待额度的请求数。
+        """
+        counters = self.counters()
+        elapsed = time.monotonic() - self.started
+        total = int(counters["total"])
+        done = int(counters["done"])
+        judged = counters["accepted"] + counters["rejected"]
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(total - done, 0)
+        snapshot: Dict[str, Any] = {
+            "elapsed": round(elapsed, 3),
+            "total": total,
+            "done": done,
+            "passages_per_second": round(rate, 3),
+            "accepted": int(counters["accepted"]),
+            "rejected": int(counters["rejected"]),
+            "accept_rate": round(counters["accepted"] / judged, 4) if judged else None,
+            "errors": int(counters["errors"]),
+            "pending": int(counters["pending"]),
+            "in_flight": {stage: int(counters[f"in_flight:{stage}"]) for stage in STAGES},
+            "calls": {stage: int(counters[f"calls:{stage}"]) for stage in STAGES},
+            "call_errors": {stage: int(counters[f"call_errors:{stage}"]) for stage in STAGES},
+            "retries": int(counters["retries"]),
+            "prompt_tokens": int(counters["prompt_tokens"]),
+            "completion_tokens": int(counters["completion_tokens"]),
+            "eta_seconds": round(remaining / rate, 1) if rate > 0 and total else None,
+        }
+        if budget is not None:
+            run = budget.summary().get("run")
+            snapshot["cost"] = run["cost"] if run else 0.0
+        if scheduler is not None:
+            snapshot["queued"] = {
+                name: metrics["queued"] for name, metrics in scheduler.metrics().items()
+            }
+        return snapshot
+
+
+class TelemetryClient(LLMClient):
+    """
+    为某个阶段包装 `LLMClient`，把调用数、在途请求数、失败、重试与 token 用量记入 `Progress`。
+
+    一般无需直接使用，`QuestionerPipeline(client, progress=...)` 会为三个阶段分别创建。
+    """
+
+    def __init__(self, client: LLMClient, progress: Progress, stage: str) -> None:
+        self._client = client
+        self._progress = progress
+        self._stage = stage
+        self._model_name = client.model_name
+
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        return self._client.last_usage
+
+    @property
+    def last_retries(self) -> int:
+        return self._client.last_retries
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        progress = self._progress
+        progress.add(f"calls:{self._stage}")
+        with progress.stage(self._stage):
+            try:
+                result = getattr(self._client, method)(*args, **kwargs)
+            except Exception:
+                progress.add(f"call_errors:{self._stage}")
+                progress.add("retries", self._client.last_retries)
+                raise
+        progress.add("retries", self._client.last_retries)
+        usage = self._client.last_usage
+        if usage is not None:
+            progress.add("prompt_tokens", usage["prompt_tokens"])
+            progress.add("completion_tokens", usage["completion_tokens"])
+        return result
+
+    def generate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        return self._call(
+            "generate_structured_json", system_prompt, user_content, json_schema=json_schema
+        )
+
+    def generate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        return self._call("generate_text", system_prompt, user_content)
+
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        return self._call(
+            "generate_json_candidates", system_prompt, user_content, n, json_schema=json_schema
+        )
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _format_count(value: float) -> str:
+    for unit, scale in (("B", 1e9), ("M", 1e6), ("k", 1e3)):
+        if value >= scale:
+            return f"{value / scale:.1f}{unit}"
+    return str(int(value))
+
+
+def format_status(snapshot: Dict[str, Any]) -> str:
+    """把 `Progress.snapshot()` 渲染为一行终端状态。"""
+    total = snapshot["total"]
+    percent = f"{100 * snapshot['done'] / total:5.1f}%" if total else "  -  "
+    accept = snapshot["accept_rate"]
+    in_flight = snapshot["in_flight"]
+    parts = [
+        f"[{percent}] {snapshot['done']}/{total or '?'}",
+        f"{snapshot['passages_per_second']:.2f}/s",
+        f"accept {accept:.1%}" if accept is not None else "accept -",
+        f"A:{in_flight['assess']} B:{in_flight['rewrite']} C:{in_flight['generate']} pending:{snapshot['pending']}",
+    ]
+    if "queued" in snapshot:
+        parts.append(f"queued {sum(snapshot['queued'].values())}")
+    parts += [
+        f"err {snapshot['errors']} retry {snapshot['retries']}",
+        f"tok {_format_count(snapshot['prompt_tokens'] + snapshot['completion_tokens'])}",
+    ]
+    if "cost" in snapshot:
+        parts.append(f"${snapshot['cost']:.2f}")
+    parts.append(f"ETA {_format_duration(snapshot['eta_seconds'])}")
+    return " | ".join(parts)
+
+
+class ProgressMonitor:
+    """
+    后台展示进度：每 `interval` 秒在 `stream` 上刷新一行状态（终端中原地刷新，否则逐行输出）；
+    提供 `http_port` 时在 `host:http_port` 上以 JSON 返回 `Progress.snapshot()`（端口为 0 时自动分配，
+    实际端口见 `http_address`）。提供 `budget` / `scheduler` 时快照附带费用与排队数（见 `Progress.snapshot`）。
+
+    可作为上下文管理器使用，退出时输出最后一行状态。
+    """
+
+    def __init__(
+        self,
+        progress: Progress,
+        *,
+        interval: float = 1.0,
+        stream: Optional[TextIO] = None,
+        http_port: Optional[int] = None,
+        host: str = "127.0.0.1",
+        budget: Optional[BudgetManager] = None,
+        scheduler: Optional[Scheduler] = None,
+    ) -> None:
+        self.progress = progress
+        self.interval = interval
+        self.stream = stream if stream is not None else sys.stderr
+        self.budget = budget
+        self.scheduler = scheduler
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        if http_port is not None:
+            self._httpd = ThreadingHTTPServer((host, http_port), self._handler_class())
+            self._httpd.daemon_threads = True
+
+    @property
+    def http_address(self) -> Optional[tuple[str, int]]:
+        return self._httpd.server_address[:2] if self._httpd is not None else None
+
+    def _handler_class(self) -> type:
+        monitor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                payload = json.dumps(monitor.snapshot(), ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.progress.snapshot(self.budget, self.scheduler)
+
+    def _render(self, final: bool = False) -> None:
+        line = format_status(self.snapshot())
+        if self.stream.isatty():
+            self.stream.write("\r\033[K" + line + ("\n" if final else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._render()
+
+    def start(self) -> ProgressMonitor:
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        if self._httpd is not None:
+            threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        self._render(final=True)
+
+    def __enter__(self) -> ProgressMonitor:
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
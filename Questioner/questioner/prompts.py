@@ -67,3 +67,89 @@ SYSTEM_PROMPT_GENERATE = """
 }
 """
 
+
+SYSTEM_PROMPT_ANSWER = """
+你是一名统计学考生。请阅读下面的单项选择题，选出唯一正确的选项。
+
+只输出一行，格式为：
+答案: <选项字母>
+"""
+
+
+# 以下为其它题型的出题 Prompt，与 SYSTEM_PROMPT_GENERATE 共用同一输出格式，
+# 由 `questioner.question_types` 按 `AssessmentResult.potential_task` 选用。
+
+_QUESTION_JSON_FORMAT = """
+请严格按照以下 JSON 格式输出：
+{
+    "stem": "题目描述...",
+    "options": {
+        "A": "...",
+        "B": "...",
+        "C": "...",
+        "D": "..."
+    },
+    "answer": "A",
+    "analysis": "详细解析..."
+}
+"""
+
+
+SYSTEM_PROMPT_GENERATE_CI = """
+你是一个统计学考试出题专家。基于以下【研究场景描述】（Context），请编写一道单项选择题。
+
+出题要求：
+1. 题型: 重点考察 "Confidence Interval Interpretation" (置信区间解读)。
+2. 题干: 给出场景中的一个效应量及其置信区间（如场景中没有具体数值，可按研究设计构造合理数值），询问下列哪种解读是正确的。
+3. 选项:
+   - 提供 4 个选项 (A/B/C/D)。
+   - 干扰项应覆盖常见误解（例如："真实值有 95% 的概率落在该区间内"、把区间包含 1 或 0 的含义弄反、混淆置信区间与参考范围）。
+4. 解析:
+   - 解释正确选项的频率学含义，以及区间是否包含无效值对结论的影响。
+   - 逐一说明其他选项错在哪里。
+""" + _QUESTION_JSON_FORMAT
+
+
+SYSTEM_PROMPT_GENERATE_RESULT = """
+你是一个统计学考试出题专家。基于以下【研究场景描述】（Context），请编写一道单项选择题。
+
+出题要求：
+1. 题型: 重点考察 "Result Interpretation" (检验结果与 p 值解读)。
+2. 题干: 给出场景中某项比较的检验结果（如场景中没有具体数值，可按研究设计构造合理数值），询问下列哪个结论是恰当的。
+3. 选项:
+   - 提供 4 个选项 (A/B/C/D)。
+   - 干扰项应覆盖常见误解（例如：把 p 值当作原假设为真的概率、把"不显著"解读为"没有差异"、把统计显著等同于临床意义、由相关推断因果）。
+4. 解析:
+   - 解释为什么正确选项的结论与研究设计和检验结果一致。
+   - 逐一说明其他选项错在哪里。
+""" + _QUESTION_JSON_FORMAT
+
+
+SYSTEM_PROMPT_GENERATE_ASSUMPTION = """
+你是一个统计学考试出题专家。基于以下【研究场景描述】（Context），请编写一道单项选择题。
+
+出题要求：
+1. 题型: 重点考察 "Assumption Checking" (统计方法的前提条件)。
+2. 题干: 描述研究人员计划采用的分析思路（不要直接写出方法名称），询问在分析前最需要检查哪一项前提条件，或某项前提不满足时应如何处理。
+3. 选项:
+   - 提供 4 个选项 (A/B/C/D)。
+   - 干扰项应是其他方法的前提条件或与本设计无关的条件（例如：对分类结局检查正态性、对独立样本检查配对差值分布）。
+4. 解析:
+   - 解释为什么正确选项是该设计下的关键前提（基于样本独立性、变量类型、分布等）。
+   - 逐一说明其他选项为什么不适用。
+""" + _QUESTION_JSON_FORMAT
+
+
+SYSTEM_PROMPT_GENERATE_DESIGN = """
+你是一个统计学考试出题专家。基于以下【研究场景描述】（Context），请编写一道单项选择题。
+
+出题要求：
+1. 题型: 重点考察 "Study Design & Variable Types" (研究设计与变量类型识别)。
+2. 题干: 询问该研究属于哪种研究设计，或其主要结局 / 暴露变量属于哪种变量类型。
+3. 选项:
+   - 提供 4 个选项 (A/B/C/D)。
+   - 干扰项应是容易混淆的设计或类型（例如：队列研究与病例对照研究、横断面与纵向、有序分类与连续变量、独立样本与配对样本）。
+4. 解析:
+   - 结合场景中的抽样方式、随访与分组结构，解释为什么正确选项最匹配。
+   - 逐一说明其他选项错在哪里。
+""" + _QUESTION_JSON_FORMAT
@@ -0,0 +1,146 @@
+"""
+可插拔的题型模板。
+
+`SYSTEM_PROMPT_GENERATE` 只覆盖"统计方法选择"一种题型，而模块 A 的 `potential_task`
+常常提示更多可能（例如"解读置信区间"）。这里维护一个题型注册表：每个题型有自己的出题 Prompt
+和一组用于匹配 `potential_task` 的关键词。`select_question_types()` 据此为一个片段挑选题型，
+`QuestionGenerator.generate_many()` 在同一个 `cleaned_context` 上并发生成多种题型。
+
+注册自定义题型：
+```python
+register_question_type(
+    QuestionType(
+        name="power",
+        description="样本量与检验效能",
+        keywords=("样本量计算", "power", "检验效能"),
+        system_prompt=MY_PROMPT,
+    )
+)
+```
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from .prompts import (
+    SYSTEM_PROMPT_GENERATE,
+    SYSTEM_PROMPT_GENERATE_ASSUMPTION,
+    SYSTEM_PROMPT_GENERATE_CI,
+    SYSTEM_PROMPT_GENERATE_DESIGN,
+    SYSTEM_PROMPT_GENERATE_RESULT,
+)
+
+DEFAULT_QUESTION_TYPE = "method_selection"
+
+
+@dataclass(frozen=True)
+class QuestionType:
+    """
+    一种题型。
+
+    - name: 题型标识。
+    - description: 简短说明。
+    - keywords: 在 `potential_task` 中出现任一关键词（不区分大小写）即视为建议该题型。
+    - system_prompt: 模块 C 使用的出题 Prompt，输出格式须与 `Question` 一致。
+    """
+
+    name: str
+    description: str
+    keywords: tuple[str, ...]
+    system_prompt: str
+
+
+_REGISTRY: Dict[str, QuestionType] = {}
+
+
+def register_question_type(question_type: QuestionType, *, replace: bool = False) -> None:
+    """注册题型。同名题型已存在且 `replace=False` 时抛出 ValueError。"""
+    if question_type.name in _REGISTRY and not replace:
+        raise ValueError(f"题型 {question_type.name!r} 已注册，如需覆盖请传入 replace=True")
+    _REGISTRY[question_type.name] = question_type
+
+
+def get_question_type(name: str) -> QuestionType:
+    """按名称获取题型，未注册时抛出 ValueError。"""
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(
+            f"未知的题型: {name!r}，已注册的题型为 {sorted(_REGISTRY)}"
+        ) from None
+
+
+def list_question_types() -> List[QuestionType]:
+    """按注册顺序返回全部题型。"""
+    return list(_REGISTRY.values())
+
+
+def select_question_types(
+    potential_task: str,
+    max_types: int = 3,
+    default: Optional[str] = DEFAULT_QUESTION_TYPE,
+) -> List[QuestionType]:
+    """
+    根据 `potential_task` 挑选题型，按关键词在文本中首次出现的位置排序，最多 `max_types` 个。
+
+    没有任何题型命中时返回 `default`（为 None 时返回空列表）。
+    """
+    if max_types < 1:
+        raise ValueError("max_types 必须大于等于 1")
+    lowered = potential_task.lower()
+    hits: List[tuple[int, int, QuestionType]] = []
+    for order, question_type in enumerate(_REGISTRY.values()):
+        positions = [
+            lowered.find(keyword.lower())
+            for keyword in question_type.keywords
+            if keyword.lower() in lowered
+        ]
+        if positions:
+            hits.append((min(positions), order, question_type))
+    if not hits:
+        return [get_question_type(default)] if default is not None else []
+    return [question_type for _, _, question_type in sorted(hits, key=lambda hit: hit[:2])][
+        :max_types
+    ]
+
+
+def resolve_question_types(names: Sequence[str]) -> List[QuestionType]:
+    """把题型名称列表转换为 `QuestionType` 列表，去除重复并保持顺序。"""
+    return [get_question_type(name) for name in dict.fromkeys(names)]
+
+
+for _question_type in (
+    QuestionType(
+        name=DEFAULT_QUESTION_TYPE,
+        description="统计方法选择",
+        keywords=("检验方法", "统计方法", "方法选择", "选择检验", "选择方法", "method"),
+        system_prompt=SYSTEM_PROMPT_GENERATE,
+    ),
+    QuestionType(
+        name="ci_interpretation",
+        description="置信区间解读",
+        keywords=("置信区间", "confidence interval", "区间估计", "95%"),
+        system_prompt=SYSTEM_PROMPT_GENERATE_CI,
+    ),
+    QuestionType(
+        name="result_interpretation",
+        description="检验结果与 p 值解读",
+        keywords=("p 值", "p值", "p-value", "显著", "解读结果", "结果解读", "结论", "significan"),
+        system_prompt=SYSTEM_PROMPT_GENERATE_RESULT,
+    ),
+    QuestionType(
+        name="assumption_checking",
+        description="统计方法的前提条件",
+        keywords=("前提", "假设条件", "适用条件", "正态", "方差齐", "assumption"),
+        system_prompt=SYSTEM_PROMPT_GENERATE_ASSUMPTION,
+    ),
+    QuestionType(
+        name="study_design",
+        description="研究设计与变量类型识别",
+        keywords=("研究设计", "变量类型", "设计类型", "study design", "variable type"),
+        system_prompt=SYSTEM_PROMPT_GENERATE_DESIGN,
+    ),
+):
+    register_question_type(_question_type)
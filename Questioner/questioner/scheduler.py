@@ -0,0 +1,303 @@
+"""
+共享的优先级调度器：让交互式请求与批量任务共用同一个端点配额。
+
+编辑通过 `generate_question_from_text` 交互式出题时，夜间的批量运行会占满端点的并发额度，
+交互式请求只能排队。`Scheduler` 放在所有 `LLMClient` 前面，统一控制同时发往端点的请求数：
+
+- 优先级类别：数值越小越优先，空出的并发额度总是先给最高优先级类别中等待的请求，
+  因此交互式请求可以插队，批量任务只使用剩余的额度；
+- 同一类别内，不同任务（job）之间按权重做加权公平排队（self-clocked fair queuing）：
+  每个请求的完成标签 = max(类别虚拟时间, 该任务上一个请求的完成标签) + 1 / 权重，按标签从小到大放行；
+- 截止时间：请求可以带截止时间，同一标签下截止时间早的先放行；到截止时间仍未获得额度的请求
+  不再发送，抛出 `DeadlineExceeded`；
+- 每个类别导出排队等待时间的统计（次数、均值、p50、p95、最大值与超时次数）。
+
+示例：
+```python
+scheduler = Scheduler(max_concurrency=16)
+bulk = ScheduledClient(client, scheduler, priority_class="bulk", job="nightly-2024-06-01")
+interactive = ScheduledClient(client, scheduler, priority_class="interactive", timeout=30)
+...
+print(scheduler.metrics())
+```
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .llm_client import LLMClient
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# 类别名 -> 优先级，数值越小越优先
+DEFAULT_PRIORITY_CLASSES: Dict[str, int] = {INTERACTIVE: 0, "default": 5, BULK: 10}
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求在截止时间前没有获得并发额度。"""
+
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    finish_tag: float
+    deadline: float
+    seq: int
+    priority_class: str = field(compare=False)
+    enqueued: float = field(compare=False)
+    event: threading.Event = field(compare=False, default_factory=threading.Event)
+    granted: bool = field(compare=False, default=False)
+    cancelled: bool = field(compare=False, default=False)
+
+
+class _ClassMetrics:
+    def __init__(self, window: int) -> None:
+        self.waits: Deque[float] = deque(maxlen=window)
+        self.granted = 0
+        self.expired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def to_dict(self, queued: int) -> dict:
+        waits = sorted(self.waits)
+
+        def quantile(q: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(q * len(waits)))]
+
+        return {
+            "granted": self.granted,
+            "expired": self.expired,
+            "queued": queued,
+            "mean_wait": round(self.total_wait / self.granted, 6) if self.granted else 0.0,
+            "p50_wait": round(quantile(0.5), 6),
+            "p95_wait": round(quantile(0.95), 6),
+            "max_wait": round(self.max_wait, 6),
+        }
+
+
+class Scheduler:
+    """
+    线程安全的优先级调度器。
+
+    参数：
+    - max_concurrency: 同时发往端点的最大请求数（所有类别共享）。
+    - priority_classes: 类别名 -> 优先级，默认 `DEFAULT_PRIORITY_CLASSES`。
+    - metrics_window: 每个类别用于计算分位数的最近等待时间样本数。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        priority_classes: Optional[Dict[str, int]] = None,
+        metrics_window: int = 1000,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 必须大于等于 1")
+        self.max_concurrency = max_concurrency
+        self.priority_classes = dict(priority_classes or DEFAULT_PRIORITY_CLASSES)
+        self._lock = threading.Lock()
+        self._heap: List[_Ticket] = []
+        self._active = 0
+        self._seq = itertools.count()
+        # 类别虚拟时间与各任务上一个请求的完成标签
+        self._virtual_time: Dict[str, float] = {}
+        self._job_finish: Dict[tuple[str, str], float] = {}
+        self._metrics = {
+            name: _ClassMetrics(metrics_window) for name in self.priority_classes
+        }
+
+    def _dispatch(self) -> None:
+        # 调用方持有 self._lock
+        now = time.monotonic()
+        while self._heap and self._active < self.max_concurrency:
+            ticket = heapq.heappop(self._heap)
+            if ticket.cancelled:
+                continue
+            if ticket.deadline <= now:
+                ticket.cancelled = True
+                self._metrics[ticket.priority_class].expired += 1
+                ticket.event.set()
+                continue
+            ticket.granted = True
+            self._active += 1
+            self._virtual_time[ticket.priority_class] = ticket.finish_tag
+            wait = now - ticket.enqueued
+            metrics = self._metrics[ticket.priority_class]
+            metrics.granted += 1
+            metrics.total_wait += wait
+            metrics.max_wait = max(metrics.max_wait, wait)
+            metrics.waits.append(wait)
+            ticket.event.set()
+
+    def _enqueue(
+        self,
+        priority_class: str,
+        job: str,
+        weight: float,
+        deadline: Optional[float],
+    ) -> _Ticket:
+        if priority_class not in self.priority_classes:
+            raise ValueError(
+                f"未知的优先级类别: {priority_class!r}，可选值为 {sorted(self.priority_classes)}"
+            )
+        if weight <= 0:
+            raise ValueError("weight 必须大于 0")
+        with self._lock:
+            job_key = (priority_class, job)
+            start = max(
+                self._virtual_time.get(priority_class, 0.0),
+                self._job_finish.get(job_key, 0.0),
+            )
+            finish_tag = start + 1.0 / weight
+            self._job_finish[job_key] = finish_tag
+            ticket = _Ticket(
+                priority=self.priority_classes[priority_class],
+                finish_tag=finish_tag,
+                deadline=deadline if deadline is not None else math.inf,
+                seq=next(self._seq),
+                priority_class=priority_class,
+                enqueued=time.monotonic(),
+            )
+            heapq.heappush(self._heap, ticket)
+            self._dispatch()
+        return ticket
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(
+        self,
+        priority_class: str = "default",
+        *,
+        job: str = "",
+        weight: float = 1.0,
+        deadline: Optional[float] = None,
+    ) -> Iterator[None]:
+        """
+        获取一个并发额度，在 with 块结束时归还。
+
+        - job: 任务标识，同一类别内按任务做加权公平排队。
+        - weight: 任务权重，权重为 2 的任务获得的额度约为权重为 1 的任务的两倍。
+        - deadline: `time.monotonic()` 时间戳；到时仍未获得额度则抛出 `DeadlineExceeded`。
+        """
+        ticket = self._enqueue(priority_class, job, weight, deadline)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        ticket.event.wait(timeout)
+        with self._lock:
+            if not ticket.granted:
+                if not ticket.cancelled:
+                    # 等待超时但还在堆中：标记后由 _dispatch 惰性删除
+                    ticket.cancelled = True
+                    self._metrics[priority_class].expired += 1
+                raise DeadlineExceeded(f"{priority_class} 请求在截止时间前未获得并发额度")
+        try:
+            yield
+        finally:
+            self._release()
+
+    def metrics(self) -> Dict[str, dict]:
+        """各类别的排队等待时间统计（秒）以及当前排队数。"""
+        with self._lock:
+            queued: Dict[str, int] = {name: 0 for name in self.priority_classes}
+            for ticket in self._heap:
+                if not ticket.cancelled:
+                    queued[ticket.priority_class] += 1
+            return {
+                name: metrics.to_dict(queued[name]) for name, metrics in self._metrics.items()
+            }
+
+    @property
+    def active(self) -> int:
+        """当前正在执行的请求数。"""
+        return self._active
+
+
+class ScheduledClient(LLMClient):
+    """
+    经过 `Scheduler` 调度的 `LLMClient` 包装器：每次调用先获取并发额度再转发。
+
+    - priority_class / job / weight: 见 `Scheduler.slot`。
+    - timeout: 每次调用的最长排队时间（秒），为 None 时不设截止时间。
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        scheduler: Scheduler,
+        priority_class: str = "default",
+        *,
+        job: str = "",
+        weight: float = 1.0,
+        timeout: Optional[float] = None,
+    ) -> None:
+        if priority_class not in scheduler.priority_classes:
+            raise ValueError(
+                f"未知的优先级类别: {priority_class!r}，可选值为 {sorted(scheduler.priority_classes)}"
+            )
+        self._client = client
+        self._model_name = client.model_name
+        self._scheduler = scheduler
+        self._priority_class = priority_class
+        self._job = job
+        self._weight = weight
+        self._timeout = timeout
+
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        return self._client.last_usage
+
+    @property
+    def last_retries(self) -> int:
+        return self._client.last_retries
+
+    def _slot(self) -> Any:
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        return self._scheduler.slot(
+            self._priority_class, job=self._job, weight=self._weight, deadline=deadline
+        )
+
+    def generate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        with self._slot():
+            return self._client.generate_structured_json(
+                system_prompt, user_content, json_schema=json_schema
+            )
+
+    def generate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        with self._slot():
+            return self._client.generate_text(system_prompt, user_content)
+
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._slot():
+            return self._client.generate_json_candidates(
+                system_prompt, user_content, n, json_schema=json_schema
+            )
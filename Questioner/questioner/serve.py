@@ -0,0 +1,651 @@
+"""
+异步 HTTP 服务：把 `QuestionerPipeline` 作为共享服务提供给各个调用方。
+
+各团队过去各自 import 库、各自建立连接与缓存、各自消耗配额。服务进程只持有一个客户端，
+所有调用方共享它的连接池与请求合并（`singleflight.CoalescingClient`）：
+
+- 模块 A 的微批：在 `batch_window` 秒内先后到达的评估请求攒成一批（最多 `max_batch` 个），
+  批内相同的片段只评估一次，其余同时发出；
+- 背压：未完成的片段数达到 `max_pending` 时新的提交返回 429 与 `Retry-After`，
+  而不是无限排队直到超时；
+- 每个结果附带各阶段耗时（毫秒）：排队、模块 A / B / C 与总耗时，以及模块 A 所在批的大小。
+
+接口（请求与响应均为 JSON）：
+
+    POST /v1/passages          {"raw_text": "...", "wait": false}
+                               -> 202 {"id": ...}；wait 为 true 时处理完成后返回 200 与结果
+    POST /v1/batches           {"raw_texts": ["...", ...]} -> 202 {"batch_id": ..., "ids": [...]}
+    GET  /v1/results/<id>      -> 结果；status 为 queued / running / done / error
+                                  可加 ?wait=<秒> 长轮询，直到完成或超时
+    GET  /v1/batches/<id>      -> {"batch_id": ..., "results": [...]}
+    GET  /v1/stats             -> 排队数、微批统计、请求合并统计与各阶段遥测
+
+启动：
+
+    python -m questioner.serve --config config.json --port 8000
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import parse_qs, urlsplit
+
+from .models import AssessmentResult, Question
+from .modules import QuestionerPipeline
+from .singleflight import CoalescingClient
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# 请求体的最大字节数
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+# ----------------------------------------------------------------------
+# 微批
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class BatchStats:
+    """`batches` 为发出的批数，`items` 为请求数，`unique` 为去重后实际处理的请求数。"""
+
+    batches: int = 0
+    items: int = 0
+    unique: int = 0
+
+    @property
+    def mean_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "unique": self.unique,
+            "mean_size": round(self.mean_size, 3),
+        }
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    把 `window` 秒内先后到达的请求攒成一批（最多 `max_batch` 个），交给 `handler` 一次处理。
+
+    `handler(items)` 返回与 `items` 等长的列表，元素为结果或异常实例（异常只抛给对应的请求）。
+    必须在事件循环中调用 `start()` 之后才能 `submit()`。
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], Awaitable[List[Union[R, BaseException]]]],
+        *,
+        window: float = 0.01,
+        max_batch: int = 32,
+    ) -> None:
+        if window < 0:
+            raise ValueError("window 不能为负数")
+        if max_batch < 1:
+            raise ValueError("max_batch 必须大于等于 1")
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = BatchStats()
+        self._handler = handler
+        self._queue: Optional[asyncio.Queue[Tuple[T, asyncio.Future[R]]]] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._inflight: set[asyncio.Task[None]] = set()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._inflight, return_exceptions=True)
+            self._task = None
+
+    async def submit(self, item: T) -> R:
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher 尚未 start()")
+        future: asyncio.Future[R] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            if self.window and queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.window)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[T, asyncio.Future[R]]]) -> None:
+        self.stats.batches += 1
+        self.stats.items += len(batch)
+        try:
+            results = await self._handler([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# ----------------------------------------------------------------------
+# 服务
+# ----------------------------------------------------------------------
+
+
+class Overloaded(Exception):
+    """未完成的片段数已达 `max_pending`。"""
+
+
+@dataclass
+class _Job:
+    id: str
+    raw_text: str
+    batch_id: Optional[str] = None
+    status: str = "queued"
+    assessment: Optional[AssessmentResult] = None
+    cleaned_context: Optional[str] = None
+    question: Optional[Question] = None
+    error: Optional[str] = None
+    timing: Dict[str, float] = field(default_factory=dict)
+    created: float = field(default_factory=time.perf_counter)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "assessment": self.assessment.model_dump() if self.assessment else None,
+            "cleaned_context": self.cleaned_context,
+            "question": self.question.model_dump() if self.question else None,
+            "error": self.error,
+            "timing": self.timing,
+        }
+
+
+class QuestionerService:
+    """
+    服务核心，与 HTTP 层无关；`HTTPServer` 把请求路由到这里。
+
+    参数：
+    - pipeline: 共享的 `QuestionerPipeline`。服务直接调用它的 `filter` / `rewriter` / `generator`，
+      因此替换为 `ClassifierFilter` 等同接口的模块 A 同样生效；推测执行不在服务中使用。
+    - max_pending: 未完成片段数的上限，超过后提交返回 429。
+    - max_concurrency: 执行阶段调用的线程数，即同时在途的 LLM 请求上限。
+    - batch_window / max_batch: 模块 A 的微批窗口（秒）与批大小上限。
+    - max_results: 保留的已完成结果数，超过后最早完成的结果被丢弃。
+    - retry_after: 429 响应中 `Retry-After` 的秒数。
+    - coalescing: 流水线底层的 `CoalescingClient`；提供时 `/v1/stats` 附带其请求合并统计。
+    """
+
+    def __init__(
+        self,
+        pipeline: QuestionerPipeline,
+        *,
+        max_pending: int = 1024,
+        max_concurrency: int = 32,
+        batch_window: float = 0.01,
+        max_batch: int = 32,
+        max_results: int = 100_000,
+        retry_after: int = 1,
+        coalescing: Optional[CoalescingClient] = None,
+    ) -> None:
+        if max_pending < 1:
+            raise ValueError("max_pending 必须大于等于 1")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency 必须大于等于 1")
+        self.pipeline = pipeline
+        self.max_pending = max_pending
+        self.max_results = max_results
+        self.retry_after = retry_after
+        self.coalescing = coalescing
+        self.pending = 0
+        self._jobs: OrderedDict[str, _Job] = OrderedDict()
+        self._batches: OrderedDict[str, List[str]] = OrderedDict()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="questioner-serve"
+        )
+        self._batcher: MicroBatcher[str, Tuple[AssessmentResult, float, int]] = MicroBatcher(
+            self._assess_batch, window=batch_window, max_batch=max_batch
+        )
+
+    async def start(self) -> None:
+        self._batcher.start()
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._batcher.stop()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # 阶段执行
+    # ------------------------------------------------------------------
+
+    async def _in_thread(self, fn: Callable[..., T], *args: Any) -> Tuple[T, float]:
+        def timed() -> Tuple[T, float]:
+            started = time.perf_counter()
+            return fn(*args), time.perf_counter() - started
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+
+    async def _assess_batch(
+        self, raw_texts: List[str]
+    ) -> List[Union[Tuple[AssessmentResult, float, int], BaseException]]:
+        unique = list(dict.fromkeys(raw_texts))
+        self._batcher.stats.unique += len(unique)
+        outcomes = await asyncio.gather(
+            *(self._in_thread(self.pipeline.filter.assess, text) for text in unique),
+            return_exceptions=True,
+        )
+        by_text = dict(zip(unique, outcomes))
+        results: List[Union[Tuple[AssessmentResult, float, int], BaseException]] = []
+        for text in raw_texts:
+            outcome = by_text[text]
+            if isinstance(outcome, BaseException):
+                results.append(outcome)
+            else:
+                assessment, seconds = outcome
+                results.append((assessment, seconds, len(raw_texts)))
+        return results
+
+    async def _process(self, job: _Job) -> None:
+        progress = self.pipeline.progress
+        timing = job.timing
+        accepted: Optional[bool] = None
+        try:
+            job.status = "running"
+            assessment, seconds, batch_size = await self._batcher.submit(job.raw_text)
+            job.assessment = assessment
+            timing["assess_ms"] = round(seconds * 1000, 3)
+            timing["assess_batch_size"] = batch_size
+            accepted = assessment.is_suitable
+            if accepted:
+                job.cleaned_context, seconds = await self._in_thread(
+                    self.pipeline.rewriter.rewrite, job.raw_text
+                )
+                timing["rewrite_ms"] = round(seconds * 1000, 3)
+                job.question, seconds = await self._in_thread(
+                    self.pipeline.generator.generate, job.cleaned_context
+                )
+                timing["generate_ms"] = round(seconds * 1000, 3)
+            job.status = "done"
+        except Exception as e:
+            accepted = None
+            job.status = "error"
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            total = time.perf_counter() - job.created
+            stages = sum(timing.get(f"{stage}_ms", 0.0) for stage in ("assess", "rewrite", "generate"))
+            timing["total_ms"] = round(total * 1000, 3)
+            timing["queue_ms"] = round(max(total * 1000 - stages, 0.0), 3)
+            self.pending -= 1
+            if progress is not None:
+                progress.record_passage(accepted)
+            job.done.set()
+
+    # ------------------------------------------------------------------
+    # 提交与查询
+    # ------------------------------------------------------------------
+
+    def submit(self, raw_texts: Sequence[str], batch: bool = False) -> Tuple[Optional[str], List[_Job]]:
+        """
+        提交片段，返回 (batch_id, jobs)；未完成片段数超过上限时抛出 `Overloaded`。
+        同一次提交的片段要么全部接受，要么全部拒绝。
+        """
+        if self.pending + len(raw_texts) > self.max_pending:
+            raise Overloaded(f"排队中的片段已达上限 {self.max_pending}")
+        batch_id = uuid.uuid4().hex if batch else None
+        jobs = [_Job(id=uuid.uuid4().hex, raw_text=text, batch_id=batch_id) for text in raw_texts]
+        loop = asyncio.get_running_loop()
+        for job in jobs:
+            self._jobs[job.id] = job
+            self.pending += 1
+            task = loop.create_task(self._process(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if batch_id is not None:
+            self._batches[batch_id] = [job.id for job in jobs]
+        if self.pipeline.progress is not None:
+            self.pipeline.progress.add("total", len(jobs))
+        self._evict()
+        return batch_id, jobs
+
+    def _evict(self) -> None:
+        while len(self._jobs) > self.max_results:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.done.is_set():
+                break
+            self._jobs.popitem(last=False)
+        while len(self._batches) > self.max_results:
+            self._batches.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[_Job]:
+        return self._jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Optional[List[Optional[_Job]]]:
+        ids = self._batches.get(batch_id)
+        if ids is None:
+            return None
+        return [self._jobs.get(job_id) for job_id in ids]
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "results": len(self._jobs),
+            "assess_batches": self._batcher.stats.to_dict(),
+        }
+        if self.coalescing is not None:
+            stats["coalescing"] = self.coalescing.stats.to_dict()
+        if self.pipeline.progress is not None:
+            stats["progress"] = self.pipeline.progress.snapshot(self.pipeline.budget)
+        return stats
+
+
+# ----------------------------------------------------------------------
+# HTTP 层
+# ----------------------------------------------------------------------
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class HTTPServer:
+    """
+    基于 `asyncio.start_server` 的最小 HTTP/1.1 服务器（支持 keep-alive），把请求路由到 `QuestionerService`。
+
+    示例：
+    ```python
+    server = HTTPServer(QuestionerService(pipeline))
+    await server.start("127.0.0.1", 8000)
+    await server.serve_forever()
+    ```
+    """
+
+    def __init__(self, service: QuestionerService) -> None:
+        self.service = service
+        self._server: Optional[Any] = None
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        await self.service.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.service.stop()
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                keep_alive = True
+                headers: Dict[str, str] = {}
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    keep_alive = (
+                        version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                    )
+                    length = int(headers.get("content-length", "0"))
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise _HTTPError(413, f"请求体超过 {MAX_BODY_BYTES} 字节")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload, extra = await self._route(method, target, body)
+                except _HTTPError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, {}
+                except ValueError:
+                    status, payload, extra = 400, {"error": "无法解析的 HTTP 请求"}, {}
+                    keep_alive = False
+                except Exception as e:
+                    status, payload, extra = 500, {"error": f"{type(e).__name__}: {e}"}, {}
+                self._write_response(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any,
+        extra_headers: Dict[str, str],
+        keep_alive: bool,
+    ) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in extra_headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    @staticmethod
+    def _json_body(body: bytes) -> Dict[str, Any]:
+        try:
+            data = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise _HTTPError(400, f"请求体不是合法的 JSON: {e}") from e
+        if not isinstance(data, dict):
+            raise _HTTPError(400, "请求体必须是 JSON 对象")
+        return data
+
+    @staticmethod
+    def _check_text(value: Any) -> str:
+        if not isinstance(value, str) or not value.strip():
+            raise _HTTPError(400, "raw_text 必须是非空字符串")
+        return value
+
+    async def _route(
+        self, method: str, target: str, body: bytes
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        service = self.service
+
+        if parts[:1] != ["v1"] or len(parts) < 2:
+            raise _HTTPError(404, f"未知的路径: {url.path}")
+        resource, rest = parts[1], parts[2:]
+        route = (resource, len(rest))
+        if route in (("passages", 0), ("batches", 0)):
+            expected = "POST"
+        elif route in (("results", 1), ("batches", 1), ("stats", 0)):
+            expected = "GET"
+        else:
+            raise _HTTPError(404, f"未知的路径: {url.path}")
+        if method != expected:
+            raise _HTTPError(405, f"{url.path} 只支持 {expected}")
+
+        if expected == "POST":
+            data = self._json_body(body)
+            if resource == "passages":
+                texts = [self._check_text(data.get("raw_text"))]
+            else:
+                texts = data.get("raw_texts")
+                if not isinstance(texts, list) or not texts:
+                    raise _HTTPError(400, "raw_texts 必须是非空列表")
+                if len(texts) > service.max_pending:
+                    raise _HTTPError(400, f"一批最多 {service.max_pending} 个片段")
+                texts = [self._check_text(text) for text in texts]
+            try:
+                batch_id, jobs = service.submit(texts, batch=resource == "batches")
+            except Overloaded as e:
+                return 429, {"error": str(e)}, {"Retry-After": str(service.retry_after)}
+            if resource == "batches":
+                return 202, {"batch_id": batch_id, "ids": [job.id for job in jobs]}, {}
+            job = jobs[0]
+            if data.get("wait"):
+                await job.done.wait()
+                return 200, job.to_dict(), {}
+            return 202, {"id": job.id}, {}
+
+        if resource == "results":
+            job = service.get(rest[0])
+            if job is None:
+                raise _HTTPError(404, f"结果不存在或已过期: {rest[0]}")
+            wait = query.get("wait")
+            if wait and not job.done.is_set():
+                try:
+                    await asyncio.wait_for(job.done.wait(), float(wait[0]))
+                except asyncio.TimeoutError:
+                    pass
+            return 200, job.to_dict(), {}
+
+        if resource == "batches":
+            batch = service.get_batch(rest[0])
+            if batch is None:
+                raise _HTTPError(404, f"批次不存在或已过期: {rest[0]}")
+            results = [job.to_dict() if job is not None else None for job in batch]
+            return 200, {"batch_id": rest[0], "results": results}, {}
+
+        return 200, service.stats(), {}
+
+
+# ----------------------------------------------------------------------
+# 命令行入口
+# ----------------------------------------------------------------------
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    from .config import get_default_config_from_json, load_configs_from_json
+    from .llm_client import create_client
+    from .pipeline import _load_default_config
+    from .progress import Progress
+
+    parser = argparse.ArgumentParser(description="以异步 HTTP 服务的形式提供出题流水线")
+    parser.add_argument("--config", help="JSON 配置文件；不提供时读取项目根目录的 config.py")
+    parser.add_argument("--model", help="使用配置文件中的哪个配置，默认使用其中的 default")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-pending", type=int, default=1024, help="未完成片段数上限，超过返回 429")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="同时在途的 LLM 请求上限")
+    parser.add_argument("--batch-window", type=float, default=0.01, help="模块 A 微批窗口（秒）")
+    parser.add_argument("--max-batch", type=int, default=32, help="模块 A 微批大小上限")
+    parser.add_argument("--n-candidates", type=int, default=1, help="模块 C 的候选数")
+    args = parser.parse_args(argv)
+
+    if args.config:
+        if args.model:
+            config = load_configs_from_json(args.config).get(args.model)
+            if config is None:
+                parser.error(f"配置文件中没有名为 {args.model!r} 的配置")
+        else:
+            config = get_default_config_from_json(args.config)
+            if config is None:
+                parser.error("配置文件中未指定 default，请使用 --model 选择配置")
+    else:
+        config = _load_default_config()
+        if config is None:
+            parser.error("未找到 config.py，请使用 --config 指定 JSON 配置文件")
+
+    client = CoalescingClient(create_client(config))
+    pipeline = QuestionerPipeline(
+        client, n_candidates=args.n_candidates, progress=Progress(), speculative="off"
+    )
+    service = QuestionerService(
+        pipeline,
+        max_pending=args.max_pending,
+        max_concurrency=args.max_concurrency,
+        batch_window=args.batch_window,
+        max_batch=args.max_batch,
+        coalescing=client,
+    )
+    server = HTTPServer(service)
+
+    async def run() -> None:
+        await server.start(args.host, args.port)
+        host, port = server.address or (args.host, args.port)
+        print(f"questioner 服务已启动: http://{host}:{port}/v1/  模型: {config.model_name}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+相同请求的合并（single-flight）。
+
+并发运行时，相同的片段（例如不同来源的同一篇摘要）常常在同一时刻被发送；
+此时结果缓存帮不上忙，因为两个调用都还没有完成。`CoalescingClient` 以完整请求
+（方法、模型、system prompt、user content、JSON Schema）为键：同一键上正在进行的
+调用只向上游发送一次，其余调用等待并共享它的结果或异常。
+
+线程与 asyncio 两种模式都支持：
+- 同步方法（`generate_*`）使用 `SingleFlight`，等待方阻塞在 `threading.Event` 上；
+- 异步方法（`agenerate_*`）使用 `AsyncSingleFlight`，上游调用在独立的 Task 中执行，
+  所有等待方 await 它；某个等待方被取消不影响其它等待方，最后一个等待方离开时才取消上游调用。
+
+两种模式各自维护正在进行的调用表：相同的同步调用与异步调用不会互相合并。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .llm_client import LLMClient
+
+T = TypeVar("T")
+
+# 上游调用的 (结果, token 用量, 重试次数)
+_Outcome = Tuple[Any, Optional[Dict[str, int]], int]
+
+
+@dataclass
+class CoalescingStats:
+    """合并统计：`calls` 为收到的调用数，`upstream` 为实际发往上游的调用数。"""
+
+    calls: int = 0
+    upstream: int = 0
+
+    @property
+    def coalesced(self) -> int:
+        return self.calls - self.upstream
+
+    @property
+    def coalesced_rate(self) -> float:
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "upstream": self.upstream,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced_rate, 4),
+        }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """线程版 single-flight：同一键上同时只执行一次 `fn`。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.stats = CoalescingStats()
+
+    def do(self, key: str, fn: Callable[[], T]) -> tuple[T, bool]:
+        """执行或等待 `fn`，返回 (结果, 是否为共享的结果)。`fn` 抛出的异常会传给所有等待方。"""
+        with self._lock:
+            self.stats.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.stats.upstream += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters", "claimed")
+
+    def __init__(self, task: asyncio.Future[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+        self.claimed = False
+
+
+class AsyncSingleFlight:
+    """
+    asyncio 版 single-flight。须在同一个事件循环中使用。
+
+    上游调用 `fn()` 在独立的 Task 中执行，发起它的调用方与其它等待方地位相同：
+    任何一个等待方被取消（例如 HTTP 客户端断开）都只影响它自己；
+    所有等待方都离开后才取消上游调用。
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, _AsyncCall] = {}
+        self.stats = CoalescingStats()
+
+    def _forget(self, key: str, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """
+        执行或等待 `fn()`，返回 (结果, 是否为共享的结果)。
+
+        每次上游调用的结果恰好有一个等待方得到 `False`（由它记录用量），其余为 `True`。
+        """
+        self.stats.calls += 1
+        call = self._calls.get(key)
+        if call is None:
+            self.stats.upstream += 1
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            # shield：本等待方被取消时不取消上游调用
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 没有等待方了：新的相同调用应重新发起，而不是等待一个正在取消的调用
+                self._forget(key, call)
+                call.task.cancel()
+        shared, call.claimed = call.claimed, True
+        return result, shared
+
+
+def request_key(
+    method: str,
+    model_name: Optional[str],
+    system_prompt: str,
+    user_content: str,
+    json_schema: Optional[Dict[str, Any]] = None,
+) -> str:
+    """完整请求的哈希键。"""
+    payload = json.dumps(
+        [method, model_name, system_prompt, user_content, json_schema],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CoalescingClient(LLMClient):
+    """
+    在任意 `LLMClient` 前合并相同的并发请求。
+
+    JSON 结果会深拷贝后再交给共享方，调用方修改返回的字典不会互相影响。
+    异步方法在被包装客户端没有 `agenerate_*` 时，改为在线程中执行同步方法。
+    同步与异步调用分别合并：同时发出的相同同步调用与异步调用各自发往上游一次。
+
+    示例：
+    ```python
+    client = CoalescingClient(HTTPClient(model_name="qwen-plus", base_url=...))
+    pipeline = QuestionerPipeline(client)
+    ...
+    print(client.stats.to_dict())   # {"calls": ..., "upstream": ..., "coalesced": ...}
+    ```
+    """
+
+    def __init__(self, client: LLMClient) -> None:
+        self._client = client
+        self._model_name = client.model_name
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+
+    @property
+    def stats(self) -> CoalescingStats:
+        """同步与异步两种模式的合并统计之和。"""
+        sync, async_ = self._flight.stats, self._async_flight.stats
+        return CoalescingStats(
+            calls=sync.calls + async_.calls,
+            upstream=sync.upstream + async_.upstream,
+        )
+
+    # 上游调用返回 (结果, 用量, 重试次数)：用量与重试次数是被包装客户端的线程局部状态，
+    # 必须在发起上游调用的线程中读取。`last_usage` / `last_retries` 只记在本客户端的线程局部状态中：
+    # 发起上游调用的一方记上游的用量，共享结果的一方没有发出请求，记为 0。
+
+    def _call_upstream(self, method: str, *args: Any, **kwargs: Any) -> _Outcome:
+        result = getattr(self._client, method)(*args, **kwargs)
+        return result, self._client.last_usage, self._client.last_retries
+
+    async def _acall_upstream(self, method: str, *args: Any, **kwargs: Any) -> _Outcome:
+        inner = getattr(self._client, f"a{method}", None)
+        if inner is None:
+            return await asyncio.to_thread(self._call_upstream, method, *args, **kwargs)
+        result = await inner(*args, **kwargs)
+        return result, self._client.last_usage, self._client.last_retries
+
+    def _finish(self, outcome: _Outcome, shared: bool) -> Any:
+        result, usage, retries = outcome
+        if shared:
+            self._record_usage({"prompt_tokens": 0, "completion_tokens": 0})
+            self._record_retries(0)
+            return copy.deepcopy(result)
+        self._record_usage(usage)
+        self._record_retries(retries)
+        return result
+
+    def generate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        key = request_key("json", self._model_name, system_prompt, user_content, json_schema)
+        outcome, shared = self._flight.do(
+            key,
+            partial(
+                self._call_upstream,
+                "generate_structured_json",
+                system_prompt,
+                user_content,
+                json_schema=json_schema,
+            ),
+        )
+        return self._finish(outcome, shared)
+
+    def generate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        key = request_key("text", self._model_name, system_prompt, user_content)
+        outcome, shared = self._flight.do(
+            key, partial(self._call_upstream, "generate_text", system_prompt, user_content)
+        )
+        return self._finish(outcome, shared)
+
+    def generate_json_candidates(
+        self,
+        system_prompt: str,
+        user_content: str,
+        n: int,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        key = request_key(
+            f"json_candidates:{n}", self._model_name, system_prompt, user_content, json_schema
+        )
+        outcome, shared = self._flight.do(
+            key,
+            partial(
+                self._call_upstream,
+                "generate_json_candidates",
+                system_prompt,
+                user_content,
+                n,
+                json_schema=json_schema,
+            ),
+        )
+        return self._finish(outcome, shared)
+
+    async def agenerate_structured_json(
+        self,
+        system_prompt: str,
+        user_content: str,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """`generate_structured_json` 的异步版本。"""
+        key = request_key("json", self._model_name, system_prompt, user_content, json_schema)
+        outcome, shared = await self._async_flight.do(
+            key,
+            partial(
+                self._acall_upstream,
+                "generate_structured_json",
+                system_prompt,
+                user_content,
+                json_schema=json_schema,
+            ),
+        )
+        return self._finish(outcome, shared)
+
+    async def agenerate_text(
+        self,
+        system_prompt: str,
+        user_content: str,
+    ) -> str:
+        """`generate_text` 的异步版本。"""
+        key = request_key("text", self._model_name, system_prompt, user_content)
+        outcome, shared = await self._async_flight.do(
+            key, partial(self._acall_upstream, "generate_text", system_prompt, user_content)
+        )
+        return self._finish(outcome, shared)
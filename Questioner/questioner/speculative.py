@@ -0,0 +1,175 @@
+"""
+模块 A 与模块 B 的推测执行。
+
+`QuestionerPipeline.run` 原本要等 `DataQualityFilter.assess` 返回后才开始 `ScenarioRewriter.rewrite`，
+而两者的输入都是同一段 `raw_text`；交互式使用时，模块 A 的往返时间直接叠加在用户等待时间上。
+推测执行同时发出 assess 与 rewrite：评估通过时节省一次往返，评估拒绝时 rewrite 若尚未开始则取消，
+否则结果被丢弃，其花费计为浪费。
+
+是否推测由一个廉价的先验决定：`AcceptancePrior` 按片段的统计信息密度（`preprocess.stat_density`）
+分桶，每个桶维护一个 Beta 分布，估计该片段通过模块 A 的概率，并用每次的实际评估结果在线更新。
+估计值不低于阈值时才推测执行。`SpeculationStats` 报告推测次数、浪费的调用、token 与费用。
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from .preprocess import stat_density
+
+SPECULATION_MODES = ("off", "auto", "always")
+
+# 统计信息密度的分桶边界，以及各桶的初始通过率猜测
+DEFAULT_DENSITY_EDGES = (0.5, 1.5, 3.0, 6.0)
+DEFAULT_INITIAL_RATES = (0.1, 0.35, 0.6, 0.75, 0.85)
+
+
+class AcceptancePrior:
+    """
+    按统计信息密度分桶的在线通过率估计，线程安全。
+
+    - edges: 分桶边界（升序），共 `len(edges) + 1` 个桶。
+    - initial_rates: 每个桶的初始通过率猜测。
+    - strength: 初始猜测相当于多少个已观测样本；越小则越快被实际结果覆盖。
+    """
+
+    def __init__(
+        self,
+        edges: Sequence[float] = DEFAULT_DENSITY_EDGES,
+        initial_rates: Sequence[float] = DEFAULT_INITIAL_RATES,
+        strength: float = 4.0,
+    ) -> None:
+        if len(initial_rates) != len(edges) + 1:
+            raise ValueError("initial_rates 的长度必须等于 len(edges) + 1")
+        self._edges = list(edges)
+        self._accepted = [rate * strength for rate in initial_rates]
+        self._total = [strength] * len(initial_rates)
+        self._lock = threading.Lock()
+
+    def _bucket(self, raw_text: str) -> int:
+        return bisect.bisect_right(self._edges, stat_density(raw_text))
+
+    def estimate(self, raw_text: str) -> float:
+        """估计 `raw_text` 通过模块 A 的概率。"""
+        bucket = self._bucket(raw_text)
+        with self._lock:
+            return self._accepted[bucket] / self._total[bucket]
+
+    def update(self, raw_text: str, accepted: bool) -> None:
+        """用一次实际的评估结果更新对应桶。"""
+        bucket = self._bucket(raw_text)
+        with self._lock:
+            self._accepted[bucket] += float(accepted)
+            self._total[bucket] += 1.0
+
+    def rates(self) -> List[float]:
+        """各桶当前的通过率估计。"""
+        with self._lock:
+            return [accepted / total for accepted, total in zip(self._accepted, self._total)]
+
+
+@dataclass
+class SpeculationStats:
+    """
+    推测执行统计。
+
+    - runs: `run()` 调用数。
+    - speculated: 推测执行的次数。
+    - wasted: 推测执行但评估拒绝（或评估失败）、rewrite 结果被丢弃的次数。
+    - cancelled: 其中 rewrite 尚未开始、被直接取消的次数（不产生花费）。
+    - wasted_prompt_tokens / wasted_completion_tokens / wasted_cost: 被丢弃的 rewrite 的用量；
+      费用只在流水线配置了 `BudgetManager` 且给出单价时计算。
+    - saved_seconds: 推测成功时节省的等待时间之和（两者中较短的那次调用的耗时）。
+    """
+
+    runs: int = 0
+    speculated: int = 0
+    wasted: int = 0
+    cancelled: int = 0
+    wasted_prompt_tokens: int = 0
+    wasted_completion_tokens: int = 0
+    wasted_cost: float = 0.0
+    saved_seconds: float = 0.0
+
+    @property
+    def waste_rate(self) -> float:
+        return self.wasted / self.speculated if self.speculated else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "runs": self.runs,
+            "speculated": self.speculated,
+            "wasted": self.wasted,
+            "cancelled": self.cancelled,
+            "waste_rate": round(self.waste_rate, 4),
+            "wasted_prompt_tokens": self.wasted_prompt_tokens,
+            "wasted_completion_tokens": self.wasted_completion_tokens,
+            "wasted_cost": round(self.wasted_cost, 6),
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+class SpeculationController:
+    """
+    流水线内部使用：决定是否推测执行，并汇总统计。
+
+    - mode: "off" 从不推测；"auto" 先验估计不低于 `threshold` 时推测；"always" 总是推测。
+    - prior: 通过率先验，默认 `AcceptancePrior()`。
+    """
+
+    def __init__(
+        self,
+        mode: str = "auto",
+        threshold: float = 0.6,
+        prior: Optional[AcceptancePrior] = None,
+    ) -> None:
+        if mode not in SPECULATION_MODES:
+            raise ValueError(f"未知的 speculative: {mode!r}，可选值为 {SPECULATION_MODES}")
+        self.mode = mode
+        self.threshold = threshold
+        self.prior = prior if prior is not None else AcceptancePrior()
+        self.stats = SpeculationStats()
+        self._lock = threading.Lock()
+
+    def should_speculate(self, raw_text: str) -> bool:
+        with self._lock:
+            self.stats.runs += 1
+        if self.mode == "off":
+            return False
+        if self.mode == "always":
+            return True
+        return self.prior.estimate(raw_text) >= self.threshold
+
+    def record(
+        self,
+        raw_text: str,
+        accepted: Optional[bool],
+        speculated: bool,
+        *,
+        cancelled: bool = False,
+        usage: Optional[Dict[str, int]] = None,
+        cost: float = 0.0,
+        saved_seconds: float = 0.0,
+    ) -> None:
+        """记录一次运行的结果；`accepted` 为 None 表示评估失败。"""
+        if accepted is not None:
+            self.prior.update(raw_text, accepted)
+        if not speculated:
+            return
+        with self._lock:
+            stats = self.stats
+            stats.speculated += 1
+            if accepted:
+                stats.saved_seconds += saved_seconds
+                return
+            stats.wasted += 1
+            if cancelled:
+                stats.cancelled += 1
+                return
+            if usage is not None:
+                stats.wasted_prompt_tokens += usage["prompt_tokens"]
+                stats.wasted_completion_tokens += usage["completion_tokens"]
+            stats.wasted_cost += cost
@@ -0,0 +1,62 @@
+"""
+本地 token 计数。
+
+安装了 `tiktoken` 时使用与模型对应的编码（未知模型回退到 `cl100k_base`）；
+否则使用启发式估计：每个 CJK 字符约 1 个 token，其余文本约每 4 个字符 1 个 token。
+启发式结果只用于切分窗口和预算预估，不要求精确。
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+# 每条 chat 消息的固定开销（角色、分隔符等），与 OpenAI 的计数方式一致
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=None)
+def _encoding(model_name: Optional[str]) -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    if model_name:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _heuristic_count(text: str) -> int:
+    cjk = len(_CJK.findall(text))
+    rest = len(text) - cjk
+    return cjk + (rest + 3) // 4
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    """估计 `text` 的 token 数。"""
+    if not text:
+        return 0
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return _heuristic_count(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_chat_tokens(
+    system_prompt: str,
+    user_content: str,
+    model_name: Optional[str] = None,
+) -> int:
+    """估计一次 system + user 两条消息的 chat 请求的 prompt token 数。"""
+    return (
+        count_tokens(system_prompt, model_name)
+        + count_tokens(user_content, model_name)
+        + 2 * MESSAGE_OVERHEAD_TOKENS
+        + 3
+    )
@@ -0,0 +1,698 @@
+"""
+基于租约的持久化工作队列：任意数量的 worker 进程动态领取片段。
+
+按片段静态切分语料时，含较多可出题片段的分片要走三次调用而不是一次，处理得慢，
+其余 worker 早早空闲。改为所有 worker 从同一个队列领取：
+
+- 领取（lease）时每个片段获得一个租约令牌与可见性超时：超时前其他 worker 看不到它；
+- 处理期间 worker 在后台定期续租（heartbeat）；worker 崩溃后租约过期，片段自动重新投递；
+- 每个阶段（assess / rewrite / generate）的结果在完成时立即写入队列，重新投递的片段跳过已完成的阶段；
+- 片段经由 `QuestionerPipeline.run` 处理（以 `StageCheckpoint` 接入队列），本地分类器、预算准入、
+  推测执行与题型设置都与直接调用 `run()` 一致；
+- 写入结果时校验租约令牌，租约已被别人取走的旧 worker 无法覆盖结果；续租失败的片段立即停止处理；
+- 失败的片段延迟 `retry_delay` 秒后重试，尝试次数达到 `max_attempts` 后标记为 "failed"。
+
+`WorkQueue` 是存储接口，`SQLiteWorkQueue` 是本地 SQLite 实现（WAL 模式，多进程共享同一个文件）；
+其他存储（Postgres、Redis 等）实现同一接口即可接入 `Worker`。
+
+示例：
+```python
+queue = SQLiteWorkQueue("queue.db")
+queue.enqueue(raw_texts)
+
+# 每个 worker 进程
+Worker(queue, QuestionerPipeline(client), concurrency=8).run()
+
+for record in queue.results():
+    ...
+```
+
+命令行：
+
+    python -m questioner.workqueue enqueue --db queue.db passages.jsonl
+    python -m questioner.workqueue work --db queue.db --config config.json --concurrency 8
+    python -m questioner.workqueue status --db queue.db
+    python -m questioner.workqueue export --db queue.db --out results.jsonl
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from .models import AssessmentResult, Question
+from .modules import QuestionerPipeline, StageCheckpoint
+
+ITEM_STATUSES = ("pending", "leased", "done", "failed")
+
+
+class LeaseLost(RuntimeError):
+    """租约已过期并被其他 worker 取走，当前 worker 的结果不再被接受。"""
+
+
+@dataclass
+class WorkItem:
+    """一次租约领取到的片段；`attempts` 含本次在内。"""
+
+    id: int
+    raw_text: str
+    attempts: int
+    lease_token: str
+    lease_expires: float
+
+
+class WorkQueue(ABC):
+    """
+    工作队列存储接口。
+
+    片段的生命周期：`enqueue()` -> `lease()` -> [`heartbeat()` / `record_stage()` ...]
+    -> `complete()`、`fail()` 或 `release()`。租约过期未续的片段由下一次 `lease()` 重新投递。
+    带租约的写操作在令牌不匹配时抛出 `LeaseLost`。
+    """
+
+    @abstractmethod
+    def enqueue(self, raw_texts: Sequence[str]) -> List[int]:
+        """加入片段，返回片段 ID。"""
+
+    @abstractmethod
+    def lease(self, worker_id: str, limit: int = 1, visibility_timeout: float = 300.0) -> List[WorkItem]:
+        """领取至多 `limit` 个可见的片段，租约 `visibility_timeout` 秒后过期。"""
+
+    @abstractmethod
+    def heartbeat(self, item: WorkItem, visibility_timeout: float = 300.0) -> bool:
+        """把租约延长到 `visibility_timeout` 秒后；租约已丢失时返回 False。"""
+
+    @abstractmethod
+    def record_stage(self, item: WorkItem, stage: str, result: Any, seconds: float) -> None:
+        """记录一个阶段的结果（JSON 可序列化）与耗时。"""
+
+    @abstractmethod
+    def stage_results(self, item_id: int) -> Dict[str, Any]:
+        """片段已记录的阶段结果：阶段名 -> 结果。"""
+
+    @abstractmethod
+    def complete(self, item: WorkItem) -> None:
+        """标记片段处理完成。"""
+
+    @abstractmethod
+    def fail(self, item: WorkItem, error: str, retry_delay: float = 0.0) -> bool:
+        """
+        记录失败：尝试次数未达上限时 `retry_delay` 秒后重新投递，否则标记为 "failed"。
+        返回片段是否已最终失败（不会再被投递）。
+        """
+
+    @abstractmethod
+    def release(self, item: WorkItem) -> None:
+        """归还租约且不计入尝试次数（例如 worker 主动退出）。"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """各状态的片段数；租约已过期的片段计入 "pending"。"""
+
+    @abstractmethod
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """已结束（"done" / "failed"）的片段及其各阶段结果与耗时（秒）。"""
+
+
+# ----------------------------------------------------------------------
+# SQLite 实现
+# ----------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    raw_text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    available_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_token TEXT,
+    worker TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_ready ON items (status, available_at);
+CREATE TABLE IF NOT EXISTS stages (
+    item_id INTEGER NOT NULL REFERENCES items (id),
+    stage TEXT NOT NULL,
+    result TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    worker TEXT,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (item_id, stage)
+);
+"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """
+    本地 SQLite 工作队列。同一文件可被多个进程同时打开；领取在 `BEGIN IMMEDIATE` 事务中完成，
+    同一片段不会同时租给两个 worker。实例可在线程间共享。
+
+    - path: 数据库文件路径。
+    - max_attempts: 最大尝试次数（包括租约过期导致的重新投递）。
+    - busy_timeout: 等待其他进程释放写锁的秒数。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        *,
+        max_attempts: int = 3,
+        busy_timeout: float = 30.0,
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts 必须大于等于 1")
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> SQLiteWorkQueue:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _check_lease(conn: sqlite3.Connection, item: WorkItem) -> None:
+        row = conn.execute(
+            "SELECT 1 FROM items WHERE id = ? AND status = 'leased' AND lease_token = ?",
+            (item.id, item.lease_token),
+        ).fetchone()
+        if row is None:
+            raise LeaseLost(f"片段 {item.id} 的租约已丢失")
+
+    def enqueue(self, raw_texts: Sequence[str]) -> List[int]:
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> List[int]:
+            ids = []
+            for text in raw_texts:
+                cursor = conn.execute(
+                    "INSERT INTO items (raw_text, available_at, updated_at) VALUES (?, ?, ?)",
+                    (text, now, now),
+                )
+                ids.append(cursor.lastrowid)
+            return ids
+
+        return self._transaction(insert)
+
+    def lease(self, worker_id: str, limit: int = 1, visibility_timeout: float = 300.0) -> List[WorkItem]:
+        def take(conn: sqlite3.Connection) -> List[WorkItem]:
+            now = time.time()
+            items: List[WorkItem] = []
+            while len(items) < limit:
+                rows = conn.execute(
+                    "SELECT id, raw_text, status, attempts FROM items"
+                    " WHERE status IN ('pending', 'leased') AND available_at <= ?"
+                    " ORDER BY available_at, id LIMIT ?",
+                    (now, limit - len(items)),
+                ).fetchall()
+                if not rows:
+                    break
+                for item_id, raw_text, status, attempts in rows:
+                    if attempts >= self.max_attempts:
+                        # 租约多次过期（worker 反复崩溃）的片段不再投递
+                        conn.execute(
+                            "UPDATE items SET status = 'failed', lease_token = NULL, error = ?,"
+                            " updated_at = ? WHERE id = ?",
+                            (f"超过最大尝试次数 {self.max_attempts}（最后状态 {status}）", now, item_id),
+                        )
+                        continue
+                    token = uuid.uuid4().hex
+                    expires = now + visibility_timeout
+                    conn.execute(
+                        "UPDATE items SET status = 'leased', lease_token = ?, worker = ?,"
+                        " attempts = attempts + 1, available_at = ?, updated_at = ? WHERE id = ?",
+                        (token, worker_id, expires, now, item_id),
+                    )
+                    items.append(WorkItem(item_id, raw_text, attempts + 1, token, expires))
+            return items
+
+        return self._transaction(take)
+
+    def heartbeat(self, item: WorkItem, visibility_timeout: float = 300.0) -> bool:
+        now = time.time()
+        expires = now + visibility_timeout
+
+        def extend(conn: sqlite3.Connection) -> bool:
+            cursor = conn.execute(
+                "UPDATE items SET available_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (expires, now, item.id, item.lease_token),
+            )
+            return cursor.rowcount == 1
+
+        extended = self._transaction(extend)
+        if extended:
+            item.lease_expires = expires
+        return extended
+
+    def record_stage(self, item: WorkItem, stage: str, result: Any, seconds: float) -> None:
+        payload = json.dumps(result, ensure_ascii=False)
+
+        def write(conn: sqlite3.Connection) -> None:
+            self._check_lease(conn, item)
+            conn.execute(
+                "INSERT OR REPLACE INTO stages (item_id, stage, result, seconds, worker, recorded_at)"
+                " SELECT ?, ?, ?, ?, worker, ? FROM items WHERE id = ?",
+                (item.id, stage, payload, seconds, time.time(), item.id),
+            )
+
+        self._transaction(write)
+
+    def stage_results(self, item_id: int) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, result FROM stages WHERE item_id = ?", (item_id,)
+            ).fetchall()
+        return {stage: json.loads(result) for stage, result in rows}
+
+    def complete(self, item: WorkItem) -> None:
+        def finish(conn: sqlite3.Connection) -> None:
+            self._check_lease(conn, item)
+            conn.execute(
+                "UPDATE items SET status = 'done', lease_token = NULL, error = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (time.time(), item.id),
+            )
+
+        self._transaction(finish)
+
+    def fail(self, item: WorkItem, error: str, retry_delay: float = 0.0) -> bool:
+        terminal = item.attempts >= self.max_attempts
+
+        def mark(conn: sqlite3.Connection) -> None:
+            self._check_lease(conn, item)
+            now = time.time()
+            conn.execute(
+                "UPDATE items SET status = ?, lease_token = NULL, error = ?, available_at = ?,"
+                " updated_at = ? WHERE id = ?",
+                ("failed" if terminal else "pending", error, now + retry_delay, now, item.id),
+            )
+
+        self._transaction(mark)
+        return terminal
+
+    def release(self, item: WorkItem) -> None:
+        def give_back(conn: sqlite3.Connection) -> None:
+            self._check_lease(conn, item)
+            now = time.time()
+            conn.execute(
+                "UPDATE items SET status = 'pending', lease_token = NULL, attempts = attempts - 1,"
+                " available_at = ?, updated_at = ? WHERE id = ?",
+                (now, now, item.id),
+            )
+
+        self._transaction(give_back)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT CASE WHEN status = 'leased' AND available_at <= ? THEN 'pending'"
+                " ELSE status END, COUNT(*) FROM items GROUP BY 1",
+                (time.time(),),
+            ).fetchall()
+        counts = {status: 0 for status in ITEM_STATUSES}
+        for status, count in rows:
+            counts[status] += count
+        return counts
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, raw_text, status, attempts, error FROM items"
+                " WHERE status IN ('done', 'failed') ORDER BY id"
+            ).fetchall()
+        for item_id, raw_text, status, attempts, error in rows:
+            record = {
+                "id": item_id,
+                "raw_text": raw_text,
+                "status": status,
+                "attempts": attempts,
+                "error": error,
+            }
+            with self._lock:
+                stages = self._conn.execute(
+                    "SELECT stage, result, seconds FROM stages WHERE item_id = ?", (item_id,)
+                ).fetchall()
+            for stage, result, _ in stages:
+                record[stage] = json.loads(result)
+            record["timing"] = {stage: round(seconds, 3) for stage, _, seconds in stages}
+            yield record
+
+
+# ----------------------------------------------------------------------
+# Worker
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class WorkerStats:
+    """
+    worker 统计。
+
+    - processed: 完成的片段数（accepted + rejected）。
+    - failed: 处理出错且达到最大尝试次数、被标记为失败的片段数。
+    - retried: 处理出错、交还队列稍后重试的次数（不计入 processed / failed）。
+    - lost: 租约丢失、结果被放弃的次数。
+    - reused_stages: 重新投递的片段中直接复用的阶段结果数。
+    """
+
+    processed: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    failed: int = 0
+    retried: int = 0
+    lost: int = 0
+    reused_stages: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "processed": self.processed,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "retried": self.retried,
+            "lost": self.lost,
+            "reused_stages": self.reused_stages,
+        }
+
+
+class _QueueCheckpoint(StageCheckpoint):
+    """把片段的阶段结果读写到队列；租约丢失后任何读写都抛出 `LeaseLost`，中止片段的处理。"""
+
+    _LOADERS: Dict[str, Callable[[Any], Any]] = {
+        "assess": AssessmentResult.model_validate,
+        "rewrite": str,
+        "generate": Question.model_validate,
+    }
+
+    def __init__(self, worker: Worker, item: WorkItem, lost: threading.Event) -> None:
+        self._worker = worker
+        self._item = item
+        self._lost = lost
+        self._recorded = worker.queue.stage_results(item.id)
+
+    def check(self) -> None:
+        if self._lost.is_set():
+            raise LeaseLost(f"片段 {self._item.id} 的租约已丢失")
+
+    def load(self, stage: str) -> Any:
+        self.check()
+        if stage not in self._recorded:
+            return None
+        with self._worker._lock:
+            self._worker.stats.reused_stages += 1
+        return self._LOADERS[stage](self._recorded[stage])
+
+    def save(self, stage: str, result: Any, seconds: float) -> None:
+        self.check()
+        payload = result if isinstance(result, str) else result.model_dump()
+        self._worker.queue.record_stage(self._item, stage, payload, seconds)
+
+
+class Worker:
+    """
+    从 `WorkQueue` 领取片段并用 `QuestionerPipeline` 处理。
+
+    参数：
+    - queue: 工作队列。
+    - pipeline: 流水线；每个片段调用一次 `pipeline.run()`，各阶段结果经 `StageCheckpoint` 写入队列。
+    - worker_id: 写入队列的 worker 标识，默认 "<主机名>:<进程号>:<随机后缀>"。
+    - concurrency: 同时处理的片段数（线程数）。
+    - visibility_timeout: 租约时长（秒）；worker 崩溃后片段在这么久之后重新投递。
+    - heartbeat_interval: 续租间隔，默认为 `visibility_timeout / 3`。
+    - poll_interval: 队列暂时没有可领取的片段时的等待间隔。
+    - retry_delay: 处理出错的片段在这么久之后重新投递。
+    - question_type: 出题题型名称（见 `questioner.question_types`），None 为默认单选题。
+
+    预算耗尽（`BudgetExceeded`）时归还当前片段并停止领取新的片段。
+    续租返回 False（租约已被取走）时，该片段在下一个阶段开始前停止处理，结果不再写入；
+    续租出错且租约在下一次续租前就会过期时同样处理。
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        pipeline: QuestionerPipeline,
+        *,
+        worker_id: Optional[str] = None,
+        concurrency: int = 1,
+        visibility_timeout: float = 300.0,
+        heartbeat_interval: Optional[float] = None,
+        poll_interval: float = 1.0,
+        retry_delay: float = 30.0,
+        question_type: Optional[str] = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于等于 1")
+        if visibility_timeout <= 0:
+            raise ValueError("visibility_timeout 必须大于 0")
+        self.queue = queue
+        self.pipeline = pipeline
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval or visibility_timeout / 3
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.question_type = question_type
+        self.stats = WorkerStats()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # 片段 ID -> (租约, 租约丢失事件)
+        self._held: Dict[int, tuple[WorkItem, threading.Event]] = {}
+
+    def stop(self) -> None:
+        """处理完手上的片段后退出。"""
+        self._stop.set()
+
+    def run(self, *, stop_when_empty: bool = True) -> WorkerStats:
+        """
+        处理片段直到调用 `stop()`；`stop_when_empty` 为 True 时，
+        队列中没有待处理或租约中的片段后退出（其他 worker 的租约过期后仍会接手）。
+        """
+        self._stop.clear()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat.start()
+        threads = [
+            threading.Thread(target=self._loop, args=(stop_when_empty,), daemon=True)
+            for _ in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self._stop.set()
+            heartbeat.join()
+        return self.stats
+
+    def _loop(self, stop_when_empty: bool) -> None:
+        while not self._stop.is_set():
+            items = self.queue.lease(self.worker_id, 1, self.visibility_timeout)
+            if not items:
+                if stop_when_empty:
+                    counts = self.queue.counts()
+                    if counts["pending"] + counts["leased"] == 0:
+                        return
+                self._stop.wait(self.poll_interval)
+                continue
+            self.process(items[0])
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                held = list(self._held.values())
+            for item, lost in held:
+                try:
+                    alive = self.queue.heartbeat(item, self.visibility_timeout)
+                except LeaseLost:
+                    alive = False
+                except Exception:
+                    # 存储暂时不可用：租约还能撑到下一次续租时稍后重试，否则视为丢失
+                    alive = time.time() + self.heartbeat_interval < item.lease_expires
+                if not alive:
+                    lost.set()
+
+    def process(self, item: WorkItem) -> None:
+        """处理一个已领取的片段，各阶段结果写入队列。"""
+        from .budget import BudgetExceeded
+
+        pipeline = self.pipeline
+        progress = pipeline.progress
+        lost = threading.Event()
+        with self._lock:
+            self._held[item.id] = (item, lost)
+        try:
+            checkpoint = _QueueCheckpoint(self, item, lost)
+            assessment, _, _ = pipeline.run(
+                item.raw_text, question_type=self.question_type, checkpoint=checkpoint
+            )
+            checkpoint.check()
+            self.queue.complete(item)
+        except LeaseLost:
+            with self._lock:
+                self.stats.lost += 1
+            return
+        except BudgetExceeded:
+            self.stop()
+            try:
+                self.queue.release(item)
+            except LeaseLost:
+                pass
+            return
+        except Exception as e:
+            try:
+                terminal = self.queue.fail(item, f"{type(e).__name__}: {e}", self.retry_delay)
+            except LeaseLost:
+                with self._lock:
+                    self.stats.lost += 1
+                return
+            # 重新投递的片段稍后还会被处理，只在最终失败时记录结果，避免重复计数
+            with self._lock:
+                if terminal:
+                    self.stats.failed += 1
+                else:
+                    self.stats.retried += 1
+            if terminal and progress is not None:
+                progress.record_passage(None)
+            return
+        finally:
+            with self._lock:
+                self._held.pop(item.id, None)
+
+        with self._lock:
+            self.stats.processed += 1
+            if assessment.is_suitable:
+                self.stats.accepted += 1
+            else:
+                self.stats.rejected += 1
+        if progress is not None:
+            progress.record_passage(assessment.is_suitable)
+
+
+# ----------------------------------------------------------------------
+# 命令行入口
+# ----------------------------------------------------------------------
+
+
+def _read_passages(path: str) -> List[str]:
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                texts.append(json.loads(line)["raw_text"])
+    return texts
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="基于租约的出题工作队列")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="把 JSONL 文件中的片段（raw_text 字段）加入队列")
+    enqueue.add_argument("passages")
+
+    work = subparsers.add_parser("work", help="作为 worker 处理队列中的片段")
+    work.add_argument("--config", help="JSON 配置文件；不提供时读取项目根目录的 config.py")
+    work.add_argument("--model", help="使用配置文件中的哪个配置，默认使用其中的 default")
+    work.add_argument("--concurrency", type=int, default=8)
+    work.add_argument("--visibility-timeout", type=float, default=300.0)
+    work.add_argument("--retry-delay", type=float, default=30.0)
+    work.add_argument("--question-type", help="出题题型名称，默认为单选题")
+    work.add_argument("--keep-running", action="store_true", help="队列清空后继续等待新的片段")
+
+    subparsers.add_parser("status", help="各状态的片段数")
+
+    export = subparsers.add_parser("export", help="把已结束片段的结果导出为 JSONL")
+    export.add_argument("--out", required=True)
+
+    for subparser in subparsers.choices.values():
+        subparser.add_argument("--db", required=True, help="SQLite 队列文件")
+        subparser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with SQLiteWorkQueue(args.db, max_attempts=args.max_attempts) as queue:
+        if args.command == "enqueue":
+            ids = queue.enqueue(_read_passages(args.passages))
+            print(f"已加入 {len(ids)} 个片段")
+        elif args.command == "status":
+            print(json.dumps(queue.counts(), ensure_ascii=False))
+        elif args.command == "export":
+            count = 0
+            with open(args.out, "w", encoding="utf-8") as f:
+                for record in queue.results():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    count += 1
+            print(f"已导出 {count} 条结果到 {args.out}")
+        else:
+            from .config import get_default_config_from_json, load_configs_from_json
+            from .llm_client import create_client
+            from .pipeline import _load_default_config
+
+            if args.config:
+                if args.model:
+                    config = load_configs_from_json(args.config).get(args.model)
+                    if config is None:
+                        parser.error(f"配置文件中没有名为 {args.model!r} 的配置")
+                else:
+                    config = get_default_config_from_json(args.config)
+                    if config is None:
+                        parser.error("配置文件中未指定 default，请使用 --model 选择配置")
+            else:
+                config = _load_default_config()
+                if config is None:
+                    parser.error("未找到 config.py，请使用 --config 指定 JSON 配置文件")
+
+            worker = Worker(
+                queue,
+                QuestionerPipeline(create_client(config), speculative="off"),
+                concurrency=args.concurrency,
+                visibility_timeout=args.visibility_timeout,
+                retry_delay=args.retry_delay,
+                question_type=args.question_type,
+            )
+            try:
+                stats = worker.run(stop_when_empty=not args.keep_running)
+            except KeyboardInterrupt:
+                worker.stop()
+                stats = worker.stats
+            print(f"{worker.worker_id}: {json.dumps(stats.to_dict(), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    main()
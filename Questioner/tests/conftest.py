@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 直接在仓库中运行 pytest 时无需安装即可导入 questioner
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,149 @@
+import json
+
+from questioner.batch import BatchRunner, LocalBatchBackend, build_batch_request, parse_batch_output
+from questioner.budget import BudgetExceeded, BudgetLimit, BudgetManager
+from questioner.llm_client import LLMClient
+from questioner.models import AssessmentResult
+from questioner.progress import Progress
+from questioner.prompts import SYSTEM_PROMPT_ASSESS, SYSTEM_PROMPT_GENERATE
+
+
+def _question(stem):
+    return {
+        "stem": stem,
+        "options": {"A": "t 检验", "B": "卡方检验", "C": "秩和检验", "D": "方差分析"},
+        "answer": "B",
+        "analysis": "分类变量比较用卡方检验。",
+    }
+
+
+class FakeClient(LLMClient):
+    model_name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_structured_json(self, system_prompt, user_content, json_schema=None):
+        self.calls.append(("json", system_prompt, user_content))
+        if system_prompt == SYSTEM_PROMPT_ASSESS:
+            return {"is_suitable": "accept" in user_content}
+        return _question(user_content)
+
+    def generate_text(self, system_prompt, user_content):
+        self.calls.append(("text", system_prompt, user_content))
+        return f"ctx:{user_content}"
+
+    def generate_json_candidates(self, system_prompt, user_content, n, json_schema=None):
+        self.calls.append(("candidates", system_prompt, user_content, n))
+        duplicate = dict(_question(user_content), options={"A": "x", "B": "x", "C": "y", "D": "z"})
+        return [duplicate] + [_question(f"{user_content}#{i}") for i in range(1, n)]
+
+
+class ExpiringBackend(LocalBatchBackend):
+    """第 i 次提交只完成前 `completes[i]` 条请求，然后过期；之后的提交正常完成。"""
+
+    def __init__(self, work_dir, client, completes):
+        super().__init__("fake", work_dir, client=client)
+        self.completes = completes
+        self.submitted = []
+        self._expired = set()
+
+    def submit(self, requests_path):
+        rows = [json.loads(line) for line in requests_path.read_text().splitlines()]
+        attempt = len(self.submitted)
+        self.submitted.append([row["custom_id"] for row in rows])
+        if attempt >= len(self.completes):
+            return super().submit(requests_path)
+        requests_path.write_text(
+            "".join(json.dumps(row) + "\n" for row in rows[: self.completes[attempt]])
+        )
+        batch_id = super().submit(requests_path)
+        self._expired.add(batch_id)
+        return batch_id
+
+    def poll(self, batch_id):
+        return "expired" if batch_id in self._expired else super().poll(batch_id)
+
+
+def test_parse_batch_output_returns_all_choices():
+    rows = [
+        {"custom_id": "a", "response": {"status_code": 200, "body": {"choices": [
+            {"message": {"content": "one"}}]}}},
+        {"custom_id": "b", "response": {"status_code": 200, "body": {"choices": [
+            {"message": {"content": "x"}}, {"message": {"content": "y"}}]}}},
+    ]
+    assert parse_batch_output(rows) == {"a": "one", "b": ["x", "y"]}
+    assert build_batch_request("a", "m", "s", "u", True, n=3)["body"]["n"] == 3
+
+
+def test_local_decision_skips_assess_batch(tmp_path):
+    client = FakeClient()
+    decisions = {
+        "local reject": AssessmentResult(is_suitable=False),
+        "local keep": AssessmentResult(is_suitable=True),
+    }
+    runner = BatchRunner(
+        LocalBatchBackend("fake", tmp_path, client=client),
+        poll_interval=0,
+        local_decision=decisions.get,
+    )
+    results = runner.run(["local reject", "local keep", "llm accept", "llm no"])
+    assessed = [call[2] for call in client.calls if call[1] == SYSTEM_PROMPT_ASSESS]
+    assert assessed == ["llm accept", "llm no"]
+    assert [result[2] is not None for result in results] == [False, True, True, False]
+
+
+def test_candidates_and_question_type_are_used(tmp_path):
+    from questioner.question_types import list_question_types
+
+    question_type = next(t for t in list_question_types() if t.system_prompt != SYSTEM_PROMPT_GENERATE)
+    client = FakeClient()
+    runner = BatchRunner(
+        LocalBatchBackend("fake", tmp_path, client=client),
+        poll_interval=0,
+        n_candidates=3,
+        question_type=question_type.name,
+    )
+    [(_, context, question)] = runner.run(["accept"])
+    assert ("candidates", question_type.system_prompt, context, 3) in client.calls
+    # 第一个候选选项重复，被淘汰
+    assert question.stem == f"{context}#1"
+
+
+def test_budget_and_progress_are_applied(tmp_path):
+    client = FakeClient()
+    probe = BudgetManager()
+    hold = probe.hold_passage("fake", "accept", 1)
+    budget = BudgetManager(run_limit=BudgetLimit(max_tokens=int(hold.tokens * 1.5), soft_ratio=1.0))
+    progress = Progress()
+    runner = BatchRunner(
+        LocalBatchBackend("fake", tmp_path, client=client),
+        poll_interval=0,
+        budget=budget,
+        progress=progress,
+    )
+    results = runner.run(["accept", "accept"], return_exceptions=True)
+    assert isinstance(results[1], BudgetExceeded)
+    assert results[0][2] is not None
+    assert budget.summary()["run"]["calls"] == 3
+    counters = progress.counters()
+    assert (counters["total"], counters["done"], counters["errors"]) == (2, 2, 1)
+    assert counters["calls:assess"] == 1 and counters["in_flight:assess"] == 0
+
+
+def test_expired_batch_resubmits_only_missing_requests(tmp_path):
+    backend = ExpiringBackend(tmp_path, FakeClient(), completes=[2])
+    runner = BatchRunner(backend, poll_interval=0)
+    results = runner.run(["accept 0", "accept 1", "accept 2"])
+    assert backend.submitted[:2] == [["assess-0", "assess-1", "assess-2"], ["assess-2"]]
+    assert all(result[2] is not None for result in results)
+
+
+def test_expired_batch_gives_up_after_max_resubmits(tmp_path):
+    backend = ExpiringBackend(tmp_path, FakeClient(), completes=[1, 0])
+    runner = BatchRunner(backend, poll_interval=0, max_resubmits=1)
+    results = runner.run(["accept 0", "accept 1"], return_exceptions=True)
+    assert backend.submitted[1] == ["assess-1"]
+    assert len(backend.submitted) == 4  # assess 两次，rewrite 与 generate 各一次
+    assert results[0][2] is not None
+    assert "重新提交 1 次后仍未完成" in str(results[1])
@@ -0,0 +1,87 @@
+import pytest
+
+from questioner.budget import BudgetExceeded, BudgetLimit, BudgetManager, ModelPrice
+from questioner.prompts import SYSTEM_PROMPT_ASSESS, SYSTEM_PROMPT_DECONTAMINATE
+
+PASSAGE = "We enrolled 120 patients (n = 120) in a randomized trial; p < 0.01."
+
+
+def _manager(max_tokens, **kwargs):
+    return BudgetManager(run_limit=BudgetLimit(max_tokens=max_tokens, soft_ratio=1.0), **kwargs)
+
+
+def test_model_price_is_per_million_tokens():
+    assert ModelPrice(prompt=2.0, completion=10.0).cost(500_000, 100_000) == pytest.approx(2.0)
+
+
+def test_commit_settles_reservation_with_actual_usage():
+    budget = _manager(100_000)
+    reservation = budget.reserve("rewrite", "m", "system", "user")
+    budget.commit(reservation, {"prompt_tokens": 30, "completion_tokens": 20})
+    summary = budget.summary()["run"]
+    assert summary["tokens"] == 50 and summary["calls"] == 1
+
+
+def test_release_charges_estimated_prompt_only():
+    budget = _manager(100_000)
+    reservation = budget.reserve("rewrite", "m", "system", "user")
+    budget.release(reservation)
+    assert budget.summary()["run"]["tokens"] == reservation.prompt_tokens
+
+
+def test_hard_limit_rejects_call():
+    budget = _manager(10)
+    with pytest.raises(BudgetExceeded) as info:
+        budget.reserve("rewrite", "m", "system", "user")
+    assert info.value.scope == "run" and not info.value.soft
+
+
+def test_hold_blocks_new_passages_but_not_follow_up_stages():
+    probe = BudgetManager()
+    follow_up, _ = probe._follow_up_estimate("m", PASSAGE)
+    assess_tokens = probe.reserve("assess", "m", SYSTEM_PROMPT_ASSESS, PASSAGE).tokens
+    # 刚好够一个片段走完 A + B / C，不够第二个片段
+    budget = _manager(assess_tokens + follow_up + 10)
+
+    hold = budget.hold_passage("m", PASSAGE)
+    budget.commit(
+        budget.reserve("assess", "m", SYSTEM_PROMPT_ASSESS, PASSAGE),
+        {"prompt_tokens": assess_tokens, "completion_tokens": 0},
+    )
+    # 第二个片段既不能开始，也不能直接调用模块 A
+    with pytest.raises(BudgetExceeded):
+        budget.hold_passage("m", PASSAGE)
+    with pytest.raises(BudgetExceeded):
+        budget.reserve("assess", "m", SYSTEM_PROMPT_ASSESS, PASSAGE)
+    # 已开始的片段仍可使用保留的额度完成模块 B
+    budget.reserve("rewrite", "m", SYSTEM_PROMPT_DECONTAMINATE, PASSAGE)
+    budget.release_hold(hold)
+
+
+def test_release_hold_returns_budget():
+    follow_up, _ = BudgetManager()._follow_up_estimate("m", PASSAGE)
+    budget = _manager(follow_up + 1)
+    hold = budget.hold_passage("m", PASSAGE)
+    with pytest.raises(BudgetExceeded):
+        budget.hold_passage("m", PASSAGE)
+    budget.release_hold(hold)
+    budget.release_hold(budget.hold_passage("m", PASSAGE))
+
+
+def test_soft_limit_stops_new_passages():
+    budget = BudgetManager(run_limit=BudgetLimit(max_tokens=10_000, soft_ratio=0.5))
+    budget.commit(
+        budget.reserve("rewrite", "m", "system", "user"),
+        {"prompt_tokens": 6_000, "completion_tokens": 0},
+    )
+    assert not budget.allow_new_passage()
+    with pytest.raises(BudgetExceeded) as info:
+        budget.hold_passage("m", PASSAGE)
+    assert info.value.soft
+
+
+def test_candidates_scale_follow_up_estimate():
+    budget = BudgetManager()
+    one, _ = budget._follow_up_estimate("m", PASSAGE)
+    three, _ = budget._follow_up_estimate("m", PASSAGE, n_candidates=3)
+    assert three - one == 2 * budget._estimates["generate"]
@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from questioner.coverage import (
+    CoverageSampler,
+    HashingEmbedding,
+    VectorIndex,
+    coverage_report,
+    design_of_question,
+)
+from questioner.methods import tag_design
+from questioner.models import Question
+
+RCT = "Patients were randomly assigned to two arms and the chi-square test compared response rates."
+COHORT = "A prospective cohort of 2000 workers was followed for ten years; Cox regression was used."
+SURVEY = "A cross-sectional survey of 800 students measured sleep; Pearson correlation was reported."
+
+
+def _question(stem, answer_text="卡方检验"):
+    return Question(
+        stem=stem,
+        options={"A": answer_text, "B": "t 检验", "C": "方差分析", "D": "秩和检验"},
+        answer="A",
+        analysis="略",
+    )
+
+
+@pytest.mark.parametrize(
+    "text, design",
+    [
+        (RCT, "randomized"),
+        (COHORT, "cohort"),
+        (SURVEY, "cross_sectional"),
+        ("一项病例对照研究比较了 200 例病例与 400 名对照的暴露史。", "case_control"),
+        ("研究者将 120 名受试者随机分为两组。", "randomized"),
+        ("某药物的说明书。", "other"),
+    ],
+)
+def test_tag_design(text, design):
+    assert tag_design(text) == design
+
+
+def test_report_counts_designs_and_missing_designs():
+    index = VectorIndex(HashingEmbedding(dim=256))
+    index.add_questions([_question("研究者将 120 名受试者随机分为两组，比较有效率。")], passages=[RCT])
+    report = coverage_report(index, n_clusters=2)
+    assert report.questions_by_design == {"randomized": 1}
+    assert report.contexts_by_design == {"randomized": 1}
+    assert set(report.missing_designs) == {"cohort", "cross_sectional", "case_control"}
+    assert report.clusters and sum(c.contexts for c in report.clusters) == 1
+
+
+def test_sampler_compares_raw_passages_with_raw_passages():
+    index = VectorIndex(HashingEmbedding(dim=512))
+    question = _question("某研究将患者分为两组并比较两组有效率，应选用何种方法？")
+    index.add_questions([question], passages=[RCT])
+    sampler = CoverageSampler(index, label_weight=0.0, design_weight=0.0)
+    # 与已出题片段几乎相同的候选排在最后，尽管它与去污染后的题干毫无相似之处
+    assert sampler.select([RCT, COHORT, SURVEY], k=3)[-1] == 0
+
+
+def test_sampler_prefers_rare_designs():
+    index = VectorIndex(HashingEmbedding(dim=256))
+    questions = [_question("随机分组试验 %d" % i) for i in range(3)]
+    index.add_questions(questions, passages=[RCT] * 3)
+    sampler = CoverageSampler(index, label_weight=0.0, design_weight=5.0)
+    assert sampler.select([RCT + " again", COHORT], k=1) == [1]
+
+
+def test_save_load_keeps_designs(tmp_path):
+    index = VectorIndex(HashingEmbedding(dim=64))
+    index.add_questions([_question("研究者将受试者随机分为两组。")], passages=[RCT])
+    index.save(tmp_path / "index")
+    loaded = VectorIndex.load(tmp_path / "index", HashingEmbedding(dim=64))
+    assert loaded.designs == ["randomized", "randomized"]
+    assert design_of_question(_question("队列随访十年")) == "cohort"
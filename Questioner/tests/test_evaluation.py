@@ -0,0 +1,117 @@
+import json
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from questioner.config import ModelConfig  # noqa: E402
+from questioner.evaluation import (  # noqa: E402
+    EvaluationHarness,
+    ResponseCache,
+    bootstrap_ci,
+    endpoint_key,
+    extract_choice,
+)
+from questioner.llm_client import LLMClient  # noqa: E402
+from questioner.models import Question  # noqa: E402
+
+QUESTION = Question(
+    stem="应采用哪种检验？",
+    options={"A": "卡方检验", "B": "t 检验", "C": "方差分析", "D": "配对 t 检验"},
+    answer="B",
+    analysis="……",
+)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("答案: B", "B"),
+        ("答案: **B**", "B"),
+        ("**Answer:** C", "C"),
+        ("Answer: (B)", "B"),
+        ("Answer: [A]", "A"),
+        ("答案是【C】", "C"),
+        ("答案：`D`。", "D"),
+        ("The answer is **(D)**.", "D"),
+        ("B.\n因为……", "B"),
+        ("经过分析，选项（C）最合适", "C"),
+        ("答案是B因为样本独立", "B"),
+    ],
+)
+def test_extract_choice_formats(text, expected):
+    assert extract_choice(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["I think the answer is a paired t-test.", "无法确定", "answer: b", "Best guess"],
+)
+def test_extract_choice_returns_none_when_unsure(text):
+    assert extract_choice(text) is None
+
+
+def test_bootstrap_ci_brackets_accuracy():
+    low, high = bootstrap_ci([1, 0, 1, 1, 0, 1, 1, 1, 0, 1] * 10)
+    assert low < 0.7 < high
+    assert all(math.isnan(bound) for bound in bootstrap_ci([]))
+
+
+class FakeClient(LLMClient):
+    def __init__(self, reply=None, error=None):
+        self.reply, self.error, self.calls = reply, error, 0
+
+    def generate_structured_json(self, system_prompt, user_content, json_schema=None):
+        raise NotImplementedError
+
+    def generate_text(self, system_prompt, user_content):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.reply
+
+
+def _harness(tmp_path, configs, clients):
+    return EvaluationHarness(
+        configs,
+        tmp_path / "cache.jsonl",
+        requests_per_second=1000,
+        client_factory=lambda config: clients[config.model_name],
+        n_resamples=100,
+    )
+
+
+def test_errors_are_reported_with_messages(tmp_path):
+    configs = {"good": ModelConfig(model_name="m1"), "broken": ModelConfig(model_name="m2")}
+    clients = {"m1": FakeClient("答案: B"), "m2": FakeClient(error=RuntimeError("401 invalid key"))}
+    report = _harness(tmp_path, configs, clients).run([QUESTION])
+    assert report.scores["good"].accuracy == 1.0
+    broken = report.scores["broken"]
+    assert broken.errors == 1 and broken.total == 0
+    assert broken.error_messages == {"RuntimeError: 401 invalid key": 1}
+    assert report.failures[0]["model"] == "broken"
+
+
+def test_cache_is_keyed_on_endpoint_not_config_name(tmp_path):
+    clients = {"m1": FakeClient("答案: B"), "m2": FakeClient("答案: A")}
+    _harness(tmp_path, {"model": ModelConfig(model_name="m1")}, clients).run([QUESTION])
+    # 同名配置指向另一个模型：不能复用 m1 的回复
+    report = _harness(tmp_path, {"model": ModelConfig(model_name="m2")}, clients).run([QUESTION])
+    assert clients["m2"].calls == 1
+    assert report.scores["model"].correct == 0
+    # 改名后的配置仍复用 m1 的回复
+    report = _harness(tmp_path, {"renamed": ModelConfig(model_name="m1")}, clients).run([QUESTION])
+    assert clients["m1"].calls == 1
+    assert report.scores["renamed"].correct == 1
+
+
+def test_response_cache_truncates_torn_tail(tmp_path):
+    path = tmp_path / "cache.jsonl"
+    record = {"model": "x", "endpoint": endpoint_key(ModelConfig(model_name="m")), "question_id": "q"}
+    path.write_text(json.dumps(record) + "\n" + '{"model": "x", "endp', encoding="utf-8")
+    cache = ResponseCache(path)
+    cache.put({**record, "question_id": "q2"})
+    cache.close()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["question_id"] for line in lines] == ["q", "q2"]
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from questioner.hedging import Hedger, LatencyTracker
+
+
+def _warm(hedger, key="k", seconds=0.01):
+    tracker = hedger.tracker(key)
+    for _ in range(hedger.min_samples):
+        tracker.add(seconds)
+
+
+def test_percentile_uses_nearest_rank():
+    tracker = LatencyTracker(window=10)
+    assert tracker.percentile(95) is None
+    for value in range(1, 11):
+        tracker.add(float(value))
+    assert tracker.percentile(50) == 5.0
+    assert tracker.percentile(95) == 10.0
+
+
+def test_rejects_invalid_parameters():
+    with pytest.raises(ValueError):
+        Hedger(percentile=100)
+    with pytest.raises(ValueError):
+        Hedger(max_workers=0)
+
+
+def test_calls_run_inline_without_samples():
+    hedger = Hedger(min_samples=5)
+    caller = threading.current_thread()
+    seen = []
+    hedger.call("k", lambda: seen.append(threading.current_thread()) or 1, lambda: 2)
+    assert seen == [caller]
+    assert hedger.stats.hedged == 0
+    hedger.shutdown()
+
+
+def test_slow_primary_is_hedged_and_loser_usage_recorded():
+    hedger = Hedger(min_samples=3, max_hedge_ratio=1.0, usage_of=lambda result: result[1])
+    _warm(hedger)
+
+    def primary():
+        time.sleep(0.3)
+        return "primary", {"prompt_tokens": 7, "completion_tokens": 3}
+
+    def hedge():
+        return "hedge", {"prompt_tokens": 5, "completion_tokens": 2}
+
+    result = hedger.call("k", primary, hedge)
+    assert result[0] == "hedge"
+    assert (hedger.stats.hedged, hedger.stats.hedge_wins) == (1, 1)
+    time.sleep(0.4)
+    assert hedger.stats.wasted_prompt_tokens == 7
+    assert hedger.stats.wasted_completion_tokens == 3
+    hedger.shutdown()
+
+
+def test_pool_size_does_not_cap_total_concurrency():
+    hedger = Hedger(min_samples=1, max_hedge_ratio=1.0, max_workers=1)
+    _warm(hedger, seconds=10.0)
+    barrier = threading.Barrier(4, timeout=2)
+
+    def primary():
+        barrier.wait()  # 只有 4 个调用同时执行时才能通过
+        return "ok"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(hedger.call("k", primary, primary)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["ok"] * 4
+    hedger.shutdown()
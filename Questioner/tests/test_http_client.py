@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from benchmarks.mock_server import MockServer  # noqa: E402
+from questioner.http_client import HTTPClient  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockServer(latency=0.01) as server:
+        yield server
+
+
+def test_concurrent_first_calls_share_one_pool(server):
+    client = HTTPClient(model_name="mock", api_key="x", base_url=server.base_url)
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def run():
+        barrier.wait()
+        pools.append(client._get_client())
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(pool) for pool in pools}) == 1
+    client.close()
+
+
+def test_async_client_survives_successive_event_loops(server):
+    client = HTTPClient(model_name="mock", api_key="x", base_url=server.base_url)
+
+    async def call():
+        return await client.agenerate_text("system", "user")
+
+    first = asyncio.run(call())
+    second = asyncio.run(call())  # 之前会报 "attached to a different loop"
+    assert first == second
+
+    async def close():
+        await client.aclose()
+
+    asyncio.run(close())
@@ -0,0 +1,70 @@
+import pytest
+
+from questioner.batch import build_batch_request, request_json_schema
+from questioner.llm_client import structured_output_params
+from questioner.models import OPTION_KEYS, AssessmentResult, Question, json_schema_for
+
+
+def _objects(node):
+    if isinstance(node, dict):
+        if node.get("type") == "object":
+            yield node
+        for value in node.values():
+            yield from _objects(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _objects(item)
+
+
+def _keys(node):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield key
+            # properties 的键是字段名，不是关键字
+            yield from _keys(value if key != "properties" else list(value.values()))
+    elif isinstance(node, list):
+        for item in node:
+            yield from _keys(item)
+
+
+@pytest.mark.parametrize("model", [AssessmentResult, Question])
+def test_schema_satisfies_strict_mode(model):
+    schema = json_schema_for(model)
+    objects = list(_objects(schema))
+    assert objects
+    for node in objects:
+        assert node["additionalProperties"] is False
+        assert node["required"] == list(node["properties"])
+    body = {key: value for key, value in schema.items() if key != "title"}
+    forbidden = {"default", "minProperties", "maxProperties", "title"}
+    assert forbidden.isdisjoint(_keys(body))
+
+
+def test_question_schema_pins_option_keys_and_answer():
+    schema = json_schema_for(Question)
+    options = schema["properties"]["options"]
+    assert list(options["properties"]) == list(OPTION_KEYS)
+    assert schema["properties"]["answer"]["enum"] == list(OPTION_KEYS)
+    assert schema["title"] == "Question" and json_schema_for(Question) is schema
+
+
+def test_structured_output_params_modes():
+    schema = json_schema_for(AssessmentResult)
+    strict = structured_output_params("json_schema", schema)["response_format"]
+    assert strict["json_schema"]["name"] == "AssessmentResult"
+    assert strict["json_schema"]["strict"] is True
+    assert "title" not in strict["json_schema"]["schema"]
+    assert structured_output_params("guided_json", schema)["guided_json"] == strict["json_schema"]["schema"]
+    assert structured_output_params("json_schema") == {"response_format": {"type": "json_object"}}
+    assert structured_output_params("none", schema) == {}
+    with pytest.raises(ValueError):
+        structured_output_params("xml", schema)
+
+
+@pytest.mark.parametrize("mode", ["json_schema", "guided_json"])
+def test_batch_request_carries_the_schema(mode):
+    schema = json_schema_for(Question)
+    body = build_batch_request("generate-0", "m", "s", "u", True, schema, structured_output=mode)["body"]
+    recovered = request_json_schema(body)
+    assert recovered.pop("title", "Question") == "Question"
+    assert recovered == {key: value for key, value in schema.items() if key != "title"}
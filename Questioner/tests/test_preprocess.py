@@ -0,0 +1,74 @@
+import pytest
+
+from questioner.preprocess import _truncate, select_windows, split_paragraphs, stat_density
+
+STATS_EN = (
+    "We enrolled 120 patients (n = 120) in a randomized trial; mean age was 54 (SD 8.1). "
+    "The odds ratio was 1.8 (95% CI 1.2-2.6), p < 0.01."
+)
+STATS_ZH = "共纳入 120 例受试者，随机分为两组，实验组均值为 5.2，对照组为 4.1，t 检验 P<0.05。"
+
+PROSE = [
+    "Researchers have long debated whether sleep or diet matters more, or whether neither does. "
+    "We explore these questions, or so we hope, in the se pages.",
+    "Many people wonder whether coffee or tea is best, or whether it matters at all.",
+    "这个例子中，我们组织了一次讨论，大家都认为这个问题值得研究。",
+]
+
+
+@pytest.mark.parametrize("text", PROSE)
+def test_prose_without_statistics_is_below_min_density(text):
+    assert stat_density(text) < 1.0
+
+
+@pytest.mark.parametrize("text", [STATS_EN, STATS_ZH])
+def test_statistical_text_is_dense(text):
+    assert stat_density(text) > 10.0
+
+
+def test_abbreviations_are_case_sensitive():
+    assert stat_density("HR 1.2") > stat_density("hr or se")
+    assert stat_density("hr or se") == 0.0
+
+
+def test_split_paragraphs_tracks_sections_and_captions():
+    text = "Methods\nWe used a t-test.\nTable 1: Baseline\n\nResults\nIt worked."
+    assert split_paragraphs(text) == [
+        ("methods", "We used a t-test."),
+        ("methods", "Table 1: Baseline"),
+        ("results", "It worked."),
+    ]
+
+
+def test_select_windows_pairs_caption_and_drops_prose():
+    text = "\n\n".join(
+        [
+            "Introduction",
+            PROSE[0],
+            "Results",
+            "As shown in Table 2, " + STATS_EN,
+            "Table 2: Outcomes by group, mean (SD), p < 0.05.",
+            "References",
+            "Smith J. 2020. n = 5, p < 0.01.",
+        ]
+    )
+    windows = select_windows(text, max_tokens=400, top_k=5)
+    assert len(windows) == 1
+    window = windows[0]
+    assert window.section == "results"
+    assert window.captions == ["Table 2: Outcomes by group, mean (SD), p < 0.05."]
+    assert "Table 2: Outcomes" in window.text and "Smith" not in window.text
+
+
+def test_select_windows_respects_token_limit_with_oversized_caption():
+    caption = "Table 1: " + " ".join(f"Group {i} mean = {i}.5, p < 0.05;" for i in range(60))
+    body = "As shown in Table 1, " + " ".join(f"t = 2.{i}, p < 0.05." for i in range(60))
+    windows = select_windows(body + "\n\n" + caption, max_tokens=100, top_k=5, min_density=0)
+    assert windows
+    assert all(window.tokens <= 100 for window in windows)
+
+
+def test_truncate_never_uses_negative_budget():
+    assert _truncate("one. two.", -5, None) == ""
+    assert _truncate("one. two.", 0, None) == ""
+    assert _truncate("a" * 400, 10, None)
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from questioner.progress import Progress, format_status
+from questioner.scheduler import DeadlineExceeded, Scheduler
+
+
+def _queued(scheduler):
+    return sum(metrics["queued"] for metrics in scheduler.metrics().values())
+
+
+def _drain_order(scheduler, requests):
+    """占住唯一的额度，按顺序排入 `requests`（(类别, 任务, 权重)），再释放并返回放行顺序。"""
+    order = []
+    threads = []
+
+    def worker(priority_class, job, weight):
+        with scheduler.slot(priority_class, job=job, weight=weight):
+            order.append(job)
+
+    with scheduler.slot("default"):
+        for n, request in enumerate(requests, 1):
+            thread = threading.Thread(target=worker, args=request)
+            thread.start()
+            threads.append(thread)
+            while _queued(scheduler) < n:
+                time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_weighted_fair_queuing_within_a_class():
+    scheduler = Scheduler(max_concurrency=1)
+    requests = [("bulk", "a", 2.0)] * 4 + [("bulk", "b", 1.0)] * 2
+    # 完成标签：a = 1.5, 2.0, 2.5, 3.0；b = 2.0, 3.0（相同标签按到达顺序）
+    assert _drain_order(scheduler, requests) == ["a", "a", "b", "a", "a", "b"]
+
+
+def test_higher_priority_class_jumps_the_queue():
+    scheduler = Scheduler(max_concurrency=1)
+    requests = [("bulk", "nightly", 1.0)] * 2 + [("interactive", "editor", 1.0)]
+    assert _drain_order(scheduler, requests) == ["editor", "nightly", "nightly"]
+
+
+def test_deadline_expires_without_sending():
+    scheduler = Scheduler(max_concurrency=1)
+    with scheduler.slot("default"):
+        with pytest.raises(DeadlineExceeded):
+            with scheduler.slot("interactive", deadline=time.monotonic() + 0.02):
+                pass
+    metrics = scheduler.metrics()["interactive"]
+    assert (metrics["expired"], metrics["granted"], metrics["queued"]) == (1, 0, 0)
+
+
+def test_unknown_class_is_rejected():
+    with pytest.raises(ValueError):
+        with Scheduler(max_concurrency=1).slot("urgent"):
+            pass
+
+
+def test_progress_folds_shards_of_finished_threads():
+    progress = Progress()
+    for _ in range(20):
+        threads = [threading.Thread(target=progress.add, args=("done",)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert progress.counters()["done"] == 100
+    assert len(progress._shards) == 0
+
+
+def test_snapshot_reports_scheduler_queue_separately_from_in_flight():
+    scheduler = Scheduler(max_concurrency=1)
+    progress = Progress(total=1)
+
+    def wait_for_bulk_slot():
+        with scheduler.slot("bulk"):
+            pass
+
+    with scheduler.slot("default"):
+        waiter = threading.Thread(target=wait_for_bulk_slot)
+        waiter.start()
+        while _queued(scheduler) < 1:
+            time.sleep(0.001)
+        snapshot = progress.snapshot(scheduler=scheduler)
+    waiter.join()
+    assert snapshot["queued"]["bulk"] == 1
+    assert snapshot["in_flight"] == {"assess": 0, "rewrite": 0, "generate": 0}
+    assert "queued 1" in format_status(snapshot)
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+from questioner.llm_client import LLMClient
+from questioner.singleflight import AsyncSingleFlight, CoalescingClient, SingleFlight, request_key
+
+
+class CountingClient(LLMClient):
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = 0
+        self._model_name = "m"
+
+    def generate_structured_json(self, system_prompt, user_content, json_schema=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        self._record_usage({"prompt_tokens": 10, "completion_tokens": 5})
+        return {"answer": user_content}
+
+    def generate_text(self, system_prompt, user_content):
+        self.calls += 1
+        time.sleep(self.delay)
+        self._record_usage({"prompt_tokens": 10, "completion_tokens": 5})
+        return user_content
+
+
+def test_request_key_covers_every_field():
+    base = request_key("json", "m", "s", "u", {"type": "object"})
+    assert base == request_key("json", "m", "s", "u", {"type": "object"})
+    assert base != request_key("text", "m", "s", "u", {"type": "object"})
+    assert base != request_key("json", "m2", "s", "u", {"type": "object"})
+    assert base != request_key("json", "m", "s", "u", None)
+
+
+def test_sync_flight_runs_once_and_shares_errors():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait()
+        raise ValueError("boom")
+
+    errors = []
+
+    def run():
+        try:
+            flight.do("k", fn)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=run) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+    assert len(calls) == 1 and len(errors) == 4
+    assert (flight.stats.calls, flight.stats.upstream) == (4, 1)
+
+
+def test_coalescing_client_reports_usage_only_for_the_upstream_call():
+    inner = CountingClient()
+    client = CoalescingClient(inner)
+    usages = []
+    barrier = threading.Barrier(4)
+
+    def run():
+        barrier.wait()
+        result = client.generate_structured_json("s", "u")
+        usages.append(client.last_usage["prompt_tokens"])
+        result["mutated"] = True  # 共享的结果已深拷贝
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert inner.calls == 1
+    assert sorted(usages) == [0, 0, 0, 10]
+
+
+def test_async_leader_cancellation_does_not_cancel_followers():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        leader = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result, shared = await follower
+        assert leader.cancelled()
+        assert result == "ok" and shared is False
+        assert calls == [1]
+
+    asyncio.run(main())
+
+
+def test_async_upstream_cancelled_when_last_waiter_leaves():
+    async def main():
+        flight = AsyncSingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fn():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        async def quick():
+            return "fresh"
+
+        # 取消后的相同调用重新发起，而不是等待被取消的调用
+        assert await flight.do("k", quick) == ("fresh", False)
+
+    asyncio.run(main())
+
+
+def test_async_client_coalesces_through_thread_fallback():
+    async def main():
+        inner = CountingClient()
+        client = CoalescingClient(inner)
+        results = await asyncio.gather(*(client.agenerate_text("s", "u") for _ in range(5)))
+        assert results == ["u"] * 5
+        assert inner.calls == 1
+        assert client.stats.to_dict()["coalesced"] == 4
+
+    asyncio.run(main())
@@ -0,0 +1,33 @@
+from questioner.speculative import AcceptancePrior, SpeculationController
+
+STATS = (
+    "We enrolled 120 patients (n = 120) in a randomized trial; mean age was 54 (SD 8.1). "
+    "The odds ratio was 1.8 (95% CI 1.2-2.6), p < 0.01."
+)
+PROSE = "Many people wonder whether coffee or tea is best, or whether it matters at all."
+
+
+def test_auto_mode_speculates_only_on_dense_passages():
+    controller = SpeculationController("auto", threshold=0.6)
+    assert controller.should_speculate(STATS)
+    assert not controller.should_speculate(PROSE)
+    assert controller.stats.runs == 2
+
+
+def test_prior_updates_only_its_bucket():
+    prior = AcceptancePrior(strength=1.0)
+    before_prose = prior.estimate(PROSE)
+    for _ in range(10):
+        prior.update(STATS, False)
+    assert prior.estimate(STATS) < 0.1
+    assert prior.estimate(PROSE) == before_prose
+
+
+def test_wasted_speculation_is_recorded():
+    controller = SpeculationController("always")
+    controller.record(STATS, False, True, usage={"prompt_tokens": 10, "completion_tokens": 5}, cost=0.5)
+    controller.record(STATS, True, True, saved_seconds=1.5)
+    stats = controller.stats
+    assert (stats.speculated, stats.wasted) == (2, 1)
+    assert (stats.wasted_prompt_tokens, stats.wasted_completion_tokens) == (10, 5)
+    assert stats.wasted_cost == 0.5 and stats.saved_seconds == 1.5
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from questioner.llm_client import LLMClient
+from questioner.modules import QuestionerPipeline
+from questioner.prompts import SYSTEM_PROMPT_ASSESS, SYSTEM_PROMPT_GENERATE
+from questioner.question_types import list_question_types
+from questioner.workqueue import LeaseLost, SQLiteWorkQueue, Worker
+
+QUESTION = {
+    "stem": "某研究比较两组有效率。",
+    "options": {"A": "t 检验", "B": "卡方检验", "C": "秩和检验", "D": "方差分析"},
+    "answer": "B",
+    "analysis": "分类变量比较用卡方检验。",
+}
+
+
+class FakeClient(LLMClient):
+    model_name = "fake"
+
+    def __init__(self, rewrite_delay=0.0):
+        self.calls = []
+        self.rewrite_delay = rewrite_delay
+
+    def generate_structured_json(self, system_prompt, user_content, json_schema=None):
+        if system_prompt == SYSTEM_PROMPT_ASSESS:
+            self.calls.append("assess")
+            return {"is_suitable": True}
+        self.calls.append(("generate", system_prompt))
+        return QUESTION
+
+    def generate_text(self, system_prompt, user_content):
+        self.calls.append("rewrite")
+        time.sleep(self.rewrite_delay)
+        return "ctx"
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with SQLiteWorkQueue(tmp_path / "queue.db", max_attempts=2) as queue:
+        yield queue
+
+
+def test_expired_lease_is_redelivered_and_old_token_is_fenced(queue):
+    [item_id] = queue.enqueue(["passage"])
+    [first] = queue.lease("w1", visibility_timeout=0.05)
+    assert queue.lease("w2") == []
+    time.sleep(0.1)
+    assert queue.counts()["pending"] == 1
+
+    [second] = queue.lease("w2", visibility_timeout=60)
+    assert (second.id, second.attempts) == (item_id, 2)
+    assert not queue.heartbeat(first)
+    with pytest.raises(LeaseLost):
+        queue.record_stage(first, "assess", {"is_suitable": True}, 0.1)
+    with pytest.raises(LeaseLost):
+        queue.complete(first)
+    queue.complete(second)
+    assert queue.counts()["done"] == 1
+
+
+def test_lease_stops_redelivering_after_max_attempts(queue):
+    queue.enqueue(["passage"])
+    for _ in range(2):
+        assert queue.lease("w", visibility_timeout=0.01)
+        time.sleep(0.02)
+    assert queue.lease("w") == []
+    [record] = queue.results()
+    assert record["status"] == "failed" and "最大尝试次数" in record["error"]
+
+
+def test_fail_retries_until_terminal_and_release_keeps_attempts(queue):
+    queue.enqueue(["passage"])
+    [item] = queue.lease("w")
+    queue.release(item)
+    [item] = queue.lease("w")
+    assert item.attempts == 1
+    assert queue.fail(item, "boom", retry_delay=0.05) is False
+    assert queue.lease("w") == []
+    time.sleep(0.06)
+    [item] = queue.lease("w")
+    assert queue.fail(item, "boom again") is True
+    assert queue.counts()["failed"] == 1
+
+
+def test_worker_reuses_recorded_stages_and_uses_question_type(queue):
+    question_type = next(t for t in list_question_types() if t.system_prompt != SYSTEM_PROMPT_GENERATE)
+    queue.enqueue(["passage"])
+    [item] = queue.lease("w")
+    queue.record_stage(item, "assess", {"is_suitable": True}, 0.1)
+    queue.fail(item, "crashed")
+
+    client = FakeClient()
+    pipeline = QuestionerPipeline(client, speculative="off")
+    worker = Worker(queue, pipeline, question_type=question_type.name)
+    stats = worker.run()
+    assert client.calls == ["rewrite", ("generate", question_type.system_prompt)]
+    assert (stats.processed, stats.reused_stages) == (1, 1)
+    [record] = queue.results()
+    assert record["generate"]["answer"] == "B" and record["rewrite"] == "ctx"
+
+
+def test_lost_heartbeat_stops_processing(queue):
+    class LosingQueue(SQLiteWorkQueue):
+        def heartbeat(self, item, visibility_timeout=300.0):
+            return False
+
+    lossy = LosingQueue(queue.path)
+    lossy.enqueue(["passage"])
+    [item] = lossy.lease("w")
+    client = FakeClient(rewrite_delay=0.2)
+    worker = Worker(lossy, QuestionerPipeline(client, speculative="off"), heartbeat_interval=0.02)
+    heartbeat = threading.Thread(target=worker._heartbeat_loop)
+    heartbeat.start()
+    try:
+        worker.process(item)
+    finally:
+        worker.stop()
+        heartbeat.join()
+        lossy.close()
+    assert worker.stats.lost == 1 and worker.stats.processed == 0
+    assert client.calls == ["assess", "rewrite"]
+    assert set(queue.stage_results(item.id)) == {"assess"}